@@ -4,15 +4,20 @@
 YOLO end-to-end runner driven by config.yml.
 Requires a local PC with an NVIDIA GPU and CUDA-enabled PyTorch.
 """
-import sys
+import argparse
 from pathlib import Path
+from typing import List, Optional
 import yaml
 import torch
 from yolo_project.prepare import prepare_from_zip
+from yolo_project.shard_cache import INDEX_NAME, build_shards, dataset_images, source_manifest
 from yolo_project.train import train as train_fn
-from yolo_project.predict import predict as predict_fn
-from yolo_project.export_artifacts import zip_run
-from yolo_project.plots import generate_training_plots, run_validation_and_confusion
+from yolo_project.predict import predict_batched
+from yolo_project.export_artifacts import RUN_FILES, zip_run
+from yolo_project.plots import generate_training_plots
+from yolo_project.metrics import VAL_CONF, evaluate_predictions, label_path_for
+from yolo_project.models import log_registry_stats
+from yolo_project.stages import Pipeline, Stage, artifact_stamp, file_stamp
 
 def require_gpu():
     if not torch.cuda.is_available():
@@ -29,69 +34,176 @@ def load_config(cfg_path: str):
     with cfg_path.open("r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
-def main(cfg_path: str = "config.yml"):
-    cfg = load_config(cfg_path)
+STAGES = ["prepare", "shards", "train", "predict", "plots", "export"]
+
+def build_pipeline(cfg: dict) -> Pipeline:
+    data_cfg = cfg.get("data", {})
+    train_cfg = cfg["train"]
+    predict_cfg = cfg.get("predict", {})
+    plots_cfg = cfg.get("plots", {})
+    export_cfg = cfg.get("export", {})
+
+    run_dir = Path(train_cfg.get("project", "runs")) / "detect" / "train"
+    best = run_dir / "weights" / "best.pt"
+    plots_dir = Path(plots_cfg.get("out_dir", "artifacts/plots"))
+    export_name = export_cfg.get("name", "my_model")
+    val_dir = run_dir.parent / "val_plots"
+    export_zip = Path(export_cfg.get("out_dir", "artifacts")) / f"{export_name}.zip"
+    use_shards = bool(data_cfg.get("shards", False))
+    shard_dir = Path(data_cfg.get("shard_dir", "cache/shards"))
+
+    def data_yaml() -> str:
+        # prepare's result is persisted in the pipeline state, so it is known even when prepare is skipped
+        if data_cfg.get("zip_path"):
+            return pipeline.results.get("prepare", {}).get("data_yaml", train_cfg["data_yaml"])
+        return train_cfg["data_yaml"]
 
-    # 1) Require GPU
-    gpu_name = require_gpu()
-    print(f"[INFO] Using GPU: {gpu_name}")
+    def val_images() -> List[str]:
+        # The val split as data.yaml declares it: validation/images, or validation.txt for list_files splits
+        return dataset_images(data_yaml())["val"]
 
-    # 2) Optional dataset preparation
-    if cfg.get("data", {}).get("zip_path"):
+    def val_stamp() -> str:
+        images = val_images()
+        labels = [str(label_path_for(p)) for p in images]
+        return source_manifest({"images": images, "labels": [p for p in labels if Path(p).exists()]})
+
+    def prepare():
         print("[INFO] Preparing dataset from zip...")
-        data_yaml = prepare_from_zip(
-            zip_path=cfg["data"]["zip_path"],
-            out_dir=cfg["data"]["out_dir"],
-            train_pct=float(cfg["data"].get("train_pct", 0.9)),
+        return {"data_yaml": str(prepare_from_zip(
+            zip_path=data_cfg["zip_path"],
+            out_dir=data_cfg["out_dir"],
+            train_pct=float(data_cfg.get("train_pct", 0.9)),
+            stream=bool(data_cfg.get("stream", False)),
+            workers=int(data_cfg.get("workers", 8)),
+            link_mode=data_cfg.get("link_mode", "copy"),
+            list_files=bool(data_cfg.get("list_files", False)),
+            incremental=bool(data_cfg.get("incremental", False)),
+            max_side=int(data_cfg.get("max_side", 0)),
+            jpeg_quality=int(data_cfg.get("jpeg_quality", 95)),
+        ))}
+
+    def shards():
+        print("[INFO] Building image shard cache...")
+        build_shards(data_yaml(), str(shard_dir), imgsz=int(train_cfg.get("imgsz", 640)),
+                     workers=int(data_cfg.get("workers", 8)))
+
+    def train():
+        print("[INFO] Starting training...")
+        # Fixed run directory (exist_ok) so a retrain overwrites runs/detect/train instead of creating train2
+        train_fn(
+            data_yaml=data_yaml(),
+            model=train_cfg.get("model", "yolo11s.pt"),
+            epochs=int(train_cfg.get("epochs", 60)),
+            imgsz=int(train_cfg.get("imgsz", 640)),
+            project=str(run_dir.parent),
+            name=run_dir.name,
+            exist_ok=True,
+            telemetry_every=int(train_cfg.get("telemetry_every", 0)),
+            batch=int(train_cfg.get("batch", 16)),
+            workers=int(train_cfg.get("workers", 8)),
+            cache=train_cfg.get("cache", False),
+            shard_dir=str(shard_dir) if use_shards else None,
         )
-        cfg["train"]["data_yaml"] = data_yaml
-
-    # 3) Train
-    print("[INFO] Starting training...")
-    train_fn(
-        data_yaml=cfg["train"]["data_yaml"],
-        model=cfg["train"].get("model", "yolo11s.pt"),
-        epochs=int(cfg["train"].get("epochs", 60)),
-        imgsz=int(cfg["train"].get("imgsz", 640)),
-        project=cfg["train"].get("project", "runs"),
-    )
-    run_dir = Path(cfg["train"].get("project", "runs")) / "detect" / "train"
-
-    # 4) Predict on validation images
-    if cfg.get("predict", {}).get("enabled", True):
-        print("[INFO] Running prediction on validation images...")
-        predict_fn(
-            weights=str(run_dir / "weights" / "best.pt"),
-            source=str(Path(cfg["data"]["out_dir"]) / "validation" / "images"),
-            save=bool(cfg["predict"].get("save", True)),
-            imgsz=int(cfg["predict"].get("imgsz", cfg["train"].get("imgsz", 640))),
-            project=cfg["predict"].get("project", "runs"),
-            name=cfg["predict"].get("name", "predict"),
+
+    def predict():
+        # One pass at the validation threshold: saved images only draw boxes >= predict.conf, while
+        # metrics, PR curve and confusion matrix are computed from every detection
+        print("[INFO] Running prediction and validation on validation images...")
+        save = bool(predict_cfg.get("enabled", True)) and bool(predict_cfg.get("save", True))
+        results = predict_batched(
+            weights=str(best),
+            source=[Path(p) for p in val_images()],
+            save=save,
+            imgsz=int(predict_cfg.get("imgsz", train_cfg.get("imgsz", 640))),
+            project=predict_cfg.get("project", "runs"),
+            name=predict_cfg.get("name", "predict"),
+            batch_size=max(1, int(predict_cfg.get("batch_size", 16))),
+            workers=int(predict_cfg.get("workers", 4)),
+            prefetch=int(predict_cfg.get("prefetch", 64)),
+            conf=VAL_CONF,
+            save_conf=float(predict_cfg.get("conf", 0.25)),
         )
+        metrics = evaluate_predictions(results, out_dir=str(val_dir))
+        return {k: metrics[k] for k in ("precision", "recall", "map50", "map50_95") if k in metrics}
 
-    # 5) Plots: metrics and confusion matrix
-    print("[INFO] Generating plots...")
-    from pathlib import Path as _P
-    plots_dir = _P(cfg.get("plots", {}).get("out_dir", "artifacts/plots"))
-    plots_dir.mkdir(parents=True, exist_ok=True)
-    generate_training_plots(run_dir=str(run_dir), out_dir=str(plots_dir))
-    run_validation_and_confusion(
-        weights=str(run_dir / "weights" / "best.pt"),
-        data_yaml=cfg["train"]["data_yaml"],
-        project=str(run_dir.parent),
-        name="val_plots"
-    )
-
-    # 6) Export artifacts
-    if cfg.get("export", {}).get("enabled", True):
+    def plots():
+        print("[INFO] Generating plots...")
+        plots_dir.mkdir(parents=True, exist_ok=True)
+        generate_training_plots(run_dir=str(run_dir), out_dir=str(plots_dir), mode=plots_cfg.get("mode", "separate"),
+                                workers=int(plots_cfg.get("workers", 0)))
+
+    def export():
         print("[INFO] Exporting artifacts...")
-        zip_path = zip_run(
-            run_dir=str(run_dir),
-            name=cfg["export"].get("name", "my_model"),
-            out_dir=cfg["export"].get("out_dir", "artifacts"),
-        )
+        zip_path = zip_run(run_dir=str(run_dir), name=export_name, out_dir=export_cfg.get("out_dir", "artifacts"),
+                           formats=export_cfg.get("formats") or [], slim=bool(export_cfg.get("slim", False)),
+                           half=bool(export_cfg.get("half", False)),
+                           sample_size=int(export_cfg.get("verify_images", 16)),
+                           imgsz=int(predict_cfg.get("imgsz", train_cfg.get("imgsz", 640))))
         print(f"[INFO] Wrote artifacts to: {zip_path}")
+        return {"zip_path": zip_path}
+
+    # Telemetry only observes training, so changing it must not trigger a retrain
+    train_inputs = {k: v for k, v in train_cfg.items() if k not in ("data_yaml", "telemetry_every")}
+    pipeline = Pipeline([
+        Stage("prepare", prepare,
+              inputs=lambda: {"config": data_cfg, "zip": file_stamp(data_cfg["zip_path"])},
+              outputs=lambda: [Path(data_yaml())],
+              enabled=lambda: bool(data_cfg.get("zip_path"))),
+        # build_shards checks imgsz and the source manifest itself; the stage fingerprint only saves that walk
+        Stage("shards", shards,
+              inputs=lambda: {"imgsz": int(train_cfg.get("imgsz", 640)), "shard_dir": str(shard_dir),
+                              "data_yaml": artifact_stamp(data_yaml()),
+                              "dataset": artifact_stamp(Path(data_yaml()).parent)},
+              outputs=lambda: [shard_dir / INDEX_NAME],
+              enabled=lambda: use_shards),
+        Stage("train", train,
+              inputs=lambda: {"config": train_inputs, "data_yaml": artifact_stamp(data_yaml()),
+                              "dataset": artifact_stamp(Path(data_yaml()).parent),
+                              **({"shards": artifact_stamp(shard_dir / INDEX_NAME)} if use_shards else {})},
+              outputs=lambda: [best, run_dir / "results.csv"],
+              needs_gpu=True),
+        Stage("predict", predict,
+              inputs=lambda: {"config": predict_cfg, "weights": artifact_stamp(best),
+                              "data_yaml": artifact_stamp(data_yaml()), "validation": val_stamp()},
+              outputs=lambda: [val_dir / "metrics.json"] + (
+                  [Path(predict_cfg.get("project", "runs")) / predict_cfg.get("name", "predict")]
+                  if predict_cfg.get("enabled", True) and predict_cfg.get("save", True) else []),
+              needs_gpu=True, deps=["train"]),
+        Stage("plots", plots,
+              inputs=lambda: {"config": plots_cfg, "results_csv": artifact_stamp(run_dir / "results.csv")},
+              outputs=lambda: [plots_dir], deps=["train"]),
+        Stage("export", export,
+              inputs=lambda: {"config": export_cfg, "weights": artifact_stamp(best),
+                              "run_files": {fn: artifact_stamp(run_dir / fn) for fn in RUN_FILES}},
+              outputs=lambda: [export_zip],
+              # Packages only training outputs; predict writes to runs/predict and val_plots, outside run_dir
+              enabled=lambda: bool(export_cfg.get("enabled", True)), deps=["train"]),
+    ])
+    return pipeline
+
+def main(cfg_path: str = "config.yml", from_stage: Optional[str] = None, only: Optional[List[str]] = None):
+    cfg = load_config(cfg_path)
+    pipeline = build_pipeline(cfg)
+
+    def before_gpu():
+        # Only stages that actually run on the GPU require it; a fully cached rerun works anywhere
+        gpu_name = require_gpu()
+        print(f"[INFO] Using GPU: {gpu_name}")
+
+    try:
+        pipeline.run(from_stage=from_stage, only=only, before_gpu=before_gpu)
+    finally:
+        print(pipeline.summary())
+        log_registry_stats()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the config-driven YOLO pipeline, skipping up-to-date stages.")
+    parser.add_argument("config", nargs="?", default="config.yml", help="Path to config.yml")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--from-stage", choices=STAGES, help="Force this stage and every later one to run")
+    group.add_argument("--only", nargs="+", choices=STAGES, help="Run only these stages (forced)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    cfg = sys.argv[1] if len(sys.argv) > 1 else "config.yml"
-    main(cfg)
+    args = parse_args()
+    main(args.config, from_stage=args.from_stage, only=args.only)
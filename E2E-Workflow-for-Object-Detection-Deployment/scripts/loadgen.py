@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""Closed-loop load generator for `yolo-proj serve`.
+
+For each concurrency level, N client threads POST images to /predict back to back for
+--duration seconds. Reports throughput, client-side latency percentiles and the server's
+mean batch size (from /metrics), e.g.:
+
+    python scripts/loadgen.py --images data/validation/images --concurrency 1 4 16 32
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def load_payloads(images: str, limit: int):
+    src = Path(images)
+    paths = [src] if src.is_file() else sorted(p for p in src.rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+    if not paths:
+        raise SystemExit(f"No images found under {images}")
+    return [p.read_bytes() for p in paths[:limit]]
+
+
+def get_json(host: str, port: int, path: str) -> dict:
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request("GET", path)
+    data = json.loads(conn.getresponse().read())
+    conn.close()
+    return data
+
+
+def run_level(host: str, port: int, payloads, concurrency: int, duration: float):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset: int):
+        conn = http.client.HTTPConnection(host, port, timeout=60)  # keep-alive per client
+        i = offset
+        while time.perf_counter() < stop_at:
+            body = payloads[i % len(payloads)]
+            i += concurrency
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", "/predict", body=body, headers={"Content-Type": "application/octet-stream"})
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+            ms = (time.perf_counter() - t0) * 1000
+            with lock:
+                if ok:
+                    latencies.append(ms)
+                else:
+                    errors[0] += 1
+        conn.close()
+
+    before = get_json(host, port, "/metrics")
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    after = get_json(host, port, "/metrics")
+
+    lat = np.asarray(latencies) if latencies else np.zeros(1)
+    batches = after["batches"] - before["batches"]
+    served = after["requests"] - before["requests"]
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p90_ms": float(np.percentile(lat, 90)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "mean_batch_size": served / batches if batches else 0.0,
+        "max_queue_depth": after["max_queue_depth"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure serve throughput at several concurrency levels.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--images", required=True, help="Image file or directory to send")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per concurrency level")
+    parser.add_argument("--max-images", type=int, default=64)
+    parser.add_argument("--output", default="", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    payloads = load_payloads(args.images, args.max_images)
+    get_json(host, port, "/health")
+
+    rows = []
+    print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'batch':>6} {'errors':>7}")
+    for c in args.concurrency:
+        r = run_level(host, port, payloads, c, args.duration)
+        rows.append(r)
+        print(f"{c:>5} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p90_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['mean_batch_size']:>6.2f} {r['errors']:>7}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import typer
-from typing import Optional
-from .prepare import prepare_from_zip
+from enum import Enum
+from typing import List, Optional
+from .prepare import LINK_MODES, prepare_from_dir, prepare_from_zip
 from .train import train as train_fn
-from .predict import predict as predict_fn
+from .predict import predict as predict_fn, predict_batched
 from .export_artifacts import zip_run
 
+# Lets typer reject an unknown --link-mode before anything is extracted
+LinkMode = Enum("LinkMode", {m: m for m in LINK_MODES}, type=str)
+
 app = typer.Typer(add_completion=False, help="CLI for preparing data, training YOLO, predicting, and exporting artifacts.")
 
 @app.command()
@@ -12,10 +16,46 @@ def prepare(
     zip: str = typer.Option(..., "--zip", help="Path to data.zip that contains images/, labels/, classes.txt"),
     out: str = typer.Option("data", "--out", help="Output dataset directory"),
     train_pct: float = typer.Option(0.9, "--train-pct", help="Fraction of images for train split"),
+    stream: bool = typer.Option(False, "--stream", help="Extract members straight into train/validation without a temp unzip"),
+    workers: int = typer.Option(8, "--workers", help="Extraction threads for --stream, resize processes for --max-side"),
+    link_mode: LinkMode = typer.Option(LinkMode.copy, "--link-mode", help="How split files are materialized: copy, hardlink, symlink or reflink"),
+    list_files: bool = typer.Option(False, "--list-files", help="Write train.txt/validation.txt path lists instead of split dirs"),
+    incremental: bool = typer.Option(False, "--incremental", help="Only add/remove/update pairs that changed since the last prepare (uses out/manifest.json)"),
+    max_side: int = typer.Option(0, "--max-side", help="Downscale images whose long side exceeds this many pixels (0 = keep)"),
+    jpeg_quality: int = typer.Option(95, "--jpeg-quality", help="JPEG quality of downscaled images"),
 ):
-    data_yaml = prepare_from_zip(zip, out, train_pct)
+    data_yaml = prepare_from_zip(zip, out, train_pct, stream=stream, workers=workers, link_mode=link_mode.value,
+                                 list_files=list_files, incremental=incremental, max_side=max_side,
+                                 jpeg_quality=jpeg_quality)
     typer.echo(data_yaml)
 
+@app.command()
+def split(
+    src: str = typer.Option(..., "--src", help="Extracted dataset dir that contains images/, labels/, classes.txt"),
+    out: str = typer.Option("data", "--out", help="Output dataset directory"),
+    train_pct: float = typer.Option(0.9, "--train-pct", help="Fraction of images for train split"),
+    link_mode: LinkMode = typer.Option(LinkMode.copy, "--link-mode", help="How split files are materialized: copy, hardlink, symlink or reflink"),
+    list_files: bool = typer.Option(False, "--list-files", help="Write train.txt/validation.txt path lists instead of split dirs"),
+    max_side: int = typer.Option(0, "--max-side", help="Downscale images whose long side exceeds this many pixels (0 = keep)"),
+    jpeg_quality: int = typer.Option(95, "--jpeg-quality", help="JPEG quality of downscaled images"),
+    workers: int = typer.Option(8, "--workers", help="Resize processes for --max-side"),
+):
+    data_yaml = prepare_from_dir(src, out, train_pct, link_mode=link_mode.value, list_files=list_files, max_side=max_side,
+                                 jpeg_quality=jpeg_quality, workers=workers)
+    typer.echo(data_yaml)
+
+@app.command()
+def shards(
+    data: str = typer.Option(..., "--data", help="Path to data.yaml"),
+    out: str = typer.Option("cache/shards", "--out", help="Shard cache directory"),
+    imgsz: int = typer.Option(640, "--imgsz", help="Training resolution the images are resized to"),
+    workers: int = typer.Option(8, "--workers", help="Decode/resize threads"),
+    shard_mb: int = typer.Option(1024, "--shard-mb", help="Approximate size of each shard file in MB"),
+    force: bool = typer.Option(False, "--force", help="Rebuild even if the cache matches imgsz and the dataset"),
+):
+    from .shard_cache import build_shards
+    typer.echo(build_shards(data, out, imgsz=imgsz, workers=workers, shard_mb=shard_mb, force=force))
+
 @app.command()
 def train(
     data: str = typer.Option(..., "--data", help="Path to data.yaml"),
@@ -23,8 +63,15 @@ def train(
     epochs: int = typer.Option(60, "--epochs", help="Number of epochs"),
     imgsz: int = typer.Option(640, "--imgsz", help="Training resolution"),
     project: str = typer.Option("runs", "--project", help="Ultralytics runs dir"),
+    batch: int = typer.Option(16, "--batch", help="Images per batch"),
+    workers: int = typer.Option(8, "--workers", help="Dataloader worker processes"),
+    cache: str = typer.Option("false", "--cache", help="Image cache: false, ram or disk"),
+    telemetry_every: int = typer.Option(0, "--telemetry-every", help="Also log telemetry every N batches (0 = per epoch only)"),
+    shards: Optional[str] = typer.Option(None, "--shards", help="Read images from this shard cache (built by `yolo-proj shards`)"),
 ):
-    train_fn(data_yaml=data, model=model, epochs=epochs, imgsz=imgsz, project=project)
+    train_fn(data_yaml=data, model=model, epochs=epochs, imgsz=imgsz, project=project, telemetry_every=telemetry_every,
+             batch=batch, workers=workers, cache=False if cache.lower() in ("false", "none", "") else cache,
+             shard_dir=shards)
 
 @app.command()
 def predict(
@@ -34,16 +81,62 @@ def predict(
     imgsz: int = typer.Option(640, "--imgsz", help="Prediction resolution"),
     project: str = typer.Option("runs", "--project", help="Ultralytics runs dir"),
     name: str = typer.Option("predict", "--name", help="Subdir name under runs"),
+    batch_size: int = typer.Option(0, "--batch-size", help="Images per inference batch; >0 enables batched, prefetching directory inference"),
+    workers: int = typer.Option(4, "--workers", help="Decode/letterbox threads for --batch-size"),
+    prefetch: int = typer.Option(64, "--prefetch", help="Max decoded images queued ahead of inference"),
 ):
+    if batch_size > 0:
+        for _ in predict_batched(weights=weights, source=source, save=save, imgsz=imgsz, project=project, name=name,
+                                 batch_size=batch_size, workers=workers, prefetch=prefetch):
+            pass
+        return
     predict_fn(weights=weights, source=source, save=save, imgsz=imgsz, project=project, name=name)
 
+@app.command()
+def serve(
+    weights: str = typer.Option(..., "--weights", help="Path to best.pt (or an exported model)"),
+    host: str = typer.Option("127.0.0.1", "--host", help="Bind address"),
+    port: int = typer.Option(8000, "--port", help="Bind port"),
+    imgsz: int = typer.Option(640, "--imgsz", help="Inference resolution"),
+    conf: float = typer.Option(0.25, "--conf", help="Default confidence threshold (per request: /predict?conf=)"),
+    max_batch: int = typer.Option(8, "--max-batch", help="Max requests fused into one inference batch"),
+    max_wait_ms: float = typer.Option(5.0, "--max-wait-ms", help="Max time the first request of a batch waits for more"),
+    max_queue: int = typer.Option(256, "--max-queue", help="Pending requests before the server answers 503"),
+):
+    from .serve import serve as serve_fn
+    serve_fn(weights=weights, host=host, port=port, imgsz=imgsz, conf=conf, max_batch=max_batch,
+             max_wait_ms=max_wait_ms, max_queue=max_queue)
+
+@app.command()
+def plots(
+    run_dir: str = typer.Option("runs/detect/train", "--run-dir", help="Ultralytics run dir containing results.csv"),
+    out_dir: str = typer.Option("artifacts/plots", "--out-dir", help="Output directory for the plots"),
+    mode: str = typer.Option("separate", "--mode", help="separate (one PNG per metric) or panel (one multi-panel PNG)"),
+    workers: int = typer.Option(0, "--workers", help="Render processes in separate mode (0 = one per CPU)"),
+    watch: bool = typer.Option(False, "--watch", help="Tail results.csv during training and refresh the panel PNG"),
+    interval: float = typer.Option(10.0, "--interval", help="Watch poll interval in seconds"),
+    idle_timeout: float = typer.Option(0.0, "--idle-timeout", help="Stop watching after this many idle seconds (0 = never)"),
+):
+    from .plots import generate_training_plots, watch_training_plots
+    if watch:
+        watch_training_plots(run_dir=run_dir, out_dir=out_dir, interval=interval, idle_timeout=idle_timeout)
+        return
+    generate_training_plots(run_dir=run_dir, out_dir=out_dir, mode=mode, workers=workers)
+
 @app.command()
 def export(
     run_dir: str = typer.Option(..., "--run-dir", help="Ultralytics run dir, e.g., runs/detect/train"),
     name: str = typer.Option("my_model", "--name", help="Artifact base name"),
     out_dir: str = typer.Option("artifacts", "--out-dir", help="Output directory for zip"),
+    formats: List[str] = typer.Option([], "--format", help="Also package this export (onnx, openvino); repeatable"),
+    slim: bool = typer.Option(False, "--slim", help="Package an inference-only checkpoint (no optimizer/EMA/training args)"),
+    half: bool = typer.Option(False, "--half", help="With --slim, store fp16 weights if detections stay identical"),
+    sample: Optional[str] = typer.Option(None, "--sample", help="Images to verify the slim checkpoint on (default: the run's validation set)"),
+    verify_images: int = typer.Option(16, "--verify-images", help="Number of images to verify the slim checkpoint on"),
+    imgsz: int = typer.Option(640, "--imgsz", help="Inference resolution for verification"),
 ):
-    zip_run(run_dir=run_dir, name=name, out_dir=out_dir)
+    zip_run(run_dir=run_dir, name=name, out_dir=out_dir, formats=formats, slim=slim, half=half, sample_source=sample,
+            sample_size=verify_images, imgsz=imgsz)
 
 if __name__ == "__main__":
     app()
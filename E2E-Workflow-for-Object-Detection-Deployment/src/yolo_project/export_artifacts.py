@@ -1,29 +1,228 @@
+import hashlib
+import json
+import os
+import time
 import zipfile
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
 from .log import log
+from .models import get_model
+from .predict import list_images
 
-def zip_run(run_dir: str, name: str = "my_model", out_dir: str = "artifacts"):
+RUN_FILES = ["results.png", "results.csv", "hyp.yaml", "opt.yaml", "args.yaml"]
+# Weights and images barely compress; deflating them costs CPU for a few percent at best
+STORED_SUFFIXES = {".pt", ".pth", ".onnx", ".bin", ".engine", ".tflite", ".png", ".jpg", ".jpeg", ".zip"}
+# Where Ultralytics writes each export format next to best.pt
+EXPORT_PATHS = {"onnx": "best.onnx", "openvino": "best_openvino_model"}
+# The only checkpoint args Ultralytics reads back for inference (Model._reset_ckpt_args)
+INFERENCE_ARGS = ("imgsz", "data", "task", "single_cls")
+
+def slim_checkpoint(weights: str, out_path: str, half: bool = False) -> Path:
+    """Write an inference-only copy of an Ultralytics checkpoint.
+
+    Built on Ultralytics' strip_optimizer (EMA weights as the model, no optimizer/EMA/scaler state,
+    gradients off), additionally dropping training metrics/results and git info and keeping only
+    the train_args inference reads back. strip_optimizer always stores fp16; an fp32 source is cast
+    back unless half=True, so the weights keep the source dtype by default. Kept in sync with
+    YOLOv11-Custom-Object-Detection/scripts/export_model.py (slim_checkpoint/slim_weights).
+    """
+    import torch
+    from ultralytics.utils.torch_utils import strip_optimizer
+
+    src = torch.load(weights, map_location="cpu", weights_only=False)
+    fp32 = next((src.get("ema") or src["model"]).parameters()).dtype == torch.float32
+    args = {k: v for k, v in (src.get("train_args") or {}).items() if k in INFERENCE_ARGS}
+    del src
+    ckpt = strip_optimizer(weights, str(out_path),
+                           updates={"train_args": args, "train_metrics": None, "train_results": None, "git": None})
+    if not ckpt:
+        raise ValueError(f"{weights} is not an Ultralytics checkpoint")
+    if fp32 and not half:
+        ckpt["model"].float()
+        torch.save(ckpt, out_path)
+    return Path(out_path)
+
+def _load_seconds(weights: Path, repeats: int = 3) -> float:
+    """Best-of-n wall time to load a checkpoint into a YOLO model (page cache warm after the first run)."""
+    from ultralytics import YOLO
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        YOLO(str(weights))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def compare_detections(reference: Path, candidate: Path, images: List[Path], imgsz: int = 640, conf: float = 0.25,
+                       iou: float = 0.95) -> Dict:
+    """Run both checkpoints on the CPU over images and check they produce the same detections.
+
+    Detections match when counts agree and every reference box has a candidate box of the same
+    class with IoU >= iou. Returns the mismatched images plus the largest box/confidence deviation.
+    """
+    from ultralytics import YOLO
+    from ultralytics.utils.metrics import box_iou
+
+    ref, cand = YOLO(str(reference)), YOLO(str(candidate))
+    mismatched, max_box, max_conf = [], 0.0, 0.0
+    for path in images:
+        a = ref.predict(str(path), imgsz=imgsz, conf=conf, device="cpu", verbose=False)[0].boxes
+        b = cand.predict(str(path), imgsz=imgsz, conf=conf, device="cpu", verbose=False)[0].boxes
+        if len(a) != len(b):
+            mismatched.append(str(path))
+            continue
+        if not len(a):
+            continue
+        overlap = box_iou(a.xyxy, b.xyxy) * (a.cls[:, None] == b.cls[None, :])
+        match = overlap.argmax(1)
+        if (overlap.max(1).values < iou).any() or len(set(match.tolist())) != len(a):
+            mismatched.append(str(path))
+            continue
+        max_box = max(max_box, float((a.xyxy - b.xyxy[match]).abs().max()))
+        max_conf = max(max_conf, float((a.conf - b.conf[match]).abs().max()))
+    return {"images": len(images), "mismatched": mismatched, "max_box_px": max_box, "max_conf_delta": max_conf}
+
+def _sample_images(run_dir: Path, source: Optional[str], count: int) -> List[Path]:
+    """Evenly spaced sample of the given source, or of the run's validation images from args.yaml."""
+    if source is None:
+        import yaml
+        from .shard_cache import dataset_images
+
+        args = run_dir / "args.yaml"
+        try:
+            data = yaml.safe_load(args.read_text()).get("data")
+            paths = [Path(p) for p in dataset_images(data)["val"]]
+        except (OSError, TypeError, AttributeError, yaml.YAMLError):
+            paths = []
+    else:
+        paths = list_images(source)
+    if len(paths) <= count:
+        return paths
+    return [paths[i * len(paths) // count] for i in range(count)]
+
+def slim_weights(weights: Path, half: bool = False, images: Sequence[Path] = (),
+                 imgsz: int = 640) -> Tuple[Path, Optional[Dict]]:
+    """Slim best.pt next to it (best_slim.pt), verify detections on images and measure size/load time.
+
+    If the fp16 checkpoint changes any detection it is rewritten in the source dtype. Returns the
+    slim path and a report for manifest.json, or (weights, None) after deleting best_slim.pt when
+    it is not smaller than weights (a finished best.pt is already stripped) or changes detections.
+    """
+    slim = slim_checkpoint(str(weights), str(weights.with_name("best_slim.pt")), half=half)
+
+    def discard(reason: str) -> Tuple[Path, None]:
+        log(f"[yellow]Warning:[/yellow] {slim.name} {reason}; packaging {weights.name} instead")
+        slim.unlink()
+        return weights, None
+
+    size = weights.stat().st_size
+    if slim.stat().st_size >= size:
+        return discard(f"is not smaller than {weights.name} ({size / 1e6:.1f} MB, already stripped)")
+    check = compare_detections(weights, slim, list(images), imgsz=imgsz) if images else None
+    if half and check and check["mismatched"]:
+        log(f"[yellow]Warning:[/yellow] fp16 weights changed detections on {len(check['mismatched'])}/"
+            f"{check['images']} images; keeping the source dtype")
+        half = False
+        slim_checkpoint(str(weights), str(slim), half=False)
+        if slim.stat().st_size >= size:
+            return discard(f"is not smaller than {weights.name} without fp16")
+        check = compare_detections(weights, slim, list(images), imgsz=imgsz)
+    if check is None:
+        log("[yellow]Warning:[/yellow] No validation images found; slim checkpoint detections not verified")
+    elif check["mismatched"]:
+        return discard(f"changed detections on {len(check['mismatched'])}/{check['images']} images "
+                       f"({check['mismatched'][:5]})")
+    slim_size = slim.stat().st_size
+    load, slim_load = _load_seconds(weights), _load_seconds(slim)
+    report = {
+        "half": half,
+        "bytes": size,
+        "slim_bytes": slim_size,
+        "size_reduction_pct": 100 * (1 - slim_size / size),
+        "load_s": load,
+        "slim_load_s": slim_load,
+        "load_time_reduction_pct": 100 * (1 - slim_load / load),
+        "verification": check,
+    }
+    log(f"Slim checkpoint {slim.name}{' (fp16)' if half else ''}: {size / 1e6:.1f} -> {slim_size / 1e6:.1f} MB "
+        f"(-{report['size_reduction_pct']:.0f}%), load {load * 1e3:.0f} -> {slim_load * 1e3:.0f} ms "
+        f"({-report['load_time_reduction_pct']:+.0f}%)"
+        + (f", identical detections on {check['images']} images" if check else ""))
+    return slim, report
+
+def _exported(weights: Path, name: str, formats: Sequence[str]) -> List[Tuple[Path, str]]:
+    """(source, archive name) pairs for the requested export formats, exporting any that are missing."""
+    entries = []
+    for fmt in formats:
+        if fmt not in EXPORT_PATHS:
+            raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(EXPORT_PATHS)})")
+        path = weights.parent / EXPORT_PATHS[fmt]
+        if not path.exists() or path.stat().st_mtime < weights.stat().st_mtime:
+            log(f"Exporting {weights.name} to {fmt}")
+            # Private copy: export fuses layers in place
+            get_model(str(weights), cache=False).export(format=fmt)
+        target = EXPORT_PATHS[fmt].replace("best", name, 1)
+        if path.is_dir():
+            entries += [(p, f"{name}/weights/{target}/{p.relative_to(path).as_posix()}")
+                        for p in sorted(path.rglob("*")) if p.is_file()]
+        else:
+            entries.append((path, f"{name}/weights/{target}"))
+    return entries
+
+def _write_member(zf: zipfile.ZipFile, src: Path, arcname: str, chunk: int = 1 << 20) -> Dict:
+    """Stream src into the archive, hashing it in the same read; returns its manifest entry."""
+    info = zipfile.ZipInfo.from_file(src, arcname)
+    stored = src.suffix.lower() in STORED_SUFFIXES
+    info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+    h = hashlib.sha256()
+    with src.open("rb") as fsrc, zf.open(info, "w") as dst:
+        for block in iter(lambda: fsrc.read(chunk), b""):
+            h.update(block)
+            dst.write(block)
+    return {"sha256": h.hexdigest(), "bytes": info.file_size, "compression": "stored" if stored else "deflated"}
+
+def zip_run(run_dir: str, name: str = "my_model", out_dir: str = "artifacts", formats: Sequence[str] = (),
+            slim: bool = False, half: bool = False, sample_source: Optional[str] = None, sample_size: int = 16,
+            imgsz: int = 640):
+    """Package best.pt, run metadata and optional exports (onnx, openvino) into out_dir/<name>.zip.
+
+    Files are streamed from run_dir straight into the archive in one pass: weights and images are
+    stored, text is deflated, and <name>/manifest.json records the SHA-256 and size of every member.
+    With slim=True the packaged weights are the inference-only checkpoint from slim_weights,
+    verified on sample_size images of sample_source (default: the run's validation set), if it
+    is smaller than best.pt and reproduces its detections.
+    """
     run_dir = Path(run_dir).expanduser().resolve()
     out_dir = Path(out_dir).expanduser().resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
     weights = run_dir / "weights" / "best.pt"
     if not weights.exists():
         raise FileNotFoundError(f"best.pt not found under {weights.parent}")
-    pkg_dir = out_dir / name
-    pkg_dir.mkdir(parents=True, exist_ok=True)
-    # Copy files (do not duplicate heavy images; keep the training curve png and results)
-    (pkg_dir / "weights").mkdir(exist_ok=True)
-    import shutil
-    shutil.copy2(weights, pkg_dir / "weights" / f"{name}.pt")
-    # Copy minimal run metadata
-    for fn in ["results.png", "results.csv", "hyp.yaml", "opt.yaml", "args.yaml"]:
-        f = run_dir / fn
-        if f.exists():
-            shutil.copy2(f, pkg_dir / fn)
-    # Zip
+    report = None
+    packaged = weights
+    if slim:
+        images = _sample_images(run_dir, sample_source, sample_size)
+        packaged, report = slim_weights(weights, half=half, images=images, imgsz=imgsz)
+    # Heavy artifacts (training images, last.pt) are left out; keep the weights, curves and results
+    entries = [(packaged, f"{name}/weights/{name}.pt")]
+    entries += [(run_dir / fn, f"{name}/{fn}") for fn in RUN_FILES if (run_dir / fn).exists()]
+    entries += _exported(weights, name, formats)
+
     zip_path = out_dir / f"{name}.zip"
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for p in pkg_dir.rglob("*"):
-            zf.write(p, p.relative_to(out_dir))
-    log(f"Wrote {zip_path}")
+    tmp = zip_path.with_suffix(".zip.tmp")
+    start = time.perf_counter()
+    files = {}
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for src, arcname in entries:
+            files[arcname] = _write_member(zf, src, arcname)
+        manifest = {"name": name, "run_dir": str(run_dir), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "files": files}
+        if report is not None:
+            manifest["slim"] = report
+        zf.writestr(f"{name}/manifest.json", json.dumps(manifest, indent=2))
+    os.replace(tmp, zip_path)
+    elapsed = time.perf_counter() - start
+    total = sum(f["bytes"] for f in files.values())
+    log(f"Wrote {zip_path}: {len(files)} files, {total / 1e6:.1f} MB in {elapsed:.2f}s "
+        f"({total / 1e6 / elapsed if elapsed > 0 else 0.0:.0f} MB/s), {zip_path.stat().st_size / 1e6:.1f} MB on disk")
     return str(zip_path)
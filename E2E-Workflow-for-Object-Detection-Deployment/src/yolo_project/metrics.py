@@ -0,0 +1,146 @@
+import inspect
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from .log import log
+
+# Same thresholds Ultralytics uses for validation, so mAP is comparable with model.val
+VAL_CONF = 0.001
+
+def label_path_for(image_path: str) -> Path:
+    """.../images/x.jpg -> .../labels/x.txt (the Ultralytics convention)."""
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    path = str(Path(image_path))
+    return Path(sb.join(path.rsplit(sa, 1)).rsplit(".", 1)[0] + ".txt")
+
+def load_labels(image_path: str, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Ground-truth (xyxy pixel boxes, class ids) for an image of shape (h, w); polygons become their bbox."""
+    h, w = shape[:2]
+    boxes, classes = [], []
+    label = label_path_for(image_path)
+    if label.exists():
+        for line in label.read_text().splitlines():
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            vals = np.asarray(parts[1:], dtype=np.float64)
+            if len(vals) == 4:
+                cx, cy, bw, bh = vals
+                x1, y1, x2, y2 = cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2
+            else:
+                xs, ys = vals[0::2], vals[1::2]
+                x1, y1, x2, y2 = xs.min(), ys.min(), xs.max(), ys.max()
+            boxes.append([x1 * w, y1 * h, x2 * w, y2 * h])
+            classes.append(int(float(parts[0])))
+    return np.asarray(boxes, np.float64).reshape(-1, 4), np.asarray(classes, np.int64)
+
+def _confusion_matrix(names: Dict[int, str]):
+    """Ultralytics ConfusionMatrix for names; returns (matrix, dict_api) across its two constructor APIs."""
+    from ultralytics.utils.metrics import ConfusionMatrix
+
+    if "names" in inspect.signature(ConfusionMatrix).parameters:
+        return ConfusionMatrix(names=names), True
+    return ConfusionMatrix(nc=len(names)), False  # older releases: (nc, conf, iou_thres)
+
+class DetectionEvaluator:
+    """Accumulates detections against YOLO labels and computes P/R/mAP plus the confusion matrix.
+
+    Fed from an ordinary prediction pass (at VAL_CONF), so prediction outputs and validation
+    metrics come from the same inference instead of a second model.val pass. Matching, AP and
+    the confusion matrix are Ultralytics' own (DetectionValidator.match_predictions, ap_per_class,
+    ConfusionMatrix), so the numbers agree with model.val.
+    """
+
+    def __init__(self, names: Dict[int, str], out_dir: str):
+        from ultralytics.models.yolo.detect import DetectionValidator
+
+        self.names = names
+        self.out_dir = Path(out_dir)
+        self.validator = DetectionValidator(save_dir=self.out_dir)
+        self.confusion, self._dict_api = _confusion_matrix(names)
+        self.tp: List[np.ndarray] = []
+        self.conf: List[np.ndarray] = []
+        self.pred_cls: List[np.ndarray] = []
+        self.target_cls: List[np.ndarray] = []
+        self.images = 0
+
+    def update(self, det, gt_boxes: np.ndarray, gt_cls: np.ndarray):
+        """det: (N, 6) tensor of xyxy, conf, cls in original image pixels, sorted by confidence."""
+        import torch
+        from ultralytics.utils.metrics import box_iou
+
+        self.images += 1
+        self.target_cls.append(gt_cls)
+        gt_boxes, gt_cls_t = torch.from_numpy(gt_boxes).to(det), torch.from_numpy(gt_cls).to(det)
+        if self._dict_api:
+            self.confusion.process_batch({"bboxes": det[:, :4], "conf": det[:, 4], "cls": det[:, 5]},
+                                         {"bboxes": gt_boxes, "cls": gt_cls_t})
+        else:
+            self.confusion.process_batch(det if len(det) else None, gt_boxes, gt_cls_t)
+        if not len(det):
+            return
+        if len(gt_cls):
+            tp = self.validator.match_predictions(det[:, 5], gt_cls_t, box_iou(gt_boxes, det[:, :4])).cpu().numpy()
+        else:
+            tp = np.zeros((len(det), self.validator.iouv.numel()), bool)
+        self.tp.append(tp)
+        self.conf.append(det[:, 4].cpu().numpy())
+        self.pred_cls.append(det[:, 5].cpu().numpy())
+
+    def update_result(self, result):
+        """Update from an Ultralytics Results object, reading labels next to result.path."""
+        gt_boxes, gt_cls = load_labels(result.path, result.orig_shape)
+        self.update(result.boxes.data.float(), gt_boxes, gt_cls)
+
+    def compute(self, plot: bool = False) -> dict:
+        """Metrics as model.val reports them; plot=True also writes Ultralytics' PR/F1/P/R curves to out_dir."""
+        from ultralytics.utils.metrics import ap_per_class
+
+        target_cls = np.concatenate(self.target_cls) if self.target_cls else np.zeros(0, np.int64)
+        niou = self.validator.iouv.numel()
+        tp = np.concatenate(self.tp) if self.tp else np.zeros((0, niou), bool)
+        conf = np.concatenate(self.conf) if self.conf else np.zeros(0)
+        pred_cls = np.concatenate(self.pred_cls) if self.pred_cls else np.zeros(0)
+        _, _, p, r, _, ap, classes, *_ = ap_per_class(tp, conf, pred_cls, target_cls, plot=plot,
+                                                      save_dir=self.out_dir, names=self.names)
+        _, n_labels = np.unique(target_cls, return_counts=True)  # same class order as ap_per_class
+        per_class = {self.names.get(int(c), str(c)): {
+            "labels": int(n), "precision": float(pc), "recall": float(rc), "map50": float(a[0]),
+            "map50_95": float(a.mean())} for c, n, pc, rc, a in zip(classes, n_labels, p, r, ap)}
+        return {
+            "images": self.images,
+            "instances": int(len(target_cls)),
+            "precision": float(p.mean()) if len(ap) else 0.0,
+            "recall": float(r.mean()) if len(ap) else 0.0,
+            "map50": float(ap[:, 0].mean()) if len(ap) else 0.0,
+            "map50_95": float(ap.mean()) if len(ap) else 0.0,
+            "per_class": per_class,
+        }
+
+    def save(self) -> dict:
+        """Write metrics.json, confusion matrices and the PR/F1/P/R curves to out_dir; returns the metrics."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        metrics = self.compute(plot=True)
+        plot_kwargs = {} if self._dict_api else {"names": tuple(self.names.values())}
+        for normalize in (False, True):
+            self.confusion.plot(normalize=normalize, save_dir=self.out_dir, **plot_kwargs)
+        (self.out_dir / "metrics.json").write_text(json.dumps(
+            {**metrics, "confusion_matrix": self.confusion.matrix.astype(int).tolist()}, indent=2))
+        log(f"Validation on {metrics['images']} images: P {metrics['precision']:.3f} R {metrics['recall']:.3f} "
+            f"mAP50 {metrics['map50']:.3f} mAP50-95 {metrics['map50_95']:.3f} (saved to {self.out_dir})")
+        return metrics
+
+def evaluate_predictions(results: Iterable, out_dir: str, names: Optional[Dict[int, str]] = None) -> dict:
+    """Consume a stream of Results (e.g. from predict_batched at conf=VAL_CONF) and save validation outputs."""
+    evaluator = None
+    for r in results:
+        if evaluator is None:
+            evaluator = DetectionEvaluator(names or r.names, out_dir)
+        evaluator.update_result(r)
+    if evaluator is None:
+        log("[yellow]Warning:[/yellow] No images were predicted; validation metrics not written.")
+        return {}
+    return evaluator.save()
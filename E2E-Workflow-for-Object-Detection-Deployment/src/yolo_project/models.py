@@ -0,0 +1,79 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .log import log
+
+Key = Tuple[str, Optional[int], Optional[str]]
+
+class ModelRegistry:
+    """Process-wide LRU cache of loaded YOLO models keyed by (resolved path, mtime, task).
+
+    A rewritten weights file has a new mtime, so it is reloaded instead of served stale; the
+    superseded entry for the same path is dropped at that point. Loads and hits are counted so
+    long-lived processes (pipeline runner, server) can verify each file is deserialized once.
+    """
+
+    def __init__(self, capacity: int = 4):
+        self.capacity = max(1, capacity)
+        self._models: "OrderedDict[Key, object]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(weights: str, task: Optional[str] = None) -> Key:
+        path = Path(weights).expanduser()
+        if path.exists():
+            path = path.resolve()
+            return str(path), path.stat().st_mtime_ns, task
+        # Hub names such as "yolo11s.pt" are downloaded by Ultralytics on first use
+        return str(weights), None, task
+
+    def get(self, weights: str, task: Optional[str] = None, cache: bool = True):
+        """Return a loaded model; cache=False always loads a private copy (e.g. for training, which mutates it)."""
+        from ultralytics import YOLO
+
+        key = self.key(weights, task)
+        with self._lock:
+            if cache and key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            model = YOLO(key[0], task=task) if task else YOLO(key[0])
+            self.loads += 1
+            if not cache:
+                return model
+            for stale in [k for k in self._models if k[0] == key[0] and k[1] != key[1]]:
+                del self._models[stale]
+            self._models[key] = model
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return model
+
+    def invalidate(self, weights: Optional[str] = None):
+        """Drop every cached entry for weights (all entries if None)."""
+        with self._lock:
+            if weights is None:
+                self._models.clear()
+                return
+            path = self.key(weights)[0]
+            for k in [k for k in self._models if k[0] == path]:
+                del self._models[k]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"loads": self.loads, "hits": self.hits, "evictions": self.evictions, "cached": len(self._models)}
+
+registry = ModelRegistry(int(os.getenv("YOLO_MODEL_CACHE", "4")))
+
+def get_model(weights: str, task: Optional[str] = None, cache: bool = True):
+    return registry.get(weights, task=task, cache=cache)
+
+def log_registry_stats():
+    s = registry.stats()
+    log(f"Model registry: {s['loads']} loads, {s['hits']} hits, {s['evictions']} evictions, {s['cached']} cached")
@@ -1,36 +1,153 @@
-
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import csv
-import matplotlib.pyplot as plt
-from ultralytics import YOLO
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import yaml
+# Figure (not pyplot) renders through Agg without global state, so plots are safe off the main thread
+from matplotlib.figure import Figure
 from .log import log
+from .telemetry import TELEMETRY_FILE, load_telemetry
+
+# (results.csv column, label); columns are matched after stripping the "(B)" box-task suffix
+PANELS: List[Tuple[str, str]] = [
+    ("metrics/mAP50", "mAP50"),
+    ("metrics/mAP50-95", "mAP50-95"),
+    ("metrics/precision", "Precision"),
+    ("metrics/recall", "Recall"),
+    ("train/box_loss", "train/box_loss"),
+    ("train/cls_loss", "train/cls_loss"),
+    ("train/dfl_loss", "train/dfl_loss"),
+    ("val/box_loss", "val/box_loss"),
+    ("val/cls_loss", "val/cls_loss"),
+    ("val/dfl_loss", "val/dfl_loss"),
+]
+
+def _column_name(header: str) -> str:
+    name = header.strip()
+    return name[:-3] if name.endswith("(B)") else name
+
+def _parse_rows(header: List[str], text: str) -> Dict[str, np.ndarray]:
+    """Parse complete CSV lines into one float array per column (non-numeric cells become NaN)."""
+    if not text.strip():
+        return {c: np.zeros(0) for c in header}
+    try:
+        data = np.loadtxt(io.StringIO(text), delimiter=",", dtype=np.float64, ndmin=2)
+    except ValueError:
+        # Blank or non-numeric cells: the slower parser maps them to NaN
+        data = np.atleast_2d(np.genfromtxt(io.StringIO(text), delimiter=",", dtype=np.float64))
+    return {c: data[:, i] for i, c in enumerate(header) if i < data.shape[1]}
+
+def load_results_csv(csv_path: Path) -> Dict[str, np.ndarray]:
+    """Vectorized results.csv loader: {column: float array}."""
+    with Path(csv_path).open("r", newline="") as f:
+        header = [_column_name(h) for h in f.readline().split(",")]
+        return _parse_rows(header, f.read())
+
+class ResultsTail:
+    """Incremental reader for a results.csv that is still being written.
+
+    poll() returns only rows appended since the last call (complete lines only); if the file is
+    truncated or replaced, e.g. by a new run, it starts over and sets reset.
+    """
+
+    def __init__(self, csv_path: Path):
+        self.csv_path = Path(csv_path)
+        self.header: Optional[List[str]] = None
+        self.offset = 0
+        self.reset = False
+
+    def poll(self) -> Dict[str, np.ndarray]:
+        self.reset = False
+        if not self.csv_path.exists():
+            return {}
+        size = self.csv_path.stat().st_size
+        if size < self.offset:
+            self.header, self.offset, self.reset = None, 0, True
+        if size == self.offset:
+            return {}
+        with self.csv_path.open("rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return {}
+        self.offset += end
+        lines = chunk[:end].decode("utf-8")
+        if self.header is None:
+            first, _, lines = lines.partition("\n")
+            self.header = [_column_name(h) for h in first.split(",")]
+        return _parse_rows(self.header, lines)
+
+def _epochs(data: Dict[str, np.ndarray]) -> np.ndarray:
+    n = len(next(iter(data.values()))) if data else 0
+    return data.get("epoch", np.arange(n, dtype=np.float64))
+
+def _style(ax, label: str):
+    ax.set_title(f"{label} vs Epoch")
+    ax.set_xlabel("Epoch")
+    ax.set_ylabel(label)
+    ax.grid(True, linestyle="--", alpha=0.5)
+
+def _render_single(x: np.ndarray, y: np.ndarray, label: str, out_file: str, dpi: int = 150) -> str:
+    """One metric per file; top-level so it can run in a worker process."""
+    fig = Figure()
+    # Fixed margins: tight_layout needs an extra draw and roughly doubles the render time
+    fig.subplots_adjust(left=0.15, right=0.96, bottom=0.11, top=0.92)
+    ax = fig.add_subplot()
+    ax.plot(x, y)
+    _style(ax, label)
+    fig.savefig(out_file, dpi=dpi)
+    return out_file
+
+class CurvesFigure:
+    """Multi-panel training-curves figure whose lines are extended in place (used by watch mode)."""
 
-def _read_results_csv(csv_path: Path):
-    rows = []
-    with csv_path.open("r", newline="") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            # Convert numeric fields if possible
-            for k, v in list(r.items()):
-                try:
-                    r[k] = float(v)
-                except Exception:
-                    pass
-            rows.append(r)
-    return rows
-
-def _plot_simple(x, y, xlabel, ylabel, title, out_file):
-    plt.figure()
-    plt.plot(x, y)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.title(title)
-    plt.grid(True, linestyle="--", alpha=0.5)
-    plt.tight_layout()
-    plt.savefig(out_file, dpi=150)
-    plt.close()
-
-def generate_training_plots(run_dir: str, out_dir: str):
+    def __init__(self, panels: List[Tuple[str, str]], dpi: int = 100):
+        cols = min(5, len(panels))
+        rows = -(-len(panels) // cols)
+        self.dpi = dpi
+        self.fig = Figure(figsize=(4 * cols, 3.2 * rows))
+        self.fig.subplots_adjust(left=0.05, right=0.99, bottom=0.16 / rows, top=1 - 0.07 / rows, wspace=0.35,
+                                 hspace=0.5)
+        self.lines = {}
+        self.x = np.zeros(0)
+        self.y: Dict[str, np.ndarray] = {}
+        for i, (col, label) in enumerate(panels):
+            ax = self.fig.add_subplot(rows, cols, i + 1)
+            _style(ax, label)
+            (self.lines[col],) = ax.plot([], [], marker=".", markersize=3)
+            self.y[col] = np.zeros(0)
+
+    def extend(self, data: Dict[str, np.ndarray]):
+        """Append new rows to every line and rescale the axes."""
+        new_x = _epochs(data)
+        if not len(new_x):
+            return
+        self.x = np.concatenate([self.x, new_x])
+        for col, line in self.lines.items():
+            self.y[col] = np.concatenate([self.y[col], data.get(col, np.full(len(new_x), np.nan))])
+            line.set_data(self.x, self.y[col])
+            line.axes.relim()
+            line.axes.autoscale_view()
+
+    def save(self, out_file: Path):
+        # Write then rename so a viewer never sees a half-written PNG
+        tmp = Path(out_file).with_suffix(".tmp.png")
+        self.fig.savefig(tmp, dpi=self.dpi)
+        os.replace(tmp, out_file)
+
+def generate_training_plots(run_dir: str, out_dir: str, mode: str = "separate", workers: int = 0, dpi: int = 150):
+    """Plot results.csv curves.
+
+    mode="separate" (default) writes one <metric>_vs_epoch.png per metric, rendered in parallel on a
+    pool of `workers` processes (0: one per CPU, capped at the number of plots). mode="panel" draws
+    every metric into a single training_curves.png in one savefig, in this process; `workers` is
+    not used.
+    """
     run_dir = Path(run_dir)
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -38,37 +155,105 @@ def generate_training_plots(run_dir: str, out_dir: str):
     if not csv_path.exists():
         log(f"[yellow]Warning:[/yellow] {csv_path} not found; skipping training plots.")
         return
-    rows = _read_results_csv(csv_path)
-    if not rows:
+    data = load_results_csv(csv_path)
+    epochs = _epochs(data)
+    if not len(epochs):
         log(f"[yellow]Warning:[/yellow] {csv_path} empty; skipping.")
         return
-    epochs = [int(r.get("epoch", i)) for i, r in enumerate(rows)]
-
-    def get(col):
-        vals = []
-        for r in rows:
-            vals.append(r.get(col))
-        return vals
-
-    # mAP, precision, recall vs epoch
-    for col, label in [
-        ("metrics/mAP50", "mAP50"),
-        ("metrics/mAP50-95", "mAP50-95"),
-        ("metrics/precision", "Precision"),
-        ("metrics/recall", "Recall"),
-    ]:
-        y = get(col)
-        if all(isinstance(v, (int, float)) for v in y):
-            _plot_simple(epochs, y, "Epoch", label, f"{label} vs Epoch", out_dir / f"{label.replace('/', '_')}_vs_epoch.png")
-
-    # Loss curves
-    for col in ["train/box_loss", "train/cls_loss", "train/dfl_loss",
-                "val/box_loss", "val/cls_loss", "val/dfl_loss"]:
-        y = get(col)
-        if all(isinstance(v, (int, float)) for v in y):
-            _plot_simple(epochs, y, "Epoch", col, f"{col} vs Epoch", out_dir / f"{col.replace('/', '_')}_vs_epoch.png")
-
-def run_validation_and_confusion(weights: str, data_yaml: str, project: str, name: str = "val_plots"):
-    model = YOLO(weights)
-    log("Running validation with plots=True to generate confusion matrix and curves.")
-    model.val(data=data_yaml, plots=True, project=project, name=name)
+    panels = [(col, label) for col, label in PANELS if col in data and not np.isnan(data[col]).all()]
+    if not panels:
+        log(f"[yellow]Warning:[/yellow] No known metric columns in {csv_path}; skipping.")
+        return
+
+    start = time.perf_counter()
+    if mode == "panel":
+        fig = CurvesFigure(panels, dpi=dpi)
+        fig.extend(data)
+        fig.save(out_dir / "training_curves.png")
+        written = 1
+    elif mode == "separate":
+        jobs = [(epochs, data[col], label, str(out_dir / f"{label.replace('/', '_')}_vs_epoch.png"), dpi)
+                for col, label in panels]
+        workers = min(len(jobs), workers or os.cpu_count() or 1)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                written = len(list(pool.map(_render_single, *zip(*jobs))))
+        else:
+            written = len([_render_single(*job) for job in jobs])
+    else:
+        raise ValueError(f"Unknown plot mode '{mode}' (expected 'panel' or 'separate')")
+    log(f"Wrote {written} plot file(s) for {len(panels)} metrics to {out_dir} in {time.perf_counter() - start:.2f}s")
+    plot_telemetry(run_dir, out_dir, dpi=dpi)
+
+def plot_telemetry(run_dir: str, out_dir: str, dpi: int = 150):
+    """training_telemetry.png from <run>/telemetry.jsonl: throughput, dataloader wait share, epoch time, RSS."""
+    records = load_telemetry(Path(run_dir) / TELEMETRY_FILE)
+    if not records:
+        return
+    x = np.array([r["epoch"] for r in records], dtype=np.float64)
+    def col(key):
+        return np.array([np.nan if r.get(key) is None else r[key] for r in records], dtype=np.float64)
+    panels = [("images/s", [("train", col("images_per_s"))]),
+              ("dataloader wait %", [("wait", 100 * col("dataloader_wait_frac"))]),
+              ("seconds", [("epoch", col("epoch_time_s")), ("val", col("val_time_s"))]),
+              ("MB", [("trainer RSS", col("rss_mb")), ("workers RSS", col("workers_rss_mb"))]
+               + ([("trainer peak RSS", col("peak_rss_mb"))] if any("peak_rss_mb" in r for r in records) else []))]
+    fig = Figure(figsize=(16, 3.4))
+    fig.subplots_adjust(left=0.05, right=0.99, bottom=0.16, top=0.88, wspace=0.3)
+    for i, (label, series) in enumerate(panels):
+        ax = fig.add_subplot(1, len(panels), i + 1)
+        for name, y in series:
+            ax.plot(x, y, marker=".", markersize=3, label=name)
+        _style(ax, label)
+        if len(series) > 1:
+            ax.legend(fontsize=7)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    fig.savefig(Path(out_dir) / "training_telemetry.png", dpi=dpi)
+
+def _expected_epochs(run_dir: Path) -> Optional[int]:
+    args = run_dir / "args.yaml"
+    if not args.exists():
+        return None
+    try:
+        return int(yaml.safe_load(args.read_text()).get("epochs"))
+    except (TypeError, ValueError, AttributeError, yaml.YAMLError):
+        return None
+
+def watch_training_plots(run_dir: str, out_dir: str, interval: float = 10.0, dpi: int = 100,
+                         idle_timeout: float = 0.0):
+    """Tail results.csv during training and refresh training_curves.png when epochs are appended.
+
+    Only the new rows are parsed and appended to the existing lines, and the figure is re-saved
+    only when something changed. Stops once the epoch count in args.yaml is reached, after
+    idle_timeout seconds without new rows (0: never), or on Ctrl+C.
+    """
+    run_dir = Path(run_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_file = out_dir / "training_curves.png"
+    tail = ResultsTail(run_dir / "results.csv")
+    fig: Optional[CurvesFigure] = None
+    last_change = time.monotonic()
+    log(f"Watching {tail.csv_path} every {interval:g}s, writing {out_file} (Ctrl+C to stop)")
+    try:
+        while True:
+            new = tail.poll()
+            if tail.reset:
+                fig = None
+            if new and len(_epochs(new)):
+                if fig is None:
+                    fig = CurvesFigure([(c, l) for c, l in PANELS if c in tail.header], dpi=dpi)
+                fig.extend(new)
+                fig.save(out_file)
+                last_change = time.monotonic()
+                expected = _expected_epochs(run_dir)
+                log(f"{len(fig.x)}{f'/{expected}' if expected else ''} epochs plotted")
+                if expected and len(fig.x) >= expected:
+                    log("Training finished; stopping watch.")
+                    return
+            elif idle_timeout and time.monotonic() - last_change > idle_timeout:
+                log(f"No new rows for {idle_timeout:g}s; stopping watch.")
+                return
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        log("Watch stopped")
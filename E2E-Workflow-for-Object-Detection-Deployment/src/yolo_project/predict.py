@@ -1,12 +1,152 @@
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from ultralytics import YOLO
+from typing import Iterator, List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
 from .log import log
+from .models import get_model
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
 
 def predict(weights: str, source: str, save: bool = True, imgsz: int = 640, project: str = "runs", name: str = "predict"):
     weights = Path(weights).expanduser().resolve()
     project = Path(project).expanduser().resolve()
-    model = YOLO(str(weights))
+    model = get_model(str(weights))
     log(f"Running prediction on {source}")
     r = model.predict(source=source, save=save, imgsz=imgsz, project=str(project), name=name, task="detect")
     log("Prediction complete")
     return r
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0.0 if the platform does not expose it)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # bytes on macOS, KB on Linux
+    except ImportError:
+        try:
+            import psutil
+            return getattr(psutil.Process().memory_info(), "peak_wset", 0) / 1e6
+        except ImportError:
+            return 0.0
+
+def list_images(source: str) -> List[Path]:
+    src = Path(source).expanduser()
+    if src.is_file():
+        return [src]
+    return sorted(p for p in src.rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+
+def letterbox(img: np.ndarray, size: int = 640, color=(114, 114, 114)):
+    """Resize keeping aspect ratio and pad to size x size, centered (same geometry as Ultralytics)."""
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    nh, nw = int(round(h * r)), int(round(w * r))
+    if (nh, nw) != (h, w):
+        img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    return cv2.copyMakeBorder(img, top, size - nh - top, left, size - nw - left, cv2.BORDER_CONSTANT, value=color)
+
+def _load(path: Path, imgsz: int):
+    im0 = cv2.imread(str(path))
+    if im0 is None:
+        return path, None, None
+    return path, im0, letterbox(im0, imgsz)
+
+def _prefetch(paths: List[Path], imgsz: int, workers: int, prefetch: int) -> Iterator:
+    """Decode + letterbox on a thread pool; a bounded queue keeps at most `prefetch` images in flight."""
+    q: "queue.Queue" = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    def producer():
+        for p in paths:
+            fut = pool.submit(_load, p, imgsz)
+            while not stop.is_set():
+                try:
+                    q.put(fut, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+        q.put(None)
+
+    threading.Thread(target=producer, daemon=True).start()
+    try:
+        while True:
+            fut = q.get()
+            if fut is None:
+                return
+            yield fut.result()
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def predict_batched(weights: str, source: Union[str, Sequence[Path]], save: bool = True, imgsz: int = 640, project: str = "runs",
+                    name: str = "predict", batch_size: int = 16, workers: int = 4, prefetch: int = 64,
+                    conf: float = 0.25, save_conf: Optional[float] = None) -> Iterator:
+    """Stream ultralytics Results for every image under source (a file, a directory or a list of image
+    paths), inferring `batch_size` images at a time.
+
+    Images are decoded and letterboxed in a background thread pool; memory stays bounded by the
+    prefetch queue instead of growing with the number of images. Boxes are mapped back to the
+    original image, so Results.plot()/save work on full-resolution frames. With save_conf, saved
+    images only draw boxes at or above it while the yielded Results keep everything down to conf
+    (used to validate from the same pass).
+    """
+    from ultralytics.engine.results import Results
+    from ultralytics.utils import ops
+
+    weights = Path(weights).expanduser().resolve()
+    out_dir = Path(project).expanduser().resolve() / name
+    if save:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    model = get_model(str(weights))
+    paths = list_images(source) if isinstance(source, str) else [Path(p) for p in source]
+    # Mirror the source tree so same-named images in different subdirectories do not overwrite each other
+    root = Path(os.path.commonpath([p.parent for p in paths])) if paths else out_dir
+    origin = source if isinstance(source, str) else "image list"
+    log(f"Running batched prediction on {len(paths)} images from {origin} (batch={batch_size}, workers={workers})")
+
+    start = time.perf_counter()
+    n = 0
+    batch = []
+
+    def flush():
+        results = model.predict(source=[lb for _, _, lb in batch], imgsz=imgsz, conf=conf, verbose=False)
+        for (path, im0, lb), r in zip(batch, results):
+            data = r.boxes.data.clone()
+            if len(data):
+                data[:, :4] = ops.scale_boxes(lb.shape[:2], data[:, :4], im0.shape)
+            res = Results(orig_img=im0, path=str(path), names=model.names, boxes=data)
+            res.speed = r.speed
+            if save:
+                shown = res if save_conf is None else res[res.boxes.conf >= save_conf]
+                dest = out_dir / path.relative_to(root)
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                cv2.imwrite(str(dest), shown.plot())
+            yield res
+        batch.clear()
+
+    try:
+        for path, im0, lb in _prefetch(paths, imgsz, workers, prefetch):
+            if im0 is None:
+                log(f"[yellow]Warning:[/yellow] Could not read {path}")
+                continue
+            batch.append((path, im0, lb))
+            if len(batch) >= batch_size:
+                n += len(batch)
+                yield from flush()
+        if batch:
+            n += len(batch)
+            yield from flush()
+    finally:
+        elapsed = time.perf_counter() - start
+        log(f"Prediction complete: {n} images in {elapsed:.2f}s "
+            f"({n / elapsed if elapsed > 0 else 0.0:.1f} images/s), peak RSS {peak_rss_mb():.0f} MB")
@@ -1,47 +1,206 @@
+import hashlib
+import json
 import os
 import random
 import shutil
+import threading
+import time
 import zipfile
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from pathlib import Path, PurePosixPath
+import cv2
 import yaml
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 from .log import log
 
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+LINK_MODES = ("copy", "hardlink", "symlink", "reflink")
+RESIZE_MAP_NAME = "resize_map.json"
+MANIFEST_NAME = "manifest.json"
+
 def unzip_to(src_zip: Path, dst_dir: Path) -> Path:
     dst_dir.mkdir(parents=True, exist_ok=True)
     with zipfile.ZipFile(src_zip, "r") as zf:
         zf.extractall(dst_dir)
+    return find_dataset_root(dst_dir)
+
+def find_dataset_root(base_dir: Path) -> Path:
     # Try to find the root containing images/ and labels/
-    candidate = dst_dir
-    subdirs = [p for p in dst_dir.rglob("*") if p.is_dir()]
-    for d in [dst_dir] + subdirs:
+    subdirs = [p for p in base_dir.rglob("*") if p.is_dir()]
+    for d in [base_dir] + subdirs:
         if (d / "images").exists() and (d / "labels").exists():
             return d
-    return dst_dir
+    return base_dir
+
+def _reflink(src: Path, dst: Path):
+    import fcntl  # POSIX only; ImportError falls back to a copy
+    ficlone = 0x40049409  # FICLONE ioctl (btrfs, XFS, bcachefs, ...)
+    with src.open("rb") as fsrc, dst.open("wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), ficlone, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+_fallback_warned = set()
+
+def place_file(src: Path, dst: Path, link_mode: str = "copy"):
+    """Materialize src at dst by copying, hard-linking, symlinking or reflinking it."""
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    if link_mode == "copy":
+        shutil.copy2(src, dst)
+        return
+    try:
+        if link_mode == "hardlink":
+            os.link(src, dst)
+        elif link_mode == "symlink":
+            dst.symlink_to(src.resolve())
+        elif link_mode == "reflink":
+            _reflink(src, dst)
+        else:
+            raise ValueError(f"Unknown link_mode {link_mode!r}; expected one of {LINK_MODES}")
+    except (OSError, ImportError) as e:
+        # Cross-device links, filesystems without reflink support, Windows without symlink rights, ...
+        if link_mode not in _fallback_warned:
+            _fallback_warned.add(link_mode)
+            log(f"[yellow]Warning:[/yellow] {link_mode} failed ({e}); falling back to copy")
+        if dst.exists():
+            dst.unlink()
+        shutil.copy2(src, dst)
+
+def downscale_image(src: str, dst: str, max_side: int, jpeg_quality: int = 95) -> Optional[Tuple[int, int, int, int]]:
+    """Write src to dst with its long side capped at max_side; returns (w0, h0, w, h), None if unreadable.
+
+    Images already within max_side are not re-encoded and dst is left to the caller. Normalized
+    YOLO labels stay valid because the aspect ratio is kept. Decoding applies EXIF orientation
+    like Ultralytics does, so the written pixels are the ones training would have seen, only smaller.
+    """
+    im = cv2.imread(src)
+    if im is None:
+        return None
+    h0, w0 = im.shape[:2]
+    scale = max_side / max(h0, w0)
+    if scale >= 1:
+        return w0, h0, w0, h0
+    w, h = max(1, round(w0 * scale)), max(1, round(h0 * scale))
+    im = cv2.resize(im, (w, h), interpolation=cv2.INTER_AREA)
+    dst = Path(dst)
+    # Same suffix so cv2 picks the encoder; the rename also makes in-place resizes atomic
+    tmp = dst.with_name(f".{dst.stem}.tmp{dst.suffix}")
+    params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if dst.suffix.lower() in (".jpg", ".jpeg") else []
+    if not cv2.imwrite(str(tmp), im, params):
+        raise OSError(f"Could not write {dst}")
+    os.replace(tmp, dst)
+    return w0, h0, w, h
+
+def downscale_images(jobs: List[Tuple[Path, Path]], max_side: int, jpeg_quality: int = 95, workers: int = 8,
+                     link_mode: str = "copy") -> Dict[Path, Dict]:
+    """Cap the long side of every (src, dst) image at max_side on a pool of `workers` processes.
 
-def split_dataset(src_root: Path, dst_root: Path, train_pct: float = 0.9) -> Tuple[Path, Path]:
+    src may equal dst (resize in place). Images that are already small enough, or unreadable, are
+    placed with link_mode. Returns {dst: {"original": [w, h], "resized": [w, h]}}.
+    """
+    t0 = time.perf_counter()
+    sizes: Dict[Path, Dict] = {}
+    resized = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = pool.map(downscale_image, [str(s) for s, _ in jobs], [str(d) for _, d in jobs], repeat(max_side),
+                           repeat(jpeg_quality), chunksize=max(1, len(jobs) // (max(1, workers) * 8)))
+        for (src, dst), res in zip(jobs, results):
+            if res is None:
+                log(f"[yellow]Warning:[/yellow] Could not read {src}; kept as is")
+            else:
+                sizes[dst] = {"original": list(res[:2]), "resized": list(res[2:])}
+            if res is not None and res[:2] != res[2:]:
+                resized += 1
+            elif src != dst:
+                place_file(src, dst, link_mode)  # unreadable or already within max_side
+    _log_phase(f"resize ({resized}/{len(jobs)} images downscaled to max side {max_side}, {workers} processes)", t0)
+    return sizes
+
+def save_resize_map(out_dir: Path, sizes: Dict[Path, Dict], max_side: int, jpeg_quality: int, merge: bool = False):
+    """Record original -> resized size of every image in out_dir/resize_map.json (paths relative to out_dir)."""
+    path = out_dir / RESIZE_MAP_NAME
+    images: Dict[str, Dict] = {}
+    if merge and path.exists():
+        with path.open("r", encoding="utf-8") as f:
+            images = json.load(f).get("images", {})
+    images.update({dst.relative_to(out_dir).as_posix(): size for dst, size in sizes.items()})
+    images = {rel: size for rel, size in images.items() if (out_dir / rel).exists()}
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump({"max_side": max_side, "jpeg_quality": jpeg_quality, "images": images}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def drop_manifest(dst_root: Path):
+    """Remove the incremental manifest; its recorded splits no longer match after a random re-split."""
+    path = dst_root / MANIFEST_NAME
+    if path.exists():
+        path.unlink()
+
+def clear_splits(dst_root: Path):
+    """Remove the train/validation images and labels of a previous split so a re-split cannot leak files."""
+    for split in ("train", "validation"):
+        for sub in ("images", "labels"):
+            path = dst_root / split / sub
+            if path.is_symlink():
+                path.unlink()
+            elif path.exists():
+                shutil.rmtree(path)
+
+def split_dataset(src_root: Path, dst_root: Path, train_pct: float = 0.9, link_mode: str = "copy",
+                  list_files: bool = False, max_side: int = 0, jpeg_quality: int = 95,
+                  workers: int = 8) -> Tuple[Path, Path]:
+    """Split src_root into train/validation under dst_root.
+
+    With list_files=True nothing is copied: train.txt/validation.txt list the absolute source
+    image paths and are returned instead of the split directories. With max_side > 0 larger
+    images are downscaled while they are written (see downscale_images) and the sizes are
+    recorded in dst_root/resize_map.json.
+    """
     assert 0.0 < train_pct < 1.0, "train_pct must be in (0,1)"
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link_mode {link_mode!r}; expected one of {LINK_MODES}")
     # Create target layout
     train_images = dst_root / "train" / "images"
     train_labels = dst_root / "train" / "labels"
     val_images = dst_root / "validation" / "images"
     val_labels = dst_root / "validation" / "labels"
-    for p in [train_images, train_labels, val_images, val_labels]:
-        p.mkdir(parents=True, exist_ok=True)
-
     # Enumerate images and matching labels
     image_dir = src_root / "images"
     label_dir = src_root / "labels"
     if not image_dir.exists() or not label_dir.exists():
         raise FileNotFoundError("Expected 'images' and 'labels' subdirs under the dataset root")
 
-    images = sorted([p for p in image_dir.rglob("*") if p.suffix.lower() in {".jpg", ".jpeg", ".png", ".bmp"}])
+    images = sorted([p for p in image_dir.rglob("*") if p.suffix.lower() in IMAGE_EXTS])
     if not images:
         raise FileNotFoundError("No images found under images/")
 
     random.shuffle(images)
     split_idx = int(len(images) * train_pct)
     train_set, val_set = images[:split_idx], images[split_idx:]
+    drop_manifest(dst_root)
+    if not list_files:
+        # Files from an earlier split with another train_pct would otherwise end up in both splits
+        clear_splits(dst_root)
+        for p in [train_images, train_labels, val_images, val_labels]:
+            p.mkdir(parents=True, exist_ok=True)
+
+    if list_files:
+        if max_side:
+            log("[yellow]Warning:[/yellow] list_files reads the source images in place; max_side is ignored")
+        # Ultralytics resolves labels by swapping images/ -> labels/ in each listed path
+        dst_root.mkdir(parents=True, exist_ok=True)
+        outputs = []
+        for name, subset in (("train", train_set), ("validation", val_set)):
+            list_path = dst_root / f"{name}.txt"
+            list_path.write_text("".join(f"{p.resolve()}\n" for p in subset), encoding="utf-8")
+            outputs.append(list_path)
+        for img in images:
+            if not (label_dir / img.relative_to(image_dir).with_suffix(".txt")).exists():
+                log(f"[yellow]Warning:[/yellow] Missing label for {img}")
+        return outputs[0], outputs[1]
+
+    resize_jobs: List[Tuple[Path, Path]] = []
 
     def move_pair(img_path: Path, dest_img_dir: Path, dest_lbl_dir: Path):
         rel = img_path.relative_to(image_dir)
@@ -49,14 +208,17 @@ def split_dataset(src_root: Path, dst_root: Path, train_pct: float = 0.9) -> Tup
         lbl_src = label_dir / lbl_rel
         dest_img_dir.mkdir(parents=True, exist_ok=True)
         dest_lbl_dir.mkdir(parents=True, exist_ok=True)
-        # Copy images and labels, preserve relative structure
+        # Copy (or link) images and labels, preserve relative structure
         dest_img_path = dest_img_dir / rel
         dest_lbl_path = dest_lbl_dir / lbl_rel
         dest_img_path.parent.mkdir(parents=True, exist_ok=True)
         dest_lbl_path.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(img_path, dest_img_path)
+        if max_side:
+            resize_jobs.append((img_path, dest_img_path))
+        else:
+            place_file(img_path, dest_img_path, link_mode)
         if lbl_src.exists():
-            shutil.copy2(lbl_src, dest_lbl_path)
+            place_file(lbl_src, dest_lbl_path, link_mode)
         else:
             log(f"[yellow]Warning:[/yellow] Missing label for {img_path}")
 
@@ -64,6 +226,11 @@ def split_dataset(src_root: Path, dst_root: Path, train_pct: float = 0.9) -> Tup
         move_pair(img, train_images, train_labels)
     for img in val_set:
         move_pair(img, val_images, val_labels)
+    if max_side:
+        sizes = downscale_images(resize_jobs, max_side, jpeg_quality=jpeg_quality, workers=workers, link_mode=link_mode)
+        save_resize_map(dst_root, sizes, max_side, jpeg_quality)
+    elif (dst_root / RESIZE_MAP_NAME).exists():
+        (dst_root / RESIZE_MAP_NAME).unlink()  # every image was just placed at full size
 
     return dst_root / "train", dst_root / "validation"
 
@@ -73,39 +240,367 @@ def ensure_classes_txt(src_root: Path) -> Path:
         raise FileNotFoundError("classes.txt not found in dataset root; create it with one class name per line.")
     return classes
 
-def write_data_yaml(out_path: Path, dataset_root: Path, classes_file: Path):
+def write_data_yaml(out_path: Path, dataset_root: Path, classes_file: Path, list_files: bool = False):
     with classes_file.open("r", encoding="utf-8") as f:
         names = [line.strip() for line in f if line.strip()]
     data = {
         "path": str(dataset_root.resolve()),
-        "train": "train/images",
-        "val": "validation/images",
+        "train": "train.txt" if list_files else "train/images",
+        "val": "validation.txt" if list_files else "validation/images",
         "nc": len(names),
         "names": names,
     }
     with out_path.open("w", encoding="utf-8") as f:
         yaml.safe_dump(data, f, sort_keys=False)
 
-def prepare_from_zip(zip_path: str, out_dir: str, train_pct: float = 0.9) -> str:
+def index_zip(names: List[str]) -> Tuple[str, List[Tuple[str, Optional[str]]], Optional[str]]:
+    """Locate the dataset root inside a zip listing without extracting anything.
+
+    Returns the root prefix, (image, label-or-None) member pairs and the classes.txt member.
+    """
+    members = {n for n in names if not n.endswith("/")}
+    # Candidate roots are prefixes that contain an images/ directory; keep the shallowest one with labels/
+    roots = set()
+    for n in members:
+        parts = n.split("/")
+        for i, part in enumerate(parts[:-1]):
+            if part == "images":
+                roots.add("/".join(parts[:i]))
+    label_roots = set()
+    for n in members:
+        parts = n.split("/")
+        for i, part in enumerate(parts[:-1]):
+            if part == "labels":
+                label_roots.add("/".join(parts[:i]))
+    candidates = sorted(roots & label_roots, key=lambda r: (r.count("/") if r else -1, r))
+    root = candidates[0] if candidates else ""
+    prefix = f"{root}/" if root else ""
+
+    pairs = []
+    for n in sorted(members):
+        if not n.startswith(f"{prefix}images/"):
+            continue
+        rel = PurePosixPath(n[len(prefix) + len("images/"):])
+        if rel.suffix.lower() not in IMAGE_EXTS or ".." in rel.parts:
+            continue
+        lbl = f"{prefix}labels/{rel.with_suffix('.txt')}"
+        pairs.append((n, lbl if lbl in members else None))
+    classes = f"{prefix}classes.txt"
+    return root, pairs, classes if classes in members else None
+
+def _extract_members(zip_path: Path, jobs: List[Tuple[str, Path]], workers: int = 8,
+                     digests: Optional[Dict[str, str]] = None) -> int:
+    """Extract (member, destination) jobs with a bounded thread pool; returns bytes written.
+
+    If digests is given it is filled with the SHA-256 of every extracted member, computed while writing.
+    """
+    # One ZipFile handle per thread so decompression is not serialized on a shared file position
+    local = threading.local()
+    handles = []
+    lock = threading.Lock()
+
+    def handle() -> zipfile.ZipFile:
+        zf = getattr(local, "zf", None)
+        if zf is None:
+            zf = local.zf = zipfile.ZipFile(zip_path, "r")
+            with lock:
+                handles.append(zf)
+        return zf
+
+    def extract(job) -> int:
+        member, dest = job
+        zf = handle()
+        with zf.open(member) as src, dest.open("wb") as dst:
+            if digests is None:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            else:
+                h = hashlib.sha256()
+                for chunk in iter(lambda: src.read(1 << 20), b""):
+                    h.update(chunk)
+                    dst.write(chunk)
+                digests[member] = h.hexdigest()
+        return zf.getinfo(member).file_size
+
+    for parent in {dest.parent for _, dest in jobs}:
+        parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return sum(pool.map(extract, jobs))
+    finally:
+        for zf in handles:
+            zf.close()
+
+def _log_phase(name: str, start: float, nbytes: Optional[int] = None):
+    msg = f"Phase {name}: {time.perf_counter() - start:.2f}s"
+    if nbytes is not None:
+        msg += f", {nbytes / 1e6:.1f} MB written"
+    log(msg)
+
+def prepare_from_zip_streaming(zip_path: str, out_dir: str, train_pct: float = 0.9, workers: int = 8,
+                               max_side: int = 0, jpeg_quality: int = 95) -> str:
+    """Split a dataset zip without an intermediate extraction: members go straight to train/ or validation/.
+
+    With max_side > 0 extracted images are then downscaled in place (see downscale_images).
+    """
+    assert 0.0 < train_pct < 1.0, "train_pct must be in (0,1)"
     zip_path = Path(zip_path).expanduser().resolve()
     out_dir = Path(out_dir).expanduser().resolve()
-    work_dir = out_dir
-    tmp_dir = out_dir / "_unzipped"
-    tmp_dir.mkdir(parents=True, exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
 
-    log(f"Unzipping {zip_path} -> {tmp_dir}")
-    src_root = unzip_to(zip_path, tmp_dir)
+    t0 = time.perf_counter()
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        root, pairs, classes_member = index_zip(zf.namelist())
+        if classes_member is None:
+            raise FileNotFoundError("classes.txt not found in dataset root; create it with one class name per line.")
+        if not pairs:
+            raise FileNotFoundError("No images found under images/")
+        classes_file = out_dir / "classes.txt"
+        classes_file.write_bytes(zf.read(classes_member))
+    log(f"Detected dataset root: {root or '<zip root>'} ({len(pairs)} images)")
+    _log_phase("index", t0)
+
+    t0 = time.perf_counter()
+    random.shuffle(pairs)
+    split_idx = int(len(pairs) * train_pct)
+    jobs = []
+    prefix = f"{root}/" if root else ""
+    for i, (img, lbl) in enumerate(pairs):
+        split_dir = out_dir / ("train" if i < split_idx else "validation")
+        rel = img[len(prefix) + len("images/"):]
+        jobs.append((img, split_dir / "images" / rel))
+        if lbl is not None:
+            jobs.append((lbl, split_dir / "labels" / lbl[len(prefix) + len("labels/"):]))
+        else:
+            log(f"[yellow]Warning:[/yellow] Missing label for {img}")
+    clear_splits(out_dir)
+    drop_manifest(out_dir)
+    for split in ("train", "validation"):
+        for sub in ("images", "labels"):
+            (out_dir / split / sub).mkdir(parents=True, exist_ok=True)
+    _log_phase("split", t0)
+
+    t0 = time.perf_counter()
+    nbytes = _extract_members(zip_path, jobs, workers=workers)
+    _log_phase(f"extract ({len(jobs)} files, {workers} workers)", t0, nbytes)
+    if max_side:
+        images = [(dest, dest) for _, dest in jobs if dest.suffix.lower() in IMAGE_EXTS]
+        save_resize_map(out_dir, downscale_images(images, max_side, jpeg_quality=jpeg_quality, workers=workers),
+                        max_side, jpeg_quality)
+
+    t0 = time.perf_counter()
+    data_yaml = out_dir / "data.yaml"
+    write_data_yaml(data_yaml, out_dir, classes_file)
+    _log_phase("data.yaml", t0)
+    log(f"Wrote {data_yaml}")
+    return str(data_yaml)
+
+def _stable_split(rel: str, train_pct: float) -> str:
+    # Hash of the relative path, so a new file lands in the same split on every run and every machine
+    bucket = int(hashlib.sha1(rel.encode("utf-8")).hexdigest()[:8], 16) / 0x100000000
+    return "train" if bucket < train_pct else "validation"
+
+def load_manifest(out_dir: Path) -> Dict:
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        return {"version": 1, "files": {}}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_manifest(out_dir: Path, manifest: Dict):
+    path = out_dir / MANIFEST_NAME
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def prepare_from_zip_incremental(zip_path: str, out_dir: str, train_pct: float = 0.9, workers: int = 8,
+                                 max_side: int = 0, jpeg_quality: int = 95) -> str:
+    """Bring out_dir in sync with zip_path, touching only image/label pairs that changed.
+
+    out_dir/manifest.json records size, CRC-32 and SHA-256 of every member plus its split.
+    Members whose size and CRC-32 (read from the zip directory, no decompression) match the
+    manifest are skipped; existing pairs keep their split and new pairs get a split derived
+    from a hash of their path, so the validation set does not churn between runs. Extracted images
+    are downscaled in place when max_side > 0; changing max_side/jpeg_quality rewrites every image.
+    """
+    assert 0.0 < train_pct < 1.0, "train_pct must be in (0,1)"
+    zip_path = Path(zip_path).expanduser().resolve()
+    out_dir = Path(out_dir).expanduser().resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    old_files: Dict[str, Dict] = manifest.get("files", {})
+    resize = [max_side, jpeg_quality] if max_side else None
+    resize_changed = manifest.get("resize") != resize
+
+    t0 = time.perf_counter()
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        root, pairs, classes_member = index_zip(zf.namelist())
+        if classes_member is None:
+            raise FileNotFoundError("classes.txt not found in dataset root; create it with one class name per line.")
+        if not pairs:
+            raise FileNotFoundError("No images found under images/")
+        infos = {i.filename: i for i in zf.infolist()}
+        classes_file = out_dir / "classes.txt"
+        classes_file.write_bytes(zf.read(classes_member))
+    prefix = f"{root}/" if root else ""
+    log(f"Detected dataset root: {root or '<zip root>'} ({len(pairs)} images, {len(old_files)} in manifest)")
+    _log_phase("index", t0)
+
+    t0 = time.perf_counter()
+    def stamp(member: Optional[str]) -> Optional[Dict]:
+        if member is None:
+            return None
+        info = infos[member]
+        return {"size": info.file_size, "crc": info.CRC}
+
+    def same(old: Optional[Dict], new: Optional[Dict]) -> bool:
+        if old is None or new is None:
+            return old is None and new is None
+        return old["size"] == new["size"] and old["crc"] == new["crc"]
+
+    new_files: Dict[str, Dict] = {}
+    jobs: List[Tuple[str, Path]] = []
+    job_keys: Dict[str, Tuple[str, str]] = {}
+    stale: List[Path] = []
+    counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    for img, lbl in pairs:
+        rel = img[len(prefix) + len("images/"):]
+        lbl_rel = str(PurePosixPath(rel).with_suffix(".txt"))
+        old = old_files.get(rel)
+        if old is not None:
+            split = old["split"]
+        elif (out_dir / "validation" / "images" / rel).exists():
+            split = "validation"  # adopt the split of a previous non-incremental prepare
+        elif (out_dir / "train" / "images" / rel).exists():
+            split = "train"
+        else:
+            split = _stable_split(rel, train_pct)
+        img_dest = out_dir / split / "images" / rel
+        lbl_dest = out_dir / split / "labels" / lbl_rel
+        entry = {"split": split, "image": stamp(img), "label": stamp(lbl)}
+        changed = False
+        if (old is None or resize_changed or not same(old.get("image"), entry["image"])
+                or not img_dest.exists()):
+            jobs.append((img, img_dest))
+            job_keys[img] = (rel, "image")
+            changed = True
+        else:
+            entry["image"]["sha256"] = old["image"].get("sha256")
+        if lbl is None:
+            if lbl_dest.exists():
+                stale.append(lbl_dest)
+                changed = True
+            log(f"[yellow]Warning:[/yellow] Missing label for {img}")
+        elif old is None or not same(old.get("label"), entry["label"]) or not lbl_dest.exists():
+            jobs.append((lbl, lbl_dest))
+            job_keys[lbl] = (rel, "label")
+            changed = True
+        else:
+            entry["label"]["sha256"] = old["label"].get("sha256")
+        counts["added" if old is None else ("updated" if changed else "unchanged")] += 1
+        new_files[rel] = entry
+    for rel, old in old_files.items():
+        if rel in new_files:
+            continue
+        counts["removed"] += 1
+        stale.append(out_dir / old["split"] / "images" / rel)
+        stale.append(out_dir / old["split"] / "labels" / str(PurePosixPath(rel).with_suffix(".txt")))
+    # Files on disk that the new split does not expect: pairs left by an earlier non-incremental split,
+    # a copy in the other split, or members dropped from the zip when there was no manifest
+    expected = {(split, sub): set() for split in ("train", "validation") for sub in ("images", "labels")}
+    for rel, entry in new_files.items():
+        expected[(entry["split"], "images")].add(rel)
+        if entry["label"] is not None:
+            expected[(entry["split"], "labels")].add(str(PurePosixPath(rel).with_suffix(".txt")))
+    for (split, sub), keep in expected.items():
+        base = out_dir / split / sub
+        if base.is_dir():
+            stale.extend(p for p in base.rglob("*")
+                         if not p.is_dir() and p.relative_to(base).as_posix() not in keep)
+        base.mkdir(parents=True, exist_ok=True)
+    _log_phase("diff", t0)
+
+    t0 = time.perf_counter()
+    deleted = 0
+    for path in set(stale):
+        if path.exists() or path.is_symlink():
+            path.unlink()
+            deleted += 1
+    digests: Dict[str, str] = {}
+    nbytes = _extract_members(zip_path, jobs, workers=workers, digests=digests) if jobs else 0
+    for member, digest in digests.items():
+        rel, kind = job_keys[member]
+        new_files[rel][kind]["sha256"] = digest
+    _log_phase(f"extract ({len(jobs)} files, {workers} workers)", t0, nbytes)
+    if max_side:
+        images = [(dest, dest) for member, dest in jobs if job_keys[member][1] == "image"]
+        sizes = downscale_images(images, max_side, jpeg_quality=jpeg_quality, workers=workers) if images else {}
+        save_resize_map(out_dir, sizes, max_side, jpeg_quality, merge=not resize_changed)
+    elif (out_dir / RESIZE_MAP_NAME).exists():
+        (out_dir / RESIZE_MAP_NAME).unlink()
+
+    manifest = {"version": 1, "zip": str(zip_path), "root": root, "train_pct": train_pct, "resize": resize,
+                "files": new_files}
+    _save_manifest(out_dir, manifest)
+    data_yaml = out_dir / "data.yaml"
+    write_data_yaml(data_yaml, out_dir, classes_file)
+    log(
+        f"Incremental prepare: {counts['added']} added, {counts['updated']} updated, "
+        f"{counts['removed']} removed, {counts['unchanged']} unchanged; "
+        f"{len(jobs)} files written, {deleted} files deleted"
+    )
+    log(f"Wrote {data_yaml}")
+    return str(data_yaml)
+
+def prepare_from_dir(src_dir: str, out_dir: str, train_pct: float = 0.9, link_mode: str = "copy",
+                     list_files: bool = False, max_side: int = 0, jpeg_quality: int = 95, workers: int = 8) -> str:
+    """Split an already-extracted dataset; cheap to re-run with symlink/hardlink or list-file splits."""
+    src_root = find_dataset_root(Path(src_dir).expanduser().resolve())
+    out_dir = Path(out_dir).expanduser().resolve()
     log(f"Detected dataset root: {src_root}")
 
     classes_file = ensure_classes_txt(src_root)
     log(f"Found classes file: {classes_file}")
 
-    log(f"Splitting dataset with train_pct={train_pct}")
-    split_dataset(src_root, work_dir, train_pct=train_pct)
+    log(f"Splitting dataset with train_pct={train_pct}, " + ("list files" if list_files else f"link_mode={link_mode}"))
+    split_dataset(src_root, out_dir, train_pct=train_pct, link_mode=link_mode, list_files=list_files,
+                  max_side=max_side, jpeg_quality=jpeg_quality, workers=workers)
 
-    data_yaml = work_dir / "data.yaml"
-    write_data_yaml(data_yaml, work_dir, classes_file)
+    data_yaml = out_dir / "data.yaml"
+    write_data_yaml(data_yaml, out_dir, classes_file, list_files=list_files)
     log(f"Wrote {data_yaml}")
-    # Cleanup temp unzip
-    shutil.rmtree(tmp_dir, ignore_errors=True)
     return str(data_yaml)
+
+def prepare_from_zip(zip_path: str, out_dir: str, train_pct: float = 0.9, stream: bool = False, workers: int = 8,
+                     link_mode: str = "copy", list_files: bool = False, incremental: bool = False, max_side: int = 0,
+                     jpeg_quality: int = 95) -> str:
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link_mode {link_mode!r}; expected one of {LINK_MODES}")
+    if incremental:
+        if link_mode != "copy" or list_files:
+            log("[yellow]Warning:[/yellow] link_mode/list_files do not apply to incremental prepare; ignoring")
+        return prepare_from_zip_incremental(zip_path, out_dir, train_pct=train_pct, workers=workers, max_side=max_side,
+                                            jpeg_quality=jpeg_quality)
+    if stream:
+        if link_mode != "copy" or list_files:
+            log("[yellow]Warning:[/yellow] link_mode/list_files do not apply to streaming prepare; ignoring")
+        return prepare_from_zip_streaming(zip_path, out_dir, train_pct=train_pct, workers=workers, max_side=max_side,
+                                          jpeg_quality=jpeg_quality)
+    zip_path = Path(zip_path).expanduser().resolve()
+    out_dir = Path(out_dir).expanduser().resolve()
+    tmp_dir = out_dir / "_unzipped"
+    # A source tree kept by an earlier symlink/list_files prepare may hold files the new zip dropped
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    log(f"Unzipping {zip_path} -> {tmp_dir}")
+    unzip_to(zip_path, tmp_dir)
+    data_yaml = prepare_from_dir(str(tmp_dir), str(out_dir), train_pct=train_pct, link_mode=link_mode,
+                                 list_files=list_files, max_side=max_side, jpeg_quality=jpeg_quality, workers=workers)
+    if link_mode == "symlink" or list_files:
+        # The split references the extracted files; keep them as the source tree for re-splits
+        log(f"Keeping extracted source tree at {tmp_dir}")
+    else:
+        # Cleanup temp unzip
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return data_yaml
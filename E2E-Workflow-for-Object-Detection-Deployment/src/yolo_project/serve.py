@@ -0,0 +1,252 @@
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+import numpy as np
+from .log import log
+from .models import get_model
+
+MAX_BODY = 32 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+class PayloadTooLarge(Exception):
+    """Request body exceeds MAX_BODY."""
+
+class LatencyWindow:
+    """Rolling window of latencies in ms, summarized as mean/p50/p90/p99."""
+
+    def __init__(self, size: int = 2048):
+        self.samples: deque = deque(maxlen=size)
+
+    def add(self, ms: float):
+        self.samples.append(ms)
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"count": 0}
+        data = np.asarray(self.samples)
+        return {"count": int(data.size), "mean": float(data.mean()),
+                **{f"p{p}": float(np.percentile(data, p)) for p in (50, 90, 99)}}
+
+class MicroBatcher:
+    """Collects concurrent requests into batches of up to max_batch, waiting at most max_wait_ms
+    after the first request of a batch. Inference runs on a single worker thread so the event loop
+    keeps accepting (and queueing) requests while a batch is on the model."""
+
+    def __init__(self, model, imgsz: int = 640, conf: float = 0.25, max_batch: int = 8, max_wait_ms: float = 5.0,
+                 max_queue: int = 256):
+        self.model = model
+        self.imgsz = imgsz
+        self.conf = conf
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="infer")
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.batch_sizes: deque = deque(maxlen=2048)
+        self.queue_ms = LatencyWindow()
+        self.infer_ms = LatencyWindow()
+        self.total_ms = LatencyWindow()
+
+    async def submit(self, image: np.ndarray, conf: Optional[float] = None) -> List[dict]:
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((image, conf, fut, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return await fut
+
+    def _infer(self, images: List[np.ndarray], conf: float):
+        results = self.model.predict(source=images, imgsz=self.imgsz, conf=conf, verbose=False)
+        return [detections_json(r) for r in results]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Requests with an explicit conf run at the lowest one and are filtered per request afterwards
+            conf = min([c for _, c, _, _ in batch if c is not None] + [self.conf])
+            start = time.perf_counter()
+            try:
+                outputs = await loop.run_in_executor(self.executor, self._infer, [b[0] for b in batch], conf)
+            except Exception as e:
+                for _, _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            done = time.perf_counter()
+            self.batches += 1
+            self.batch_sizes.append(len(batch))
+            self.infer_ms.add((done - start) * 1000)
+            for (_, c, fut, queued_at), dets in zip(batch, outputs):
+                self.requests += 1
+                self.queue_ms.add((start - queued_at) * 1000)
+                self.total_ms.add((done - queued_at) * 1000)
+                if not fut.done():
+                    threshold = self.conf if c is None else c
+                    fut.set_result([d for d in dets if d["confidence"] >= threshold])
+
+    def metrics(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "uptime_s": elapsed,
+            "requests": self.requests,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "throughput_rps": self.requests / elapsed if elapsed > 0 else 0.0,
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "latency_ms": {"queue": self.queue_ms.summary(), "inference_batch": self.infer_ms.summary(),
+                           "total": self.total_ms.summary()},
+        }
+
+def detections_json(result) -> List[dict]:
+    boxes = result.boxes
+    xyxy = boxes.xyxy.cpu().numpy().tolist()
+    confs = boxes.conf.cpu().numpy().tolist()
+    classes = boxes.cls.cpu().numpy().astype(int).tolist()
+    return [{"class_id": c, "class_name": result.names.get(c, str(c)), "confidence": round(s, 4),
+             "box_xyxy": [round(v, 1) for v in b]} for b, s, c in zip(xyxy, confs, classes)]
+
+def decode_image(body: bytes, content_type: str) -> Optional[np.ndarray]:
+    """Raw image bytes, or JSON {"image": "<base64>"}; raises ValueError on an empty body."""
+    if content_type.startswith("application/json"):
+        import base64
+        body = base64.b64decode(json.loads(body)["image"])
+    if not body:
+        raise ValueError("empty body; POST image bytes or JSON {\"image\": \"<base64>\"}")
+    return cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """Parse one HTTP/1.1 request; raises ValueError if it is malformed and PayloadTooLarge past MAX_BODY."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    length = int(headers.get("content-length", 0))
+    if length < 0:
+        raise ValueError(f"invalid Content-Length {length}")
+    if length > MAX_BODY:
+        raise PayloadTooLarge(f"body of {length} bytes exceeds {MAX_BODY}")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+def _response(status: int, payload, keep_alive: bool) -> bytes:
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+async def _handle(batcher: MicroBatcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                req = await _read_request(reader)
+            except PayloadTooLarge as e:
+                writer.write(_response(413, {"error": f"payload too large: {e}"}, False))
+                break
+            except ValueError as e:
+                # Bad request line, headers or Content-Length: the stream cannot be resynchronized, so close it
+                writer.write(_response(400, {"error": f"malformed request: {e}"}, False))
+                break
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            if req is None:
+                break
+            method, target, headers, body = req
+            keep_alive = headers.get("connection", "").lower() != "close"
+            url = urlsplit(target)
+            status, payload = 404, {"error": f"no route {url.path}"}
+            if url.path == "/health":
+                status, payload = 200, {"status": "ok"}
+            elif url.path == "/metrics":
+                status, payload = 200, batcher.metrics()
+            elif url.path == "/predict":
+                if method != "POST":
+                    status, payload = 405, {"error": "POST an image to /predict"}
+                else:
+                    status, payload = await _predict(batcher, loop, url.query, headers, body)
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+async def _predict(batcher: MicroBatcher, loop, query: str, headers: Dict[str, str], body: bytes):
+    try:
+        conf = float(parse_qs(query)["conf"][0]) if "conf" in parse_qs(query) else None
+        # Decode off the event loop; imdecode releases the GIL
+        image = await loop.run_in_executor(None, decode_image, body, headers.get("content-type", ""))
+    except (ValueError, KeyError, TypeError, cv2.error) as e:
+        return 400, {"error": f"bad request: {e}"}
+    if image is None:
+        return 400, {"error": "could not decode image"}
+    start = time.perf_counter()
+    try:
+        detections = await batcher.submit(image, conf)
+    except asyncio.QueueFull:
+        return 503, {"error": "server busy, queue full"}
+    except Exception as e:
+        return 500, {"error": str(e)}
+    return 200, {"detections": detections, "latency_ms": (time.perf_counter() - start) * 1000,
+                 "image_shape": list(image.shape[:2])}
+
+async def _serve(weights: str, host: str, port: int, imgsz: int, conf: float, max_batch: int, max_wait_ms: float,
+                 max_queue: int):
+    weights = Path(weights).expanduser().resolve()
+    model = get_model(str(weights))
+    # Warm up at the largest batch so the first real requests do not pay for lazy initialization
+    model.predict(source=[np.zeros((imgsz, imgsz, 3), np.uint8)] * max_batch, imgsz=imgsz, verbose=False)
+    batcher = MicroBatcher(model, imgsz=imgsz, conf=conf, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                           max_queue=max_queue)
+    worker = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(lambda r, w: _handle(batcher, r, w), host, port)
+    log(f"Serving {weights.name} on http://{host}:{port} (max batch {max_batch}, max wait {max_wait_ms} ms)")
+    log("Endpoints: POST /predict (image bytes or JSON base64), GET /metrics, GET /health")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        worker.cancel()
+        batcher.executor.shutdown(wait=False)
+
+def serve(weights: str, host: str = "127.0.0.1", port: int = 8000, imgsz: int = 640, conf: float = 0.25,
+          max_batch: int = 8, max_wait_ms: float = 5.0, max_queue: int = 256):
+    try:
+        asyncio.run(_serve(weights, host, port, imgsz, conf, max_batch, max_wait_ms, max_queue))
+    except KeyboardInterrupt:
+        log("Server stopped")
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+from .log import log
+from .prepare import IMAGE_EXTS
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+# (shard number, byte offset, resized h, resized w, original h, original w)
+Entry = Tuple[int, int, int, int, int, int]
+
+def _key(path: str) -> str:
+    # realpath on both the build and the lookup side: Ultralytics keeps symlinked split files as-is
+    return os.path.realpath(path)
+
+def _list_source(entry: str, root: Path) -> List[str]:
+    """Image paths behind one data.yaml train/val entry (an images dir or a .txt path list)."""
+    src = Path(entry) if Path(entry).is_absolute() else root / entry
+    if src.is_dir():
+        return sorted(str(p) for p in src.rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+    if src.suffix == ".txt" and src.is_file():
+        paths = []
+        for line in src.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            p = Path(line[2:]) if line.startswith("./") else Path(line)
+            paths.append(str(p if p.is_absolute() else src.parent / p))
+        return [p for p in paths if Path(p).suffix.lower() in IMAGE_EXTS]
+    raise FileNotFoundError(f"Dataset source not found: {src}")
+
+def dataset_images(data_yaml: str) -> Dict[str, List[str]]:
+    """{split: image paths} for the train and val entries of a data.yaml."""
+    data_yaml = Path(data_yaml).expanduser().resolve()
+    with data_yaml.open("r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    root = Path(data.get("path") or data_yaml.parent)
+    if not root.is_absolute():
+        root = data_yaml.parent / root
+    splits = {}
+    for split in ("train", "val"):
+        entries = data.get(split) or []
+        entries = entries if isinstance(entries, list) else [entries]
+        splits[split] = [p for e in entries for p in _list_source(str(e), root)]
+    return splits
+
+def source_manifest(splits: Dict[str, List[str]]) -> str:
+    """Hash of every source image's path, size and mtime: changes whenever the dataset does."""
+    h = hashlib.sha256()
+    for split in sorted(splits):
+        for path in splits[split]:
+            st = os.stat(path)
+            h.update(f"{split}\0{_key(path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def load_index(shard_dir: str) -> Optional[dict]:
+    path = Path(shard_dir) / INDEX_NAME
+    if not path.exists():
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return None
+
+def _resize(im: np.ndarray, imgsz: int, interp: int) -> np.ndarray:
+    # Same long-side resize as Ultralytics' BaseDataset.load_image (rect_mode), so normalized labels stay valid
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r == 1:
+        return im
+    w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+    return cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR if r > 1 else interp)
+
+def clear_shards(shard_dir: Path):
+    """Delete the files a shard cache owns (index.json, shard_*.bin) and nothing else.
+
+    Refuses a non-empty directory without a shard index, so a mistyped --out cannot wipe a dataset.
+    """
+    index = shard_dir / INDEX_NAME
+    if shard_dir.exists():
+        if not shard_dir.is_dir():
+            raise NotADirectoryError(f"Shard cache path {shard_dir} is not a directory")
+        if not index.exists() and any(shard_dir.iterdir()):
+            raise FileExistsError(f"{shard_dir} is not empty and holds no shard cache ({INDEX_NAME}); "
+                                  f"choose an empty or new directory for the shard cache")
+        # Drop the index first so an interrupted rebuild never looks valid
+        index.unlink(missing_ok=True)
+        for path in shard_dir.glob("shard_*.bin"):
+            path.unlink()
+        index.with_suffix(".json.tmp").unlink(missing_ok=True)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+def build_shards(data_yaml: str, shard_dir: str, imgsz: int = 640, workers: int = 8, shard_mb: int = 1024,
+                 force: bool = False) -> Path:
+    """Decode and resize every train/val image once into fixed-size uint8 shards under shard_dir.
+
+    Each image is resized (long side = imgsz, aspect kept) and stored top-left in an
+    imgsz x imgsz x 3 slot; index.json maps each image to its shard, byte offset and size. The cache
+    is rebuilt only when imgsz or the source manifest (paths, sizes, mtimes) changed, or force is set.
+    Train images use the interpolation Ultralytics uses for augmented loading, val images INTER_AREA.
+    """
+    shard_dir = Path(shard_dir).expanduser().resolve()
+    splits = dataset_images(data_yaml)
+    source = source_manifest(splits)
+    index = load_index(str(shard_dir))
+    if (not force and index and index.get("version") == INDEX_VERSION and index.get("imgsz") == imgsz
+            and index.get("source") == source):
+        log(f"Shard cache {shard_dir} is up to date ({len(index['images'])} images at {imgsz}px)")
+        return shard_dir / INDEX_NAME
+
+    clear_shards(shard_dir)
+    jobs, seen = [], set()
+    for split, paths in splits.items():
+        interp = cv2.INTER_LINEAR if split == "train" else cv2.INTER_AREA
+        for path in paths:
+            if _key(path) not in seen:
+                seen.add(_key(path))
+                jobs.append((path, interp))
+    slot = imgsz * imgsz * 3
+    per_shard = max(1, (shard_mb << 20) // slot)
+    n_shards = -(-len(jobs) // per_shard)
+    log(f"Building shard cache for {len(jobs)} images at {imgsz}px: {n_shards} shard(s), "
+        f"{len(jobs) * slot / 1e9:.1f} GB in {shard_dir}")
+
+    maps = [np.memmap(shard_dir / f"shard_{s:05d}.bin", dtype=np.uint8, mode="w+",
+                      shape=(min(per_shard, len(jobs) - s * per_shard) * slot,)) for s in range(n_shards)]
+
+    def write(i: int) -> Optional[Entry]:
+        path, interp = jobs[i]
+        im = cv2.imread(path)
+        if im is None:
+            return None
+        h0, w0 = im.shape[:2]
+        im = _resize(im, imgsz, interp)
+        h, w = im.shape[:2]
+        shard, offset = divmod(i, per_shard)
+        offset *= slot
+        maps[shard][offset:offset + slot].reshape(imgsz, imgsz, 3)[:h, :w] = im
+        return shard, offset, h, w, h0, w0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        entries = list(pool.map(write, range(len(jobs))))
+    for m in maps:
+        m.flush()
+    del maps
+
+    images = {}
+    for (path, _), entry in zip(jobs, entries):
+        if entry is None:
+            log(f"[yellow]Warning:[/yellow] Could not read {path}; it will be decoded at load time")
+        else:
+            images[_key(path)] = list(entry)
+    index = {"version": INDEX_VERSION, "imgsz": imgsz, "source": source, "slot_bytes": slot,
+             "per_shard": per_shard, "images": images}
+    path = shard_dir / INDEX_NAME
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+    elapsed = time.perf_counter() - start
+    log(f"Shard cache built: {len(images)} images in {elapsed:.1f}s "
+        f"({len(images) / elapsed if elapsed > 0 else 0.0:.0f} images/s)")
+    return path
+
+class ShardCache:
+    """Read-only view of a shard cache; image() returns zero-copy slices of the memory-mapped shards.
+
+    Shards are opened lazily per process and dropped on pickling, so dataloader workers (forked or
+    spawned) map the files themselves instead of receiving a copy of the pixels.
+    """
+
+    def __init__(self, shard_dir: str):
+        self.shard_dir = Path(shard_dir).expanduser().resolve()
+        index = load_index(str(self.shard_dir))
+        if index is None or index.get("version") != INDEX_VERSION:
+            raise FileNotFoundError(f"No shard cache in {self.shard_dir}; build it with `yolo-proj shards`.")
+        self.imgsz: int = index["imgsz"]
+        self.images: Dict[str, Entry] = {k: tuple(v) for k, v in index["images"].items()}
+        self._maps: Dict[int, np.memmap] = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_maps"] = {}
+        return state
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def entry(self, path: str) -> Optional[Entry]:
+        return self.images.get(_key(path))
+
+    def image(self, entry: Entry) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """(BGR image view, original (h, w)) for an index entry."""
+        shard, offset, h, w, h0, w0 = entry
+        mm = self._maps.get(shard)
+        if mm is None:
+            mm = self._maps[shard] = np.memmap(self.shard_dir / f"shard_{shard:05d}.bin", dtype=np.uint8, mode="r")
+        size = self.imgsz * self.imgsz * 3
+        return mm[offset:offset + size].reshape(self.imgsz, self.imgsz, 3)[:h, :w], (h0, w0)
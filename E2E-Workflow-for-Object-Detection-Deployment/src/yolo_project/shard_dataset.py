@@ -0,0 +1,74 @@
+# Ultralytics adapters for shard_cache; imported lazily by train so the CLI starts without Ultralytics
+from typing import Optional
+
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer, DetectionValidator
+
+from .log import log
+from .shard_cache import ShardCache
+
+class ShardYOLODataset(YOLODataset):
+    """YOLODataset whose load_image returns memory-mapped views of pre-resized images.
+
+    Images missing from the cache (unreadable at build time, or added since) fall back to the
+    normal decode path.
+    """
+
+    shards: ShardCache
+
+    @classmethod
+    def adopt(cls, dataset, shards: ShardCache):
+        """Switch an already constructed YOLODataset to shard loading; returns it unchanged if incompatible."""
+        if type(dataset) is not YOLODataset:
+            log(f"[yellow]Warning:[/yellow] Shard cache only supports YOLODataset, not {type(dataset).__name__}")
+            return dataset
+        if shards.imgsz != dataset.imgsz:
+            log(f"[yellow]Warning:[/yellow] Shard cache was built at {shards.imgsz}px but imgsz is "
+                f"{dataset.imgsz}; decoding images instead. Rebuild it with `yolo-proj shards --imgsz {dataset.imgsz}`.")
+            return dataset
+        dataset.__class__ = cls
+        dataset.shards = shards
+        # Resolve index entries once instead of per load
+        dataset.shard_entries = [shards.entry(f) for f in dataset.im_files]
+        hits = sum(e is not None for e in dataset.shard_entries)
+        log(f"{dataset.prefix}{hits}/{len(dataset.im_files)} images served from shard cache {shards.shard_dir}")
+        return dataset
+
+    def load_image(self, i, rect_mode=True):
+        entry = self.shard_entries[i]
+        if entry is None or not rect_mode:
+            return super().load_image(i, rect_mode)
+        im, hw0 = self.shards.image(entry)
+        if self.augment:
+            # Keep Ultralytics' buffer of recent indices: mosaic samples its partner images from it
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, im.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, hw0, im.shape[:2]
+
+class ShardDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer whose train and val datasets read from a shard cache.
+
+    Pass as model.train(trainer=functools.partial(ShardDetectionTrainer, shard_dir=...)).
+    """
+
+    def __init__(self, *args, shard_dir: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shards = ShardCache(shard_dir) if shard_dir else None
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        dataset = super().build_dataset(img_path, mode=mode, batch=batch)
+        return ShardYOLODataset.adopt(dataset, self.shards) if self.shards else dataset
+
+class ShardDetectionValidator(DetectionValidator):
+    """DetectionValidator for model.val(validator=functools.partial(ShardDetectionValidator, shard_dir=...))."""
+
+    def __init__(self, *args, shard_dir: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shards = ShardCache(shard_dir) if shard_dir else None
+
+    def build_dataset(self, img_path, mode="val", batch=None):
+        dataset = super().build_dataset(img_path, mode=mode, batch=batch)
+        return ShardYOLODataset.adopt(dataset, self.shards) if self.shards else dataset
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .log import log
+
+STATE_FILE = Path(".pipeline") / "state.json"
+# Ultralytics writes labels.cache next to the labels during train/val; it must not invalidate later stages
+IGNORED_SUFFIXES = {".cache"}
+
+_hashes: Dict[tuple, str] = {}
+
+def hash_file(path: Path, chunk: int = 1 << 20) -> str:
+    """SHA-256 of a file, memoized per (path, size, mtime) since best.pt feeds several stages."""
+    path = Path(path).resolve()
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    if key not in _hashes:
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(chunk), b""):
+                h.update(block)
+        _hashes[key] = h.hexdigest()
+    return _hashes[key]
+
+def tree_stamp(root: Path) -> Dict[str, int]:
+    """Cheap change detector for large directories: file count, total bytes and newest mtime."""
+    count = size = newest = 0
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            if os.path.splitext(name)[1] in IGNORED_SUFFIXES:
+                continue
+            st = os.stat(os.path.join(dirpath, name))
+            count += 1
+            size += st.st_size
+            newest = max(newest, st.st_mtime_ns)
+    return {"files": count, "bytes": size, "newest_mtime_ns": newest}
+
+def file_stamp(path) -> Optional[Dict[str, int]]:
+    """Size and mtime only, for inputs too large to hash on every run (dataset zips)."""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    st = path.stat()
+    return {"bytes": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def artifact_stamp(path) -> object:
+    """Content hash for files, tree stamp for directories, None if missing."""
+    path = Path(path)
+    if path.is_file():
+        return hash_file(path)
+    if path.is_dir():
+        return tree_stamp(path)
+    return None
+
+def fingerprint(inputs: dict) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+class Stage:
+    """One pipeline step.
+
+    inputs() returns everything the step depends on (config subsection, upstream artifact stamps);
+    outputs() lists the artifacts it must leave behind; run() does the work and may return a dict
+    of results (e.g. the data.yaml path) that later stages read from the runner even when the
+    step itself is skipped. deps names the stages that must finish first (default: all earlier
+    stages); stages whose deps are satisfied run concurrently.
+    """
+
+    def __init__(self, name: str, run: Callable[[], Optional[dict]], inputs: Callable[[], dict],
+                 outputs: Callable[[], List[Path]] = lambda: [], enabled: Callable[[], bool] = lambda: True,
+                 needs_gpu: bool = False, deps: Optional[List[str]] = None):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.enabled = enabled
+        self.needs_gpu = needs_gpu
+        self.deps = deps
+
+class Pipeline:
+    """Stage graph with fingerprints persisted in .pipeline/state.json.
+
+    A stage is skipped when its fingerprint matches the stored one and all its outputs exist.
+    from_stage forces that stage and every later one (in declaration order); only runs just the
+    named stages (forced). Ready stages are executed on a thread pool of `workers` threads.
+    """
+
+    def __init__(self, stages: List[Stage], state_file: Path = STATE_FILE, workers: int = 3):
+        self.stages = stages
+        for i, stage in enumerate(stages):
+            if stage.deps is None:
+                stage.deps = [s.name for s in stages[:i]]
+        self.state_file = Path(state_file)
+        self.workers = max(1, workers)
+        self.state: Dict[str, dict] = self._load_state()
+        self.results: Dict[str, dict] = {name: entry.get("results", {}) for name, entry in self.state.items()}
+        self.timings: Dict[str, tuple] = {}
+        self.wall = 0.0
+        self._lock = threading.Lock()
+        self._gpu_ready = False
+
+    def _load_state(self) -> Dict[str, dict]:
+        if self.state_file.exists():
+            try:
+                return json.loads(self.state_file.read_text())
+            except ValueError:
+                log(f"[yellow]Warning:[/yellow] {self.state_file} is corrupt; every stage will run.")
+        return {}
+
+    def _save_state(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.state_file)
+
+    def names(self) -> List[str]:
+        return [s.name for s in self.stages]
+
+    def _forced(self, from_stage: Optional[str], only: Optional[List[str]]) -> set:
+        for name in ([from_stage] if from_stage else []) + (only or []):
+            if name not in self.names():
+                raise ValueError(f"Unknown stage '{name}'. Stages: {', '.join(self.names())}")
+        if only:
+            return set(only)
+        if from_stage:
+            return set(self.names()[self.names().index(from_stage):])
+        return set()
+
+    def up_to_date(self, stage: Stage, fp: str) -> bool:
+        entry = self.state.get(stage.name)
+        return bool(entry) and entry.get("fingerprint") == fp and all(Path(p).exists() for p in stage.outputs())
+
+    def _precheck(self, stage: Stage, only: Optional[List[str]], forced: set) -> Optional[str]:
+        """Status for a stage that will not run, or None if it must run."""
+        if only and stage.name not in only:
+            return "not selected"
+        if not stage.enabled():
+            return "disabled"
+        if stage.name not in forced and self.up_to_date(stage, fingerprint(stage.inputs())):
+            log(f"Stage {stage.name}: up to date, skipped")
+            return "skipped"
+        return None
+
+    def _execute(self, stage: Stage, before_gpu: Optional[Callable[[], None]]):
+        if stage.needs_gpu and before_gpu:
+            with self._lock:
+                if not self._gpu_ready:
+                    before_gpu()
+                    self._gpu_ready = True
+        log(f"Stage {stage.name}: running")
+        start = time.perf_counter()
+        results = stage.run() or {}
+        elapsed = time.perf_counter() - start
+        # Recompute after running: inputs may include artifacts this stage just (re)wrote upstream
+        fp = fingerprint(stage.inputs())
+        with self._lock:
+            self.results[stage.name] = results
+            self.state[stage.name] = {"fingerprint": fp, "results": results, "seconds": round(elapsed, 2),
+                                      "finished": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            self._save_state()
+            self.timings[stage.name] = ("ran", elapsed)
+        log(f"Stage {stage.name}: done in {elapsed:.1f}s")
+
+    def run(self, from_stage: Optional[str] = None, only: Optional[List[str]] = None,
+            before_gpu: Optional[Callable[[], None]] = None):
+        forced = self._forced(from_stage, only)
+        pending = list(self.stages)
+        done: set = set()
+        running: Dict[Future, Stage] = {}
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stage") as pool:
+                while pending or running:
+                    progressed = True
+                    while progressed:
+                        progressed = False
+                        for stage in [s for s in pending if all(d in done for d in s.deps)]:
+                            pending.remove(stage)
+                            status = self._precheck(stage, only, forced)
+                            if status is None:
+                                running[pool.submit(self._execute, stage, before_gpu)] = stage
+                            else:
+                                self.timings[stage.name] = (status, 0.0)
+                                done.add(stage.name)
+                                progressed = True
+                    if not running:
+                        if pending:
+                            raise ValueError(f"Unsatisfiable stage dependencies: {[s.name for s in pending]}")
+                        break
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        stage = running.pop(fut)
+                        fut.result()  # re-raise; the pool still waits for stages already running
+                        done.add(stage.name)
+        finally:
+            self.wall = time.perf_counter() - start
+
+    def summary(self) -> str:
+        lines = ["Stage timing summary:"]
+        for name in self.names():
+            status, secs = self.timings.get(name, ("not run", 0.0))
+            lines.append(f"  {name:<10} {status:<13} {secs:9.1f}s")
+        busy = sum(secs for _, secs in self.timings.values())
+        lines.append(f"  {'total':<10} {'wall clock':<13} {self.wall:9.1f}s  (stage time {busy:.1f}s)")
+        return "\n".join(lines)
@@ -0,0 +1,186 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .log import log
+
+TELEMETRY_FILE = "telemetry.jsonl"
+
+def _memory_mb() -> Dict[str, float]:
+    """RSS of this process and of its children (dataloader workers), plus cumulative bytes read.
+
+    Without psutil only {"peak_rss_mb": ...} (ru_maxrss) is available.
+    """
+    try:
+        import psutil
+    except ImportError:
+        # Without psutil only the peak RSS of this process is known (and nothing on Windows)
+        try:
+            import resource
+        except ImportError:
+            return {}
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"peak_rss_mb": peak / 1e6 if sys.platform == "darwin" else peak / 1e3}
+    proc = psutil.Process()
+    procs = [proc]
+    try:
+        procs += proc.children(recursive=True)
+    except psutil.Error:
+        pass
+    out = {"rss_mb": proc.memory_info().rss / 1e6, "workers_rss_mb": 0.0}
+    read = 0
+    for p in procs:
+        try:
+            if p is not proc:
+                out["workers_rss_mb"] += p.memory_info().rss / 1e6
+            if hasattr(p, "io_counters"):
+                read += p.io_counters().read_bytes
+        except psutil.Error:
+            continue
+    if read:
+        out["read_bytes"] = read
+    return out
+
+def _rss_text(mem: dict) -> str:
+    if "rss_mb" in mem:
+        return f"RSS {mem['rss_mb']:.0f} MB"
+    if "peak_rss_mb" in mem:
+        return f"peak RSS {mem['peak_rss_mb']:.0f} MB"
+    return "RSS n/a"
+
+class TrainingTelemetry:
+    """Ultralytics callbacks that record where training time goes.
+
+    Per epoch (and every `every_n_batches` batches if > 0) one JSON line is appended to
+    <save_dir>/telemetry.jsonl: images/s, dataloader wait (batch_end -> next batch_start) vs
+    compute (batch_start -> batch_end), validation time, epoch wall time, RSS of the trainer and
+    its dataloader workers, disk reads and the worker count. CUDA runs asynchronously, so compute
+    time lands wherever the next sync happens; sync_cuda=True synchronizes at every batch end for
+    exact splits at a small throughput cost.
+    """
+
+    def __init__(self, every_n_batches: int = 0, sync_cuda: bool = False, filename: str = TELEMETRY_FILE):
+        self.every_n_batches = max(0, every_n_batches)
+        self.sync_cuda = sync_cuda
+        self.filename = filename
+        self.path: Optional[Path] = None
+        self._reset_epoch()
+
+    def _reset_epoch(self):
+        self.epoch_start = time.perf_counter()
+        self.mark = self.epoch_start
+        self.batch_start = self.epoch_start
+        self.wait: List[float] = []
+        self.compute: List[float] = []
+        self.images = 0
+        self.train_end = None
+        self.read_start = None
+
+    def attach(self, model):
+        for event in ("on_train_start", "on_train_epoch_start", "on_train_batch_start", "on_train_batch_end",
+                      "on_train_epoch_end", "on_fit_epoch_end", "on_train_end"):
+            model.add_callback(event, getattr(self, event))
+        return self
+
+    def _write(self, record: dict):
+        if self.path is None:
+            return
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def on_train_start(self, trainer):
+        if int(os.getenv("RANK", "-1")) not in (-1, 0):
+            return  # DDP: only the main process writes
+        self.path = Path(trainer.save_dir) / self.filename
+        if not trainer.args.resume and self.path.exists():
+            self.path.unlink()
+        self.workers = getattr(trainer.train_loader, "num_workers", None)
+        self.dataset_size = len(trainer.train_loader.dataset)
+        log(f"Telemetry -> {self.path}")
+
+    def on_train_epoch_start(self, trainer):
+        self._reset_epoch()
+        self.read_start = _memory_mb().get("read_bytes")
+
+    def on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        self.wait.append(now - self.mark)
+        self.batch_start = now
+
+    def on_train_batch_end(self, trainer):
+        if self.sync_cuda:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+        now = time.perf_counter()
+        self.compute.append(now - self.batch_start)
+        self.mark = now
+        self.images += trainer.batch_size
+        if self.every_n_batches and len(self.compute) % self.every_n_batches == 0:
+            n = self.every_n_batches
+            wait, compute = sum(self.wait[-n:]), sum(self.compute[-n:])
+            self._write({"type": "batch", "epoch": trainer.epoch + 1, "batch": len(self.compute),
+                         "images_per_s": n * trainer.batch_size / max(wait + compute, 1e-9),
+                         "dataloader_wait_s": wait, "compute_s": compute,
+                         **{k: v for k, v in _memory_mb().items() if k != "read_bytes"}})
+
+    def on_train_epoch_end(self, trainer):
+        self.train_end = time.perf_counter()
+
+    def on_fit_epoch_end(self, trainer):
+        if self.path is None:
+            return
+        now = time.perf_counter()
+        train_end = self.train_end or now
+        train_s = train_end - self.epoch_start
+        wait, compute = sum(self.wait), sum(self.compute)
+        images = min(self.images, self.dataset_size)
+        mem = _memory_mb()
+        read = mem.pop("read_bytes", None)
+        record = {
+            "type": "epoch",
+            "epoch": trainer.epoch + 1,
+            "epoch_time_s": now - self.epoch_start,
+            "train_time_s": train_s,
+            "val_time_s": now - train_end,
+            "batches": len(self.compute),
+            "images": images,
+            "images_per_s": images / max(train_s, 1e-9),
+            "dataloader_wait_s": wait,
+            "compute_s": compute,
+            "dataloader_wait_frac": wait / max(wait + compute, 1e-9),
+            "workers": self.workers,
+            "batch_size": trainer.batch_size,
+            **mem,
+        }
+        if read is not None and self.read_start is not None:
+            record["read_mb_per_s"] = (read - self.read_start) / 1e6 / max(train_s, 1e-9)
+        try:
+            import torch
+            if torch.cuda.is_available():
+                record["cuda_max_mem_mb"] = torch.cuda.max_memory_reserved() / 1e6
+                torch.cuda.reset_peak_memory_stats()
+        except ImportError:
+            pass
+        self._write(record)
+        log(f"Epoch {record['epoch']}: {record['images_per_s']:.1f} img/s, dataloader wait "
+            f"{100 * record['dataloader_wait_frac']:.0f}%, epoch {record['epoch_time_s']:.1f}s "
+            f"(val {record['val_time_s']:.1f}s), {_rss_text(record)}")
+
+    def on_train_end(self, trainer):
+        if self.path is not None:
+            log(f"Telemetry written to {self.path}")
+
+def attach_telemetry(model, every_n_batches: int = 0, sync_cuda: bool = False) -> TrainingTelemetry:
+    return TrainingTelemetry(every_n_batches=every_n_batches, sync_cuda=sync_cuda).attach(model)
+
+def load_telemetry(path: Path, kind: str = "epoch") -> List[dict]:
+    """Records of one type ("epoch" or "batch") from a telemetry.jsonl."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as f:
+        return [r for r in map(json.loads, filter(str.strip, f)) if r.get("type") == kind]
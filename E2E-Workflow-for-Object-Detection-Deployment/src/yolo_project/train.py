@@ -1,20 +1,40 @@
+from functools import partial
 from pathlib import Path
-from ultralytics import YOLO
+from typing import Optional, Union
 from .log import log
+from .models import get_model
+from .telemetry import attach_telemetry
 
-def train(data_yaml: str, model: str = "yolo11s.pt", epochs: int = 60, imgsz: int = 640, project: str = "runs"):
+def train(data_yaml: str, model: str = "yolo11s.pt", epochs: int = 60, imgsz: int = 640, project: str = "runs",
+          name: str = "train", exist_ok: bool = False, telemetry_every: int = 0, batch: int = 16, workers: int = 8,
+          cache: Union[bool, str] = False, shard_dir: Optional[str] = None):
     data_yaml = Path(data_yaml).expanduser().resolve()
     project = Path(project).expanduser().resolve()
 
     log(f"Loading model: {model}")
-    model_obj = YOLO(model)
-    log(f"Starting training for {epochs} epochs at {imgsz}px")
+    # Training mutates the model, so it gets a private copy instead of the shared cached one
+    model_obj = get_model(model, cache=False)
+    # Per-epoch throughput/dataloader/memory records in <run>/telemetry.jsonl (plus every N batches if > 0)
+    attach_telemetry(model_obj, every_n_batches=telemetry_every)
+    trainer = None
+    if shard_dir:
+        from .shard_dataset import ShardDetectionTrainer
+        # Shards already hold decoded, resized images; Ultralytics' own cache would duplicate them
+        trainer, cache = partial(ShardDetectionTrainer, shard_dir=shard_dir), False
+        log(f"Reading images from shard cache {shard_dir}")
+    log(f"Starting training for {epochs} epochs at {imgsz}px (batch {batch}, {workers} workers, cache {cache})")
     results = model_obj.train(
         data=str(data_yaml),
         epochs=epochs,
         imgsz=imgsz,
+        batch=batch,
+        workers=workers,
+        cache=cache,
         project=str(project),
+        name=name,
+        exist_ok=exist_ok,
         task="detect",
+        trainer=trainer,
     )
     log("Training complete")
     return results
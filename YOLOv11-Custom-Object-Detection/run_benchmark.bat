@@ -1,5 +1,6 @@
 @echo off
 cd /d "%~dp0"
-echo Starting Speed Benchmark (PT vs ONNX)...
-.\venv\Scripts\python.exe -m scripts.benchmark_comparison
+echo Starting Inference Benchmark (p50/p90/p99, CPU by default)...
+echo Compares against benchmark_baseline.json if present; pass --save-baseline to record a new one.
+.\venv\Scripts\python.exe -m scripts.benchmark_comparison %*
 pause
@@ -0,0 +1,6 @@
+@echo off
+cd /d "%~dp0"
+echo Exporting ONNX FP32 / ONNX dynamic / OpenVINO / TorchScript and benchmarking each on this machine...
+echo The fastest backend is recorded in weights\deployment.json and used by live and ONNX inference.
+.\venv\Scripts\python.exe -m scripts.export_model --matrix %*
+pause
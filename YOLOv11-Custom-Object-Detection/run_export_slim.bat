@@ -0,0 +1,6 @@
+@echo off
+cd /d "%~dp0"
+echo Writing an inference-only checkpoint (weights\best_slim.pt) without optimizer / EMA / training args...
+echo Detections are verified against best.pt on validation images; size and load-time savings go to best_slim.json.
+.\venv\Scripts\python.exe -m scripts.export_model --slim --half %*
+pause
@@ -0,0 +1,5 @@
+@echo off
+cd /d "%~dp0"
+echo Validating All Dataset Labels (headless)...
+.\venv\Scripts\python.exe -m scripts.visualize_labels --validate --report logs\label_report.json
+pause
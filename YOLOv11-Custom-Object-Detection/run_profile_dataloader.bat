@@ -0,0 +1,6 @@
+@echo off
+cd /d "%~dp0"
+echo Profiling dataloader throughput (decode / augment / collate) across workers and cache modes...
+echo Recommended workers/batch/cache are written to config.overlay.json (applied by run_train.bat)
+.\venv\Scripts\python.exe -m scripts.profile_dataloader %*
+pause
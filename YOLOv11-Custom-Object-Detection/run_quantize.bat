@@ -0,0 +1,6 @@
+@echo off
+cd /d "%~dp0"
+echo Static INT8 quantization of the ONNX export (calibrated on the validation split)...
+echo Reports mAP50-95 delta and latency gain vs. FP32 in logs\quantization_report.json
+.\venv\Scripts\python.exe -m scripts.quantize_model %*
+pause
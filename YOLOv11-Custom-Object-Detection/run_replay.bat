@@ -0,0 +1,6 @@
+@echo off
+cd /d "%~dp0"
+echo Replaying footage headless through the detector...
+echo Usage: run_replay.bat path\to\video.mp4 [--stride 2] [--realtime on] [--output out.mp4]
+.\venv\Scripts\python.exe -m scripts.live_inference --headless --source %*
+pause
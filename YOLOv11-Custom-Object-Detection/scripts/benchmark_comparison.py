@@ -1,71 +1,228 @@
-import time
-import torch
+import argparse
+import itertools
+import json
 import os
-from ultralytics import YOLO
+import platform
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
 from scripts.logger_utils import setup_production_logging
 
 # Initialize Production Logger
 logger = setup_production_logging("benchmark_comparison")
 
-def run_benchmark():
-    # 1. Configuration via Environment Variables
-    pt_path = os.getenv("PT_MODEL_PATH", os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights/best.pt"))
-    onnx_path = os.getenv("ONNX_MODEL_PATH", os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights/best.onnx"))
-    
-    # Use a default test image if none provided in env
-    test_img = os.getenv("TEST_IMAGE", os.path.abspath("dataset/valid/images/Test_img-36-_jpg.rf.02ffc1aa413ca8edd972fb53a71a576a.jpg"))
-    
-    iterations = int(os.getenv("BENCHMARK_ITERATIONS", 100))
-    warmup = int(os.getenv("BENCHMARK_WARMUP", 10))
-
-    if not os.path.exists(pt_path) or not os.path.exists(onnx_path):
-        logger.error("Models not found. Ensure both .pt and .onnx exist.")
+WEIGHTS_DIR = os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights")
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+PERCENTILES = (50, 90, 99)
+
+
+def _int_list(value):
+    return [int(v) for v in str(value).replace(",", " ").split()]
+
+
+def load_images(source, max_images):
+    """Decode up to max_images images once, so disk I/O and JPEG decoding stay out of the timings."""
+    if os.path.isdir(source):
+        paths = sorted(os.path.join(source, f) for f in os.listdir(source) if f.lower().endswith(IMAGE_EXTS))
+    else:
+        paths = [source]
+    images = [img for img in (cv2.imread(p) for p in paths[:max_images]) if img is not None]
+    if not images:
+        raise FileNotFoundError(f"No readable images in {source}")
+    return images
+
+
+def set_threads(model, threads):
+    """Apply an intra-op thread count to torch and, for .onnx weights, to the ONNX Runtime session."""
+    import torch
+
+    torch.set_num_threads(threads)
+    backend = getattr(getattr(model, "predictor", None), "model", None)
+    session = getattr(backend, "session", None)
+    model_path = getattr(session, "_model_path", None)  # only onnxruntime sessions carry this
+    if not model_path:
         return
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    backend.session = ort.InferenceSession(model_path, sess_options=options, providers=session.get_providers())
+
+
+def summarize(batch_ms, stage_ms, images, elapsed):
+    lat = np.asarray(batch_ms)
+    stages = {k: float(np.mean(v)) for k, v in stage_ms.items()}
+    return {
+        "batches": len(lat),
+        "images": images,
+        "latency_ms": {**{f"p{p}": float(np.percentile(lat, p)) for p in PERCENTILES}, "mean": float(lat.mean())},
+        "per_image_ms": stages,
+        "throughput_ips": images / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def benchmark_config(model, images, batch, imgsz, device, warmup, iterations):
+    """Time `iterations` batches of `batch` images; returns the summary dict for one configuration."""
+    cycle = itertools.cycle(images)
+
+    def next_batch():
+        return [next(cycle) for _ in range(batch)]
+
+    for _ in range(warmup):
+        model.predict(next_batch(), imgsz=imgsz, device=device, batch=batch, verbose=False)
+
+    batch_ms, stage_ms = [], {"preprocess": [], "inference": [], "postprocess": []}
+    start = time.perf_counter()
+    for _ in range(iterations):
+        frames = next_batch()
+        t0 = time.perf_counter()
+        results = model.predict(frames, imgsz=imgsz, device=device, batch=batch, verbose=False)
+        batch_ms.append((time.perf_counter() - t0) * 1000)
+        # Results.speed is per image, averaged over the batch by Ultralytics
+        for stage in stage_ms:
+            stage_ms[stage].append(results[0].speed.get(stage, 0.0))
+    elapsed = time.perf_counter() - start
+    return summarize(batch_ms, stage_ms, batch * iterations, elapsed)
+
+
+def result_key(entry):
+    return f"{entry['model']}|b{entry['batch']}|{entry['imgsz']}|t{entry['threads']}|{entry['device']}"
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of human-readable regressions (p50 latency up or throughput down by more than tolerance)."""
+    previous = {result_key(e): e for e in baseline.get("results", [])}
+    regressions = []
+    for entry in results:
+        old = previous.get(result_key(entry))
+        if old is None:
+            logger.info(f"  {result_key(entry)}: no baseline entry, skipped")
+            continue
+        new_p50, old_p50 = entry["latency_ms"]["p50"], old["latency_ms"]["p50"]
+        new_tp, old_tp = entry["throughput_ips"], old["throughput_ips"]
+        logger.info(f"  {result_key(entry)}: p50 {old_p50:.1f} -> {new_p50:.1f} ms, "
+                    f"throughput {old_tp:.1f} -> {new_tp:.1f} img/s")
+        if new_p50 > old_p50 * (1 + tolerance):
+            regressions.append(f"{result_key(entry)}: p50 latency {old_p50:.1f} -> {new_p50:.1f} ms")
+        if new_tp < old_tp * (1 - tolerance):
+            regressions.append(f"{result_key(entry)}: throughput {old_tp:.1f} -> {new_tp:.1f} img/s")
+    return regressions
+
+
+def host_info():
+    import torch
+    import ultralytics
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": sys.version.split()[0],
+        "torch": torch.__version__,
+        "ultralytics": ultralytics.__version__,
+    }
+
+
+def run_benchmark(args):
+    from scripts.model_registry import get_model
+
+    models = [m for m in args.models if os.path.exists(m)]
+    for missing in set(args.models) - set(models):
+        logger.warning(f"Model not found, skipped: {missing}")
+    if not models:
+        logger.error("No models to benchmark.")
+        return 1
+
+    images = load_images(args.source, args.max_images)
+    logger.info(f"--- Benchmark: {len(models)} model(s), {len(images)} images, device={args.device}, "
+                f"batch={args.batch_sizes}, imgsz={args.imgsz}, threads={args.threads} ---")
+
+    results = []
+    for model_path in models:
+        model = get_model(model_path, task="detect")
+        fmt = os.path.splitext(model_path)[1].lstrip(".") or os.path.basename(model_path)
+        for batch, imgsz, threads in itertools.product(args.batch_sizes, args.imgsz, args.threads):
+            if fmt == "onnx" and batch > 1 and not args.allow_onnx_batch:
+                # Static ONNX exports only accept batch 1; dynamic ones are opted in explicitly
+                continue
+            try:
+                # The first predict() builds the predictor; threads are applied to the live backend after that
+                model.predict(images[0], imgsz=imgsz, device=args.device, verbose=False)
+                set_threads(model, threads)
+                summary = benchmark_config(model, images, batch, imgsz, args.device, args.warmup, args.iterations)
+            except Exception as e:
+                logger.error(f"{os.path.basename(model_path)} b{batch} {imgsz}px t{threads} failed: {e}")
+                continue
+            entry = {"model": os.path.basename(model_path), "format": fmt, "batch": batch, "imgsz": imgsz,
+                     "threads": threads, "device": str(args.device), **summary}
+            lat, st = entry["latency_ms"], entry["per_image_ms"]
+            logger.info(f"{entry['model']:<12} b{batch:<3} {imgsz}px t{threads:<2} | "
+                        f"p50 {lat['p50']:7.1f}  p90 {lat['p90']:7.1f}  p99 {lat['p99']:7.1f} ms/batch | "
+                        f"pre {st['preprocess']:.1f}  inf {st['inference']:.1f}  post {st['postprocess']:.1f} ms/img | "
+                        f"{entry['throughput_ips']:.1f} img/s")
+            results.append(entry)
+    if not results:
+        logger.error("Every configuration failed; nothing to report.")
+        return 1
+
+    meta = host_info()
+    meta.update(iterations=args.iterations, warmup=args.warmup, source=os.path.abspath(args.source))
+    report = {"meta": meta, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {os.path.abspath(args.output)}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Baseline saved to {os.path.abspath(args.baseline)}")
+        return 0
+
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        logger.info(f"Comparing against baseline {args.baseline} (tolerance {args.tolerance:.0%})")
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            logger.error("PERFORMANCE REGRESSION:")
+            for line in regressions:
+                logger.error(f"  {line}")
+            return 1
+        logger.info("No regressions beyond tolerance.")
+    return 0
+
+
+def parse_args(argv=None):
+    default_models = [os.getenv("PT_MODEL_PATH", os.path.join(WEIGHTS_DIR, "best.pt")),
+                      os.getenv("ONNX_MODEL_PATH", os.path.join(WEIGHTS_DIR, "best.onnx"))]
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmark with baseline regression check.")
+    parser.add_argument("--models", nargs="+", default=default_models, help="Weights to benchmark (.pt, .onnx, ...)")
+    parser.add_argument("--source", default=os.getenv("BENCHMARK_SOURCE", "dataset/valid/images"),
+                        help="Image or directory of images")
+    parser.add_argument("--max-images", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=_int_list, default=_int_list(os.getenv("BENCHMARK_BATCH", "1 4")))
+    parser.add_argument("--imgsz", type=_int_list, default=_int_list(os.getenv("BENCHMARK_IMGSZ", "640")))
+    parser.add_argument("--threads", type=_int_list,
+                        default=_int_list(os.getenv("BENCHMARK_THREADS", str(os.cpu_count() or 1))))
+    parser.add_argument("--device", default=os.getenv("BENCHMARK_DEVICE", "cpu"), help="cpu, 0, 0,1, ...")
+    parser.add_argument("--iterations", type=int, default=int(os.getenv("BENCHMARK_ITERATIONS", 50)),
+                        help="Timed batches per configuration")
+    parser.add_argument("--warmup", type=int, default=int(os.getenv("BENCHMARK_WARMUP", 5)))
+    parser.add_argument("--allow-onnx-batch", action="store_true",
+                        help="Also run batch > 1 on .onnx models (requires a dynamic-batch export)")
+    parser.add_argument("--output", default=os.getenv("BENCHMARK_OUTPUT", os.path.join("logs", "benchmark.json")))
+    parser.add_argument("--baseline", default=os.getenv("BENCHMARK_BASELINE", "benchmark_baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=float(os.getenv("BENCHMARK_TOLERANCE", 0.10)),
+                        help="Allowed relative slowdown before the run fails (0.10 = 10%%)")
+    return parser.parse_args(argv)
 
-    logger.info(f"--- Starting Speed Benchmark ({iterations} iterations) ---")
-    if torch.cuda.is_available():
-        logger.info(f"Hardware: {torch.cuda.get_device_name(0)}")
-
-    try:
-        # 2. PyTorch Benchmark
-        logger.info("Benchmarking PyTorch (.pt)...")
-        model_pt = YOLO(pt_path)
-        for _ in range(warmup):
-            model_pt.predict(test_img, device=0, verbose=False)
-        
-        start_time = time.time()
-        for _ in range(iterations):
-            model_pt.predict(test_img, device=0, verbose=False)
-        pt_avg = (time.time() - start_time) / iterations * 1000
-
-        # 3. ONNX Benchmark
-        logger.info("Benchmarking ONNX (.onnx)...")
-        model_onnx = YOLO(onnx_path, task='detect')
-        for _ in range(warmup):
-            model_onnx.predict(test_img, verbose=False)
-        
-        start_time = time.time()
-        for _ in range(iterations):
-            model_onnx.predict(test_img, verbose=False)
-        onnx_avg = (time.time() - start_time) / iterations * 1000
-
-        # 4. Results
-        logger.info("="*50)
-        logger.info("      INFERENCE SPEED COMPARISON (AVG)")
-        logger.info("="*50)
-        logger.info(f"  PyTorch (.pt):  {pt_avg:.2f} ms")
-        logger.info(f"  ONNX (.onnx):   {onnx_avg:.2f} ms")
-        logger.info("-" * 50)
-        
-        diff = pt_avg - onnx_avg
-        if diff > 0:
-            logger.info(f"  RESULT: ONNX is {diff:.2f} ms faster ({ (pt_avg/onnx_avg - 1)*100:.1f}%)")
-        else:
-            logger.info(f"  RESULT: PyTorch is {-diff:.2f} ms faster ({ (onnx_avg/pt_avg - 1)*100:.1f}%)")
-        logger.info("="*50)
-        
-    except Exception as e:
-        logger.error(f"Benchmark failed: {str(e)}", exc_info=True)
 
 if __name__ == "__main__":
-    run_benchmark()
+    sys.exit(run_benchmark(parse_args()))
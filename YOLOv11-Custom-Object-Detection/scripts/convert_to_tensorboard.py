@@ -1,6 +1,7 @@
 import pandas as pd
 from torch.utils.tensorboard import SummaryWriter
 import os
+from scripts.telemetry import TELEMETRY_FILE, load_telemetry
 
 def csv_to_tensorboard():
     csv_path = "runs/detect/traffic_sign_detection/yolo11_custom/results.csv"
@@ -23,6 +24,17 @@ def csv_to_tensorboard():
         for col in df.columns:
             if col != 'epoch':
                 writer.add_scalar(col, row[col], epoch)
+
+    # Training telemetry (written by scripts/telemetry.py next to results.csv)
+    telemetry_path = os.path.join(os.path.dirname(csv_path), TELEMETRY_FILE)
+    for record in load_telemetry(telemetry_path):
+        for key, value in record.items():
+            if key not in ("type", "epoch") and isinstance(value, (int, float)):
+                writer.add_scalar(f"telemetry/{key}", value, record["epoch"])
+    for step, record in enumerate(load_telemetry(telemetry_path, kind="batch")):
+        for key in ("images_per_s", "dataloader_wait_s", "compute_s", "rss_mb", "peak_rss_mb"):
+            if key in record:
+                writer.add_scalar(f"telemetry_batch/{key}", record[key], step)
                 
     writer.close()
     print(f"Conversion complete! Logs saved to {log_dir}")
@@ -0,0 +1,90 @@
+import json
+import os
+import platform
+from datetime import datetime
+
+WEIGHTS_DIR = os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights")
+DEPLOYMENT_FILE = "deployment.json"
+
+
+def deployment_path(weights_dir=WEIGHTS_DIR):
+    return os.getenv("DEPLOYMENT_PATH", os.path.join(weights_dir, DEPLOYMENT_FILE))
+
+
+def write_deployment(candidates, fastest, imgsz, device, weights_dir=WEIGHTS_DIR):
+    """
+    Record the benchmarked backends and the fastest one. Artifact paths are stored relative to
+    the weights directory, so the folder can be copied to another machine as a unit.
+    """
+    path = deployment_path(weights_dir)
+    base = os.path.dirname(os.path.abspath(path))
+
+    def rel(entry):
+        return dict(entry, path=os.path.relpath(entry["path"], base))
+
+    record = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "processor": platform.processor() or platform.machine(),
+        "imgsz": imgsz,
+        "device": str(device),
+        "fastest": rel(fastest),
+        "candidates": [rel(c) for c in candidates],
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_deployment(weights_dir=WEIGHTS_DIR):
+    """The parsed deployment.json (artifact paths made absolute), or None if there is none."""
+    path = deployment_path(weights_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        record = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for entry in [record["fastest"]] + record.get("candidates", []):
+        entry["path"] = os.path.normpath(os.path.join(base, entry["path"]))
+    return record
+
+
+def resolve_model(logger=None, weights_dir=WEIGHTS_DIR):
+    """
+    Pick the model artifact to serve:
+    1. MODEL_PATH, when set and present (explicit override; a missing .onnx falls back to its .pt),
+    2. the fastest backend recorded in deployment.json by `export_model --matrix`,
+    3. best.onnx, then best.pt.
+    Returns None if nothing exists.
+    """
+    explicit = os.getenv("MODEL_PATH")
+    if explicit:
+        for candidate in (explicit, explicit.replace(".onnx", ".pt")):
+            if os.path.exists(candidate):
+                return os.path.abspath(candidate)
+
+    try:
+        record = load_deployment(weights_dir)
+    except (OSError, ValueError, KeyError) as e:
+        record = None
+        if logger:
+            logger.warning(f"Ignoring unreadable {deployment_path(weights_dir)}: {e}")
+    if record:
+        fastest = record["fastest"]
+        if os.path.exists(fastest["path"]):
+            if logger:
+                logger.info(f"Using fastest backend from {DEPLOYMENT_FILE}: {fastest['name']} "
+                            f"({fastest['p50_ms']:.1f} ms p50 on {record.get('host', '?')})")
+                if record.get("host") != platform.node():
+                    logger.warning("deployment.json was benchmarked on another host; re-run the export matrix here.")
+            return fastest["path"]
+        if logger:
+            logger.warning(f"Fastest backend {fastest['path']} from {DEPLOYMENT_FILE} is missing; falling back.")
+
+    for name in ("best.onnx", "best.pt"):
+        candidate = os.path.join(weights_dir, name)
+        if os.path.exists(candidate):
+            return candidate
+    return None
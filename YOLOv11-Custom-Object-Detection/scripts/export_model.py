@@ -1,10 +1,22 @@
+import argparse
+import json
 import os
-from ultralytics import YOLO
+import time
+from scripts.model_registry import get_model
 from scripts.logger_utils import setup_production_logging
 
 # Initialize Production Logger
 logger = setup_production_logging("export_model")
 
+# name -> (Ultralytics export kwargs, artifact name it is renamed to). ONNX variants share the
+# default output name best.onnx, so each one is moved aside before the next export.
+EXPORT_MATRIX = {
+    "onnx_fp32": (dict(format="onnx", simplify=True, dynamic=False, half=False), "best_fp32.onnx"),
+    "onnx_dynamic": (dict(format="onnx", simplify=True, dynamic=True, half=False), "best_dynamic.onnx"),
+    "openvino": (dict(format="openvino", half=False), None),
+    "torchscript": (dict(format="torchscript"), None),
+}
+
 def export_to_onnx():
     # 1. Path Configuration via Environment Variables
     weights_path = os.getenv("MODEL_PATH", os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights/best.pt"))
@@ -15,7 +27,7 @@ def export_to_onnx():
 
     logger.info(f"--- Loading Model for Export: {weights_path} ---")
     try:
-        model = YOLO(weights_path)
+        model = get_model(weights_path)
     except Exception as e:
         logger.error(f"Failed to load model: {str(e)}")
         return
@@ -38,5 +50,234 @@ def export_to_onnx():
     except Exception as e:
         logger.error(f"Export failed: {str(e)}", exc_info=True)
 
+def export_variant(weights_path, name, imgsz):
+    """Export one EXPORT_MATRIX entry; returns the artifact path (file or directory)."""
+    kwargs, target = EXPORT_MATRIX[name]
+    # Keep an existing best.onnx (the FP16 export) from being overwritten by the ONNX variants
+    default = os.path.splitext(weights_path)[0] + ".onnx"
+    stash = default + ".keep" if target and os.path.exists(default) else None
+    if stash:
+        os.replace(default, stash)
+    try:
+        path = get_model(weights_path).export(imgsz=imgsz, **kwargs)
+        if target:
+            renamed = os.path.join(os.path.dirname(path), target)
+            os.replace(path, renamed)
+            path = renamed
+    finally:
+        if stash:
+            os.replace(stash, default)
+    return os.path.abspath(path)
+
+def export_matrix(weights_path, formats, imgsz, source, device="cpu", iterations=50, warmup=5, threads=None):
+    """
+    Export best.pt to each format, benchmark every artifact (plus the .pt itself) on this machine
+    at batch 1, and record the fastest backend in deployment.json next to the weights.
+    """
+    from scripts.benchmark_comparison import benchmark_config, load_images, set_threads
+    from scripts.deployment import write_deployment
+
+    images = load_images(source, 32)
+    threads = threads or os.cpu_count() or 1
+    artifacts = {"pytorch": os.path.abspath(weights_path)}
+    for name in formats:
+        logger.info(f"--- Exporting {name} ---")
+        try:
+            artifacts[name] = export_variant(weights_path, name, imgsz)
+            logger.info(f"  {name}: {artifacts[name]}")
+        except Exception as e:
+            logger.error(f"  {name} export failed: {e}")
+
+    candidates = []
+    for name, path in artifacts.items():
+        logger.info(f"--- Benchmarking {name} ({iterations} iterations, {threads} threads, device={device}) ---")
+        try:
+            model = get_model(path, task="detect")
+            model.predict(images[0], imgsz=imgsz, device=device, verbose=False)
+            set_threads(model, threads)
+            summary = benchmark_config(model, images, 1, imgsz, device, warmup, iterations)
+        except Exception as e:
+            logger.error(f"  {name} benchmark failed: {e}")
+            continue
+        size = (sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+                if os.path.isdir(path) else os.path.getsize(path))
+        candidates.append({
+            "name": name,
+            "path": path,
+            "p50_ms": summary["latency_ms"]["p50"],
+            "p90_ms": summary["latency_ms"]["p90"],
+            "throughput_ips": summary["throughput_ips"],
+            "per_image_ms": summary["per_image_ms"],
+            "size_mb": size / 1e6,
+        })
+
+    if not candidates:
+        logger.error("No backend could be benchmarked; deployment.json not written.")
+        return None
+
+    candidates.sort(key=lambda c: c["p50_ms"])
+    logger.info("=" * 60)
+    logger.info(f"{'backend':<14}{'p50 ms':>10}{'p90 ms':>10}{'img/s':>10}{'MB':>10}")
+    for c in candidates:
+        logger.info(f"{c['name']:<14}{c['p50_ms']:>10.1f}{c['p90_ms']:>10.1f}{c['throughput_ips']:>10.1f}{c['size_mb']:>10.1f}")
+    logger.info("=" * 60)
+    path = write_deployment(candidates, candidates[0], imgsz, device, weights_dir=os.path.dirname(os.path.abspath(weights_path)))
+    logger.info(f"Fastest backend: {candidates[0]['name']} -> recorded in {path}")
+    return candidates[0]
+
+# The only checkpoint args Ultralytics reads back for inference (Model._reset_ckpt_args)
+INFERENCE_ARGS = ("imgsz", "data", "task", "single_cls")
+
+def slim_checkpoint(weights_path, out_path, half=False):
+    """
+    Write an inference-only copy of a checkpoint with Ultralytics' strip_optimizer (EMA weights as the model,
+    no optimizer/EMA/scaler state, gradients off), also dropping training metrics/results and git info and
+    keeping only the train_args inference reads back. strip_optimizer always stores FP16; an FP32 source is
+    cast back unless half=True, so the weights keep the source dtype by default.
+    Kept in sync with E2E-Workflow-for-Object-Detection-Deployment/src/yolo_project/export_artifacts.py.
+    """
+    import torch
+    from ultralytics.utils.torch_utils import strip_optimizer
+
+    src = torch.load(weights_path, map_location="cpu", weights_only=False)
+    fp32 = next((src.get("ema") or src["model"]).parameters()).dtype == torch.float32
+    args = {k: v for k, v in (src.get("train_args") or {}).items() if k in INFERENCE_ARGS}
+    del src
+    ckpt = strip_optimizer(weights_path, out_path,
+                           updates={"train_args": args, "train_metrics": None, "train_results": None, "git": None})
+    if not ckpt:
+        raise ValueError(f"{weights_path} is not an Ultralytics checkpoint")
+    if fp32 and not half:
+        ckpt["model"].float()
+        torch.save(ckpt, out_path)
+    return out_path
+
+def load_seconds(weights_path, repeats=3):
+    """Best-of-n time to load a checkpoint, bypassing the model registry cache."""
+    from ultralytics import YOLO
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        YOLO(weights_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def compare_detections(reference_path, candidate_path, images, imgsz, conf=0.25, iou=0.95):
+    """
+    Predict with both checkpoints on the CPU. An image matches when the detection counts agree and every
+    reference box has a same-class candidate box with IoU >= iou.
+    """
+    from ultralytics import YOLO
+    from ultralytics.utils.metrics import box_iou
+
+    ref, cand = YOLO(reference_path), YOLO(candidate_path)
+    mismatched, max_box, max_conf = [], 0.0, 0.0
+    for i, img in enumerate(images):
+        a = ref.predict(img, imgsz=imgsz, conf=conf, device="cpu", verbose=False)[0].boxes
+        b = cand.predict(img, imgsz=imgsz, conf=conf, device="cpu", verbose=False)[0].boxes
+        if len(a) != len(b):
+            mismatched.append(i)
+            continue
+        if not len(a):
+            continue
+        overlap = box_iou(a.xyxy, b.xyxy) * (a.cls[:, None] == b.cls[None, :])
+        match = overlap.argmax(1)
+        if (overlap.max(1).values < iou).any() or len(set(match.tolist())) != len(a):
+            mismatched.append(i)
+            continue
+        max_box = max(max_box, float((a.xyxy - b.xyxy[match]).abs().max()))
+        max_conf = max(max_conf, float((a.conf - b.conf[match]).abs().max()))
+    return {"images": len(images), "mismatched": mismatched, "max_box_px": max_box, "max_conf_delta": max_conf}
+
+def slim_weights(weights_path, source, imgsz, half=False, max_images=32):
+    """
+    Write best_slim.pt next to the weights, verify it reproduces the detections of the original on up to
+    max_images images from source, and record size/load-time reduction in best_slim.json. An FP16
+    checkpoint that changes any detection is rewritten in the source dtype. Returns (slim path, report), or
+    (weights_path, None) after deleting best_slim.pt when it is not smaller than the weights (a finished
+    best.pt is already stripped) or changes detections.
+    """
+    from scripts.benchmark_comparison import load_images
+
+    images = load_images(source, max_images)
+    slim_path = os.path.join(os.path.dirname(os.path.abspath(weights_path)), "best_slim.pt")
+    logger.info(f"--- Writing inference-only checkpoint{' (FP16)' if half else ''}: {slim_path} ---")
+    slim_checkpoint(weights_path, slim_path, half=half)
+
+    def discard(reason):
+        logger.warning(f"{os.path.basename(slim_path)} {reason}; keep using {weights_path}")
+        os.remove(slim_path)
+        return weights_path, None
+
+    size = os.path.getsize(weights_path)
+    if os.path.getsize(slim_path) >= size:
+        return discard(f"is not smaller than the weights ({size / 1e6:.1f} MB, already stripped)")
+    check = compare_detections(weights_path, slim_path, images, imgsz)
+    if half and check["mismatched"]:
+        logger.warning(f"FP16 weights changed detections on {len(check['mismatched'])}/{check['images']} images; "
+                       "keeping the source dtype")
+        half = False
+        slim_checkpoint(weights_path, slim_path, half=False)
+        if os.path.getsize(slim_path) >= size:
+            return discard("is not smaller than the weights without FP16")
+        check = compare_detections(weights_path, slim_path, images, imgsz)
+    if check["mismatched"]:
+        return discard(f"changed detections on {len(check['mismatched'])}/{check['images']} images")
+
+    slim_size = os.path.getsize(slim_path)
+    load, slim_load = load_seconds(weights_path), load_seconds(slim_path)
+    report = {
+        "weights": os.path.abspath(weights_path),
+        "slim": slim_path,
+        "half": half,
+        "bytes": size,
+        "slim_bytes": slim_size,
+        "size_reduction_pct": 100 * (1 - slim_size / size),
+        "load_s": load,
+        "slim_load_s": slim_load,
+        "load_time_reduction_pct": 100 * (1 - slim_load / load),
+        "verification": check,
+    }
+    with open(os.path.splitext(slim_path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info("=" * 60)
+    logger.info(f"  Size: {size / 1e6:.1f} MB -> {slim_size / 1e6:.1f} MB ({-report['size_reduction_pct']:+.0f}%)")
+    logger.info(f"  Load: {load * 1e3:.0f} ms -> {slim_load * 1e3:.0f} ms ({-report['load_time_reduction_pct']:+.0f}%)")
+    logger.info(f"  Identical detections on {check['images']} images "
+                f"(max box shift {check['max_box_px']:.2f} px, max conf delta {check['max_conf_delta']:.4f})")
+    logger.info("=" * 60)
+    return slim_path, report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export trained weights (FP16 ONNX, or a benchmarked format matrix).")
+    parser.add_argument("--matrix", action="store_true",
+                        help="Export several formats, benchmark them here and write deployment.json")
+    parser.add_argument("--slim", action="store_true",
+                        help="Write an inference-only best_slim.pt (no optimizer/EMA/training args), verified on --source")
+    parser.add_argument("--half", action="store_true", help="With --slim, store FP16 weights if detections stay identical")
+    parser.add_argument("--weights", default=os.getenv("MODEL_PATH", os.path.abspath(
+        "runs/detect/traffic_sign_detection/yolo11_custom/weights/best.pt")))
+    parser.add_argument("--formats", nargs="+", choices=list(EXPORT_MATRIX), default=list(EXPORT_MATRIX))
+    parser.add_argument("--imgsz", type=int, default=int(os.getenv("IMG_SIZE", 640)))
+    parser.add_argument("--source", default="dataset/valid/images", help="Images used for benchmarking / slim verification")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads (default: all cores)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    export_to_onnx()
+    args = parse_args()
+    if args.slim:
+        if not os.path.exists(args.weights):
+            logger.error(f"Trained weights not found at {args.weights}")
+        else:
+            slim_weights(args.weights, args.source, args.imgsz, half=args.half)
+    elif args.matrix:
+        if not os.path.exists(args.weights):
+            logger.error(f"Trained weights not found at {args.weights}")
+        else:
+            export_matrix(args.weights, args.formats, args.imgsz, args.source, args.device, args.iterations,
+                          threads=args.threads)
+    else:
+        export_to_onnx()
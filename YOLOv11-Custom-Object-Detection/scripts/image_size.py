@@ -0,0 +1,120 @@
+"""
+Header-only image dimension probing.
+
+Reads width/height from the JPEG, PNG or BMP header instead of decoding the
+whole image. JPEG EXIF orientation is honoured the same way ``cv2.imread``
+does, so the returned size matches the decoded array. Anything the parsers
+do not understand falls back to ``cv2.imread``.
+
+Kept in sync with YOLOv8-Oriented-Bounding-Box/src/data/image_size.py.
+"""
+
+from pathlib import Path
+import struct
+from typing import BinaryIO, Optional, Tuple, Union
+
+import cv2
+
+
+# SOF markers that carry the frame size (excludes DHT 0xC4, JPG 0xC8 and DAC 0xCC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+
+def _exif_orientation(payload: bytes) -> int:
+    """Return the EXIF orientation tag from an APP1 payload (1 if absent)."""
+    if not payload.startswith(b"Exif\x00\x00"):
+        return 1
+    tiff = payload[6:]
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        return 1
+    (ifd_offset,) = struct.unpack(endian + "I", tiff[4:8])
+    if ifd_offset + 2 > len(tiff):
+        return 1
+    (count,) = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])
+    for i in range(count):
+        entry = tiff[ifd_offset + 2 + 12 * i:ifd_offset + 14 + 12 * i]
+        if len(entry) < 12:
+            break
+        tag, = struct.unpack(endian + "H", entry[:2])
+        if tag == 0x0112:
+            (value,) = struct.unpack(endian + "H", entry[8:10])
+            return value
+    return 1
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(2)
+    orientation = None
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in _STANDALONE_MARKERS:
+            continue
+        if code == 0xDA:  # start of scan before any frame header
+            return None
+        (length,) = struct.unpack(">H", f.read(2))
+        if code in _SOF_MARKERS:
+            _, h, w = struct.unpack(">BHH", f.read(5))
+            # Orientations 5-8 rotate by 90 degrees; cv2.imread applies them on decode
+            return (h, w) if orientation in (5, 6, 7, 8) else (w, h)
+        if code == 0xE1:
+            # APP1 also carries XMP; only the first EXIF segment sets the orientation
+            payload = f.read(length - 2)
+            if orientation is None and payload.startswith(b"Exif\x00\x00"):
+                orientation = _exif_orientation(payload)
+        else:
+            f.seek(length - 2, 1)
+
+
+def _png_size(header: bytes) -> Optional[Tuple[int, int]]:
+    if header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+def _bmp_size(header: bytes) -> Optional[Tuple[int, int]]:
+    (dib_size,) = struct.unpack("<I", header[14:18])
+    if dib_size == 12:  # BITMAPCOREHEADER
+        return struct.unpack("<HH", header[18:22])
+    w, h = struct.unpack("<ii", header[18:26])
+    return w, abs(h)  # negative height means top-down rows
+
+
+def probe_image_size(image_path: Union[str, Path]) -> Tuple[int, int]:
+    """Return (width, height) of an image, reading only its header when possible."""
+    image_path = Path(image_path)
+    size = None
+    try:
+        with image_path.open("rb") as f:
+            header = f.read(26)
+            if header[:2] == b"\xff\xd8":
+                size = _jpeg_size(f)
+            elif header[:8] == b"\x89PNG\r\n\x1a\n":
+                size = _png_size(header)
+            elif header[:2] == b"BM":
+                size = _bmp_size(header)
+    except (OSError, struct.error):
+        size = None
+
+    if size is None or size[0] <= 0 or size[1] <= 0:
+        img = cv2.imread(str(image_path))
+        if img is None:
+            raise RuntimeError(f"Failed to read image: {image_path}")
+        h, w = img.shape[:2]
+        return w, h
+    return int(size[0]), int(size[1])
@@ -1,6 +1,6 @@
 import cv2
 import torch
-from ultralytics import YOLO
+from scripts.model_registry import get_model
 import sys
 import os
 
@@ -13,7 +13,7 @@ def run_inference(source_path):
         weights_path = "yolo11n.pt"
 
     print(f"--- Loading Model: {weights_path} ---")
-    model = YOLO(weights_path)
+    model = get_model(weights_path)
 
     # 2. Run Inference
     # stream=True is efficient for memory
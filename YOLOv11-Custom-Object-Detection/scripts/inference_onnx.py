@@ -1,19 +1,59 @@
 import os
 import sys
-from ultralytics import YOLO
+import time
+
+def _image_paths(source_path):
+    exts = ('.jpg', '.jpeg', '.png', '.bmp')
+    if os.path.isdir(source_path):
+        return sorted(os.path.join(source_path, f) for f in os.listdir(source_path) if f.lower().endswith(exts))
+    return [source_path]
 
 def test_onnx_inference(source_path):
-    # 1. Path to the exported ONNX model
-    onnx_path = os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights/best.onnx")
+    # 1. Exported model: MODEL_PATH, else the fastest backend from deployment.json, else best.onnx
+    from scripts.deployment import resolve_model
+
+    onnx_path = resolve_model()
 
-    if not os.path.exists(onnx_path):
-        print(f"Error: ONNX model not found at {onnx_path}")
-        print("Please run export_model.py first.")
+    if onnx_path is None:
+        print("Error: no exported model found.")
+        print("Please run export_model.py (or export_model.py --matrix) first.")
         return
 
+    # Non-ONNX winners (OpenVINO, TorchScript) and ONNX_BACKEND=ultralytics go through YOLO(...), which pulls in torch
+    if not onnx_path.endswith(".onnx") or os.getenv("ONNX_BACKEND", "ort").lower() == "ultralytics":
+        return _ultralytics_inference(onnx_path, source_path)
+
+    import cv2
+    from scripts.onnx_detector import OnnxDetector, draw_detections
+
     print(f"--- Loading ONNX Model: {onnx_path} ---")
-    # Ultralytics supports running .onnx files directly
-    model = YOLO(onnx_path, task='detect')
+    start = time.perf_counter()
+    detector = OnnxDetector(onnx_path, conf=0.25)
+    print(f"  Session ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # 2. Run Inference
+    print(f"Running inference on: {source_path}")
+    save_dir = os.path.abspath(os.path.join("inference_tests", "onnx_results"))
+    os.makedirs(save_dir, exist_ok=True)
+    for path in _image_paths(source_path):
+        image = cv2.imread(path)
+        if image is None:
+            print(f"Warning: could not read {path}")
+            continue
+        detections = detector(image)
+        cv2.imwrite(os.path.join(save_dir, os.path.basename(path)), draw_detections(image, detections, detector.names))
+
+    print("\n" + "="*50)
+    print("--- ONNX Inference Complete ---")
+    print(f"  Results saved to: {save_dir}")
+    print("="*50)
+
+def _ultralytics_inference(onnx_path, source_path):
+    from scripts.model_registry import get_model
+
+    print(f"--- Loading Model: {onnx_path} ---")
+    # Ultralytics runs .onnx files (and other exported formats) directly
+    model = get_model(onnx_path, task='detect')
 
     # 2. Run Inference
     print(f"Running inference on: {source_path}")
@@ -34,10 +74,10 @@ def test_onnx_inference(source_path):
 if __name__ == "__main__":
     # Default to the entire validation images folder for a better overview
     test_source = "dataset/valid/images/"
-    
+
     if len(sys.argv) > 1:
         test_source = sys.argv[1]
-        
+
     if os.path.exists(test_source):
         print(f"--- Processing Source: {test_source} ---")
         test_onnx_inference(test_source)
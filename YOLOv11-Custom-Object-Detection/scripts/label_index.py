@@ -0,0 +1,366 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+
+from scripts.image_size import probe_image_size
+from scripts.logger_utils import setup_production_logging
+
+# Initialize Production Logger
+logger = setup_production_logging("label_index")
+
+INDEX_DIRNAME = ".label_index"
+INDEX_VERSION = 1
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Row kinds produced by the parser
+KIND_BOX, KIND_QUAD, KIND_SEGMENT = 0, 1, 2
+
+
+def load_data_config(yaml_path):
+    with open(yaml_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def resolve_split(yaml_path, data_config, split):
+    """Return the absolute image directory (or list file) for a split of data.yaml, or None."""
+    split_path = data_config.get(split)
+    if not split_path:
+        return None
+    base = os.path.dirname(os.path.abspath(yaml_path))
+    if data_config.get('path'):
+        base = os.path.join(base, data_config['path'])
+    # Handle both absolute and relative paths in data.yaml
+    if not os.path.isabs(split_path):
+        split_path = os.path.join(base, split_path)
+    return os.path.abspath(split_path)
+
+
+def image_to_label_path(img_path):
+    """Same rule Ultralytics uses: swap the last /images/ path segment for /labels/."""
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    head, sep, tail = img_path.rpartition(sa)
+    stem = os.path.splitext(tail if sep else img_path)[0]
+    return (head + sb + stem if sep else stem) + '.txt'
+
+
+def list_split_images(split_path):
+    """Sorted absolute image paths of a split directory or .txt list file."""
+    if os.path.isfile(split_path) and split_path.endswith('.txt'):
+        base = os.path.dirname(split_path)
+        with open(split_path, 'r') as f:
+            paths = [line.strip() for line in f if line.strip()]
+        return sorted(os.path.abspath(os.path.join(base, p)) for p in paths)
+    images = []
+    for root, _, files in os.walk(split_path):
+        images.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(images)
+
+
+def _dir_stamp(path):
+    """Cheap change detector: file count, newest mtime and the directory's own mtime."""
+    if not os.path.isdir(path):
+        return [0, 0, 0]
+    count, newest = 0, 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            count += 1
+            newest = max(newest, os.stat(os.path.join(root, f)).st_mtime_ns)
+    return [count, newest, os.stat(path).st_mtime_ns]
+
+
+def labels_dir_for(images_dir):
+    """Label directory that pairs with an image directory (last images/ segment -> labels/)."""
+    p = images_dir.rstrip(os.sep) + os.sep
+    head, sep, tail = p.rpartition(f"{os.sep}images{os.sep}")
+    return (head + f"{os.sep}labels{os.sep}" + tail).rstrip(os.sep) if sep else images_dir
+
+
+def _split_stamp(split_path):
+    if os.path.isfile(split_path):
+        label_dirs = sorted({os.path.dirname(image_to_label_path(p)) for p in list_split_images(split_path)})
+        return {"list": os.stat(split_path).st_mtime_ns, "labels": [_dir_stamp(d) for d in label_dirs]}
+    return {"images": _dir_stamp(split_path), "labels": _dir_stamp(labels_dir_for(split_path))}
+
+
+def parse_label_text(text):
+    """Parse one YOLO label file.
+
+    Returns (cls int32[N], coords float32[N, 8], kinds int8[N], bad_lines int). Box rows keep
+    cx, cy, w, h in the first four columns; 8-point rows (OBB) fill all eight; longer polygon
+    rows (segments) are reduced to their bounding box in cx, cy, w, h.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    n = len(lines)
+    cls = np.zeros(n, np.int32)
+    coords = np.full((n, 8), np.nan, np.float32)
+    kinds = np.zeros(n, np.int8)
+    if n == 0:
+        return cls, coords, kinds, 0
+
+    # Fast path: every row has the same column count (checked per line, not from the total token count)
+    rows = [line.split() for line in lines]
+    widths = set(map(len, rows))
+    kind = {5: KIND_BOX, 9: KIND_QUAD}.get(widths.pop()) if len(widths) == 1 else None
+    if kind is not None:
+        try:
+            arr = np.array(rows, dtype=np.float64)
+        except ValueError:
+            arr = None
+        if arr is not None and np.all(arr[:, 0] == np.floor(arr[:, 0])):
+            ncols = arr.shape[1]
+            cls[:] = arr[:, 0]
+            coords[:, :ncols - 1] = arr[:, 1:]
+            kinds[:] = kind
+            return cls, coords, kinds, 0
+
+    # Slow path: mixed or malformed rows
+    keep = np.zeros(n, bool)
+    for i, row in enumerate(rows):
+        try:
+            values = np.array(row, dtype=np.float64)
+        except ValueError:
+            continue
+        if len(values) < 5 or values[0] != np.floor(values[0]):
+            continue
+        if len(values) == 5:
+            coords[i, :4] = values[1:]
+            kinds[i] = KIND_BOX
+        elif len(values) == 9:
+            coords[i] = values[1:]
+            kinds[i] = KIND_QUAD
+        elif len(values) >= 7 and len(values) % 2 == 1:
+            xy = values[1:].reshape(-1, 2)
+            (x0, y0), (x1, y1) = xy.min(0), xy.max(0)
+            coords[i, :4] = ((x0 + x1) / 2, (y0 + y1) / 2, x1 - x0, y1 - y0)
+            kinds[i] = KIND_SEGMENT
+        else:
+            continue
+        cls[i] = int(values[0])
+        keep[i] = True
+    return cls[keep], coords[keep], kinds[keep], int(n - keep.sum())
+
+
+def _parse_chunk(items):
+    """Worker: parse (image, label) pairs; returns per-image counts and concatenated rows."""
+    cls_parts, coord_parts, kind_parts = [], [], []
+    counts = np.zeros(len(items), np.int64)
+    sizes = np.zeros((len(items), 2), np.int32)
+    has_label = np.zeros(len(items), bool)
+    bad_lines = np.zeros(len(items), np.int32)
+    for j, (img_path, lbl_path) in enumerate(items):
+        try:
+            sizes[j] = probe_image_size(img_path)
+        except (RuntimeError, OSError):
+            sizes[j] = (0, 0)  # unreadable image
+        if not os.path.isfile(lbl_path):
+            continue
+        has_label[j] = True
+        with open(lbl_path, 'r') as f:
+            cls, coords, kinds, bad = parse_label_text(f.read())
+        counts[j] = len(cls)
+        bad_lines[j] = bad
+        cls_parts.append(cls)
+        coord_parts.append(coords)
+        kind_parts.append(kinds)
+    return (
+        np.concatenate(cls_parts) if cls_parts else np.zeros(0, np.int32),
+        np.concatenate(coord_parts) if coord_parts else np.zeros((0, 8), np.float32),
+        np.concatenate(kind_parts) if kind_parts else np.zeros(0, np.int8),
+        counts, sizes, has_label, bad_lines,
+    )
+
+
+def _quad_to_xywh(quads):
+    xy = quads.reshape(-1, 4, 2)
+    lo, hi = xy.min(1), xy.max(1)
+    return np.concatenate([(lo + hi) / 2, hi - lo], axis=1)
+
+
+class LabelIndex:
+    """Columnar, memory-mapped view of every label in one dataset split.
+
+    Rows are labels, ordered by image; ``offsets[i]:offsets[i + 1]`` are the rows of image ``i``.
+    ``coords`` holds cx, cy, w, h for box datasets and x1..y4 for OBB datasets (normalized).
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json"), 'r') as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode='r')
+        self.cls = load("cls")
+        self.coords = load("coords")
+        self.offsets = load("offsets")
+        self.sizes = load("sizes")
+        self.has_label = load("has_label")
+        self.bad_lines = load("bad_lines")
+        self.images = self.meta["images"]
+        self.format = self.meta["format"]
+        self._row_image = None
+
+    def __len__(self):
+        return len(self.cls)
+
+    @property
+    def num_images(self):
+        return len(self.images)
+
+    @property
+    def row_image(self):
+        """Image index of every label row."""
+        if self._row_image is None:
+            self._row_image = np.repeat(np.arange(self.num_images), np.diff(self.offsets))
+        return self._row_image
+
+    def image_index(self, image):
+        """Index of an image given its position, absolute path or file name."""
+        if isinstance(image, (int, np.integer)):
+            return int(image)
+        if not hasattr(self, "_by_name"):
+            self._by_name = {}
+            for i, p in enumerate(self.images):
+                self._by_name[p] = i
+                self._by_name.setdefault(os.path.basename(p), i)
+        return self._by_name[image]
+
+    def by_image(self, image):
+        """(cls, coords) of one image."""
+        i = self.image_index(image)
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return np.asarray(self.cls[a:b]), np.asarray(self.coords[a:b])
+
+    def by_class(self, class_id):
+        """Row indices of all labels of a class."""
+        return np.flatnonzero(self.cls == class_id)
+
+    def images_with_class(self, class_id):
+        return np.unique(self.row_image[self.by_class(class_id)])
+
+    def areas(self, pixels=False):
+        """Box area per row, normalized (fraction of the image) or in pixels."""
+        if self.format == "obb":
+            xy = np.asarray(self.coords, np.float64).reshape(-1, 4, 2)
+            x, y = xy[..., 0], xy[..., 1]
+            area = 0.5 * np.abs(np.sum(x * np.roll(y, -1, 1) - np.roll(x, -1, 1) * y, axis=1))
+        else:
+            area = np.asarray(self.coords[:, 2], np.float64) * np.asarray(self.coords[:, 3], np.float64)
+        if pixels:
+            wh = self.sizes[self.row_image].astype(np.float64)
+            area = area * wh[:, 0] * wh[:, 1]
+        return area
+
+    def by_box_size(self, min_area=0.0, max_area=np.inf, pixels=False):
+        """Row indices whose box area lies in [min_area, max_area)."""
+        area = self.areas(pixels=pixels)
+        return np.flatnonzero((area >= min_area) & (area < max_area))
+
+    def class_counts(self, nc=None):
+        minlength = nc or (int(self.cls.max()) + 1 if len(self.cls) else 0)
+        return np.bincount(np.clip(self.cls, 0, None), minlength=minlength)
+
+
+def index_dir_for(yaml_path, split):
+    return os.path.join(os.path.dirname(os.path.abspath(yaml_path)), INDEX_DIRNAME, split)
+
+
+def build_index(yaml_path, split, workers=None, chunk_size=256):
+    """Parse every label file of a split once, in parallel, and save it as .npy arrays."""
+    data_config = load_data_config(yaml_path)
+    split_path = resolve_split(yaml_path, data_config, split)
+    if split_path is None or not os.path.exists(split_path):
+        raise FileNotFoundError(f"Split '{split}' not found in {yaml_path}")
+
+    images = list_split_images(split_path)
+    items = [(p, image_to_label_path(p)) for p in images]
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_parse_chunk, chunks))
+    else:
+        parts = [_parse_chunk(c) for c in chunks]
+
+    def cat(k, empty):
+        return np.concatenate([p[k] for p in parts]) if parts else empty
+
+    cls = cat(0, np.zeros(0, np.int32))
+    coords = cat(1, np.zeros((0, 8), np.float32))
+    kinds = cat(2, np.zeros(0, np.int8))
+    counts = cat(3, np.zeros(0, np.int64))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    # OBB datasets have 8-point rows only; anything else is indexed as cx, cy, w, h boxes
+    if len(kinds) and np.all(kinds == KIND_QUAD):
+        fmt = "obb"
+    else:
+        fmt = "box"
+        quad = kinds == KIND_QUAD
+        coords[quad, :4] = _quad_to_xywh(coords[quad])
+        coords = coords[:, :4]
+
+    out_dir = index_dir_for(yaml_path, split)
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {
+        "cls": cls, "coords": np.ascontiguousarray(coords, np.float32), "offsets": offsets,
+        "sizes": cat(4, np.zeros((0, 2), np.int32)), "has_label": cat(5, np.zeros(0, bool)),
+        "bad_lines": cat(6, np.zeros(0, np.int32)),
+    }
+    for name, arr in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), arr)
+    meta = {
+        "version": INDEX_VERSION, "split": split, "split_path": split_path, "format": fmt,
+        "stamp": _split_stamp(split_path), "images": images,
+    }
+    with open(os.path.join(out_dir, "meta.json"), 'w') as f:
+        json.dump(meta, f)
+    return LabelIndex(out_dir)
+
+
+def is_stale(yaml_path, split):
+    meta_path = os.path.join(index_dir_for(yaml_path, split), "meta.json")
+    if not os.path.exists(meta_path):
+        return True
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    if meta.get("version") != INDEX_VERSION:
+        return True
+    split_path = resolve_split(yaml_path, load_data_config(yaml_path), split)
+    return split_path != meta.get("split_path") or _split_stamp(split_path) != meta.get("stamp")
+
+
+def load_index(yaml_path, split="train", workers=None, rebuild=False):
+    """Load the index of a split, rebuilding it when label or image files changed."""
+    if rebuild or is_stale(yaml_path, split):
+        logger.info(f"Building label index for '{split}' split...")
+        return build_index(yaml_path, split, workers=workers)
+    return LabelIndex(index_dir_for(yaml_path, split))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build/inspect the columnar label index of a dataset.")
+    parser.add_argument("--data", default=os.getenv("DATASET_YAML", os.path.abspath("dataset/data.yaml")))
+    parser.add_argument("--split", nargs="+", default=["train", "val", "test"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    data_config = load_data_config(args.data)
+    names = data_config.get('names', [])
+    for split in args.split:
+        if not data_config.get(split):
+            continue
+        index = load_index(args.data, split, workers=args.workers, rebuild=args.rebuild)
+        counts = index.class_counts(len(names) or None)
+        logger.info(f"[{split}] {index.num_images} images, {len(index)} labels ({index.format}), "
+                    f"{int((~np.asarray(index.has_label)).sum())} without label file")
+        for cls_id, n in enumerate(counts):
+            name = names[cls_id] if isinstance(names, list) and cls_id < len(names) else cls_id
+            logger.info(f"    {name}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,41 @@
+import argparse
 import cv2
 import os
-import torch
-from ultralytics import YOLO
 from scripts.logger_utils import setup_production_logging
+from scripts.deployment import resolve_model
+from scripts.live_pipeline import LivePipeline
+from scripts.video_sources import AsyncVideoWriter, FrameSource
 
 # Initialize Production Logger
 logger = setup_production_logging("live_inference")
 
-def start_live_inference():
-    # 1. Configuration via Environment Variables
-    model_path = os.getenv("MODEL_PATH", os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights/best.onnx"))
-    camera_id = int(os.getenv("CAMERA_ID", 0))
-    min_confidence = float(os.getenv("MIN_CONFIDENCE", 0.25))  # Lowered for better distant detection
-    img_size = int(os.getenv("IMG_SIZE", 640))
-    
-    # Fallback to .pt if .onnx doesn't exist
-    if not os.path.exists(model_path):
-        pt_fallback = model_path.replace(".onnx", ".pt")
-        if os.path.exists(pt_fallback):
-            model_path = pt_fallback
-        else:
-            # Try hardcoded local fallback if the ENV path completely failed
-            model_path = os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights/best.pt")
-
-    if not os.path.exists(model_path):
-        logger.error(f"Model weights not found at {model_path}")
-        return
-
-    logger.info(f"--- Loading Model: {model_path} ---")
-    try:
-        model = YOLO(model_path, task='detect')
-    except Exception as e:
-        logger.error(f"Failed to load engine: {str(e)}")
-        return
+def load_backend(model_path, min_confidence, img_size):
+    """
+    Returns (infer, render): infer(frame) -> (result, [(label, conf), ...]) and
+    render(frame, result) -> annotated_frame, so drawing can run on its own pipeline stage.
+    .onnx models run on plain ONNX Runtime (no torch import); anything else goes through Ultralytics.
+    """
+    if model_path.endswith(".onnx") and os.getenv("ONNX_BACKEND", "ort").lower() != "ultralytics":
+        from scripts.onnx_detector import OnnxDetector, draw_detections
 
-    # 2. Initialize Camera
-    cap = cv2.VideoCapture(camera_id)
+        detector = OnnxDetector(model_path, conf=min_confidence)
+        if detector.imgsz != (img_size, img_size):
+            logger.info(f"ONNX model has fixed input {detector.imgsz}; IMG_SIZE={img_size} ignored")
 
-    if not cap.isOpened():
-        logger.error(f"Could not open webcam with ID: {camera_id}")
-        return
+        def infer(frame):
+            det = detector(frame)
+            found = [(detector.names.get(int(c), str(c)), float(s)) for c, s in zip(det.class_ids, det.scores)]
+            return det, found
 
-    # Set internal buffer to small value for real-time
-    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        def render(frame, det):
+            return draw_detections(frame, det, detector.names)
+        return infer, render
 
-    logger.info("LIVE INFERENCE STARTED")
-    logger.info(f"  - Camera ID: {camera_id}")
-    logger.info(f"  - Confidence Threshold: {min_confidence}")
+    from scripts.model_registry import get_model
 
-    while True:
-        start_tick = cv2.getTickCount()
-        ret, frame = cap.read()
-        if not ret:
-            logger.warning("Failed to grab frame. Retrying...")
-            continue
+    model = get_model(model_path, task='detect')
 
-        # 3. Run Inference
+    def infer(frame):
         results = model.predict(
             source=frame, 
             conf=min_confidence, 
@@ -64,34 +44,117 @@ def start_live_inference():
             stream=False
         )
         result = results[0]
+        found = [(result.names[int(box.cls[0])], float(box.conf[0])) for box in result.boxes]
+        return result, found
+
+    def render(frame, result):
+        return result.plot()
+    return infer, render
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Live / replayed YOLO11 inference.")
+    parser.add_argument("--source", default=os.getenv("SOURCE", os.getenv("CAMERA_ID", "0")),
+                        help="Webcam index, video file / stream URL, or directory of frames")
+    parser.add_argument("--headless", action="store_true", default=os.getenv("HEADLESS", "0") == "1",
+                        help="No window; write annotated output through a background encoder")
+    parser.add_argument("--output", default=os.getenv("OUTPUT_PATH", os.path.join("inference_tests", "live_output.mp4")),
+                        help="Annotated output (.mp4/.avi/.mkv/.mov, anything else is a frame directory)")
+    parser.add_argument("--stride", type=int, default=int(os.getenv("FRAME_STRIDE", 1)),
+                        help="Process every N-th source frame")
+    parser.add_argument("--realtime", choices=["auto", "on", "off"], default=os.getenv("REALTIME", "auto"),
+                        help="Pace recorded sources at their native FPS and drop frames inference cannot keep up "
+                             "with (auto: on with a window, off when headless)")
+    return parser.parse_args(argv)
+
+def start_live_inference(argv=None):
+    args = parse_args(argv)
 
-        # 4. Detailed Logging (JSON-ready)
-        if len(result.boxes) > 0:
-            for box in result.boxes:
-                class_id = int(box.cls[0])
-                label = result.names[class_id]
-                conf = float(box.conf[0])
-                # Lower level log for high-frequency detections
-                logger.debug(f"Detected: {label} ({conf:.2f})")
+    # 1. Configuration via Environment Variables
+    min_confidence = float(os.getenv("MIN_CONFIDENCE", 0.25))  # Lowered for better distant detection
+    img_size = int(os.getenv("IMG_SIZE", 640))
+
+    # MODEL_PATH override, else the fastest backend from deployment.json, else best.onnx -> best.pt
+    model_path = resolve_model(logger)
+
+    if model_path is None:
+        logger.error("Model weights not found (set MODEL_PATH or run export_model --matrix)")
+        return
 
-        # 5. Calculate FPS
-        end_tick = cv2.getTickCount()
-        fps = cv2.getTickFrequency() / (end_tick - start_tick)
+    logger.info(f"--- Loading Model: {model_path} ---")
+    try:
+        infer, render = load_backend(model_path, min_confidence, img_size)
+    except Exception as e:
+        logger.error(f"Failed to load engine: {str(e)}")
+        return
 
-        # 6. Visualize Results
-        annotated_frame = result.plot()
-        cv2.putText(annotated_frame, f"FPS: {fps:.2f}", (20, 50), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    # 2. Open Source
+    realtime = args.realtime == "on" or (args.realtime == "auto" and not args.headless)
+    try:
+        source = FrameSource(args.source, stride=args.stride, realtime=realtime)
+    except RuntimeError as e:
+        logger.error(str(e))
+        return
 
-        cv2.imshow("YOLO11 Live Detection", annotated_frame)
+    # Live sources and real-time replay drop stale frames; offline replay processes every kept frame
+    lossless = not (source.is_live or source.realtime)
 
-        # 7. Exit Logic
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            logger.info("User requested exit.")
-            break
+    logger.info("LIVE INFERENCE STARTED")
+    logger.info(f"  - Source: {source.describe()}")
+    logger.info(f"  - Confidence Threshold: {min_confidence}")
+    logger.info(f"  - Mode: {'headless -> ' + args.output if args.headless else 'window'}, "
+                f"{'every frame' if lossless else 'latest frame wins'}")
+
+    def read():
+        # Cameras occasionally fail a grab; only give up after a run of consecutive failures
+        for _ in range(30 if source.kind == "camera" else 1):
+            frame = source.read()
+            if frame is not None:
+                return frame
+            if source.kind == "camera":
+                logger.warning("Failed to grab frame. Retrying...")
+        return None
+
+    # Capture and inference run on their own threads; rendering and display stay on the main thread
+    pipeline = LivePipeline(read, infer, render, logger=logger, lossless=lossless,
+                            report_every=float(os.getenv("STATS_INTERVAL", 5))).start()
+    writer = AsyncVideoWriter(args.output, source.output_fps) if args.headless else None
+    last_shown = None
+    try:
+        for frame, annotated_frame in pipeline.frames():
+            # Detailed Logging (JSON-ready)
+            for label, conf in frame.found:
+                # Lower level log for high-frequency detections
+                logger.debug(f"Detected: {label} ({conf:.2f})")
 
-    cap.release()
-    cv2.destroyAllWindows()
+            # Display FPS from the render cadence, latency from capture timestamp to display
+            now = cv2.getTickCount()
+            fps = cv2.getTickFrequency() / (now - last_shown) if last_shown else 0.0
+            last_shown = now
+            latency_ms = pipeline.stats["glass_to_glass"].samples[-1]
+            cv2.putText(annotated_frame, f"FPS: {fps:.2f}  Latency: {latency_ms:.0f} ms", (20, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+            if writer is not None:
+                writer.write(annotated_frame)
+                continue
+
+            cv2.imshow("YOLO11 Live Detection", annotated_frame)
+
+            # Exit Logic
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                logger.info("User requested exit.")
+                break
+    except KeyboardInterrupt:
+        logger.info("Interrupted.")
+    finally:
+        pipeline.stop()
+        logger.info(pipeline.report())
+        source.release()
+        if writer is not None:
+            writer.close()
+            logger.info(f"Wrote {writer.written} annotated frames to {os.path.abspath(args.output)}")
+        else:
+            cv2.destroyAllWindows()
     logger.info("Live inference stopped.")
 
 if __name__ == "__main__":
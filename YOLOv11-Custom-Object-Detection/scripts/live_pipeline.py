@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LatestSlot:
+    """
+    Single-slot "latest frame wins" queue between two pipeline stages.
+    put() never blocks: an item the consumer has not picked up yet is replaced and counted as dropped.
+    With lossless=True put() instead waits for the slot to empty (for offline replay, where every
+    frame the source yields must be processed).
+    """
+
+    def __init__(self, lossless=False):
+        self.lossless = lossless
+        self._cond = threading.Condition()
+        self._item = None
+        self._has_item = False
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self.lossless:
+                self._cond.wait_for(lambda: not self._has_item or self._closed)
+            if self._has_item:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for the next item; returns None once the slot is closed and drained (or on timeout)."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._has_item or self._closed, timeout):
+                return None
+            if not self._has_item:
+                return None
+            item, self._item, self._has_item = self._item, None, False
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class StageStats:
+    """Rolling latency window (milliseconds) for one pipeline stage."""
+
+    def __init__(self, name, window=120):
+        self.name = name
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, ms):
+        with self._lock:
+            self.samples.append(ms)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            data = np.asarray(self.samples, dtype=np.float64)
+        if not data.size:
+            return f"{self.name}: n/a"
+        return (f"{self.name}: mean {data.mean():.1f} ms, p50 {np.percentile(data, 50):.1f} ms, "
+                f"p90 {np.percentile(data, 90):.1f} ms")
+
+
+class Frame:
+    """A captured frame travelling through the pipeline with its timestamps (time.perf_counter())."""
+
+    __slots__ = ("index", "image", "captured_at", "result", "found")
+
+    def __init__(self, index, image, captured_at):
+        self.index = index
+        self.image = image
+        self.captured_at = captured_at
+        self.result = None
+        self.found = ()
+
+
+class LivePipeline:
+    """
+    Capture -> inference -> render on separate threads, connected by LatestSlot queues.
+
+    read() returns a BGR frame or None (source exhausted / failed), infer(image) returns
+    (result, [(label, conf), ...]) and render(image, result) returns the annotated frame.
+    Capture and inference run in background threads; frames() yields rendered frames on the
+    caller's thread, so cv2.imshow stays on the main thread. Stale frames are dropped at each
+    hand-off instead of queueing up, which keeps glass-to-glass latency bounded by one
+    inference instead of growing with the backlog. lossless=True makes every hand-off wait
+    instead (offline replay: throughput is bounded by inference, nothing is skipped).
+    """
+
+    def __init__(self, read, infer, render, logger=None, report_every=5.0, lossless=False):
+        self.read = read
+        self.infer = infer
+        self.render = render
+        self.logger = logger
+        self.report_every = report_every
+        self.captured = LatestSlot(lossless)
+        self.inferred = LatestSlot(lossless)
+        self.stop_event = threading.Event()
+        self.stats = {name: StageStats(name) for name in ("capture", "inference", "render", "glass_to_glass")}
+        self._threads = []
+
+    def _capture_loop(self):
+        index = 0
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                image = self.read()
+                now = time.perf_counter()
+                if image is None:
+                    break
+                self.stats["capture"].add((now - start) * 1000)
+                # Stamped when the grab started, so glass-to-glass includes capture latency
+                self.captured.put(Frame(index, image, start))
+                index += 1
+        finally:
+            self.captured.close()
+
+    def _inference_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                frame = self.captured.get(timeout=0.5)
+                if frame is None:
+                    if self.captured.closed:
+                        break
+                    continue
+                start = time.perf_counter()
+                frame.result, frame.found = self.infer(frame.image)
+                self.stats["inference"].add((time.perf_counter() - start) * 1000)
+                self.inferred.put(frame)
+        except Exception:
+            if self.logger:
+                self.logger.exception("Inference stage failed")
+            self.stop_event.set()
+        finally:
+            self.inferred.close()
+
+    def start(self):
+        for target, name in ((self._capture_loop, "capture"), (self._inference_loop, "inference")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.captured.close()
+        self.inferred.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+    def frames(self):
+        """Yield (Frame, annotated image) for every frame that reaches the render stage."""
+        last_report = time.perf_counter()
+        rendered = 0
+        while not self.stop_event.is_set():
+            frame = self.inferred.get(timeout=0.5)
+            if frame is None:
+                if self.inferred.closed:
+                    break
+                continue
+            start = time.perf_counter()
+            annotated = self.render(frame.image, frame.result)
+            now = time.perf_counter()
+            self.stats["render"].add((now - start) * 1000)
+            self.stats["glass_to_glass"].add((now - frame.captured_at) * 1000)
+            rendered += 1
+            yield frame, annotated
+
+            if self.logger and now - last_report >= self.report_every:
+                self.logger.info(self.report(rendered / (now - last_report)))
+                last_report, rendered = now, 0
+
+    def report(self, fps=None):
+        parts = [self.stats[name].summary() for name in self.stats]
+        parts.append(f"dropped before inference: {self.captured.dropped}, before render: {self.inferred.dropped}")
+        if fps is not None:
+            parts.insert(0, f"display {fps:.1f} FPS")
+        return " | ".join(parts)
@@ -0,0 +1,70 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class ModelRegistry:
+    """
+    Process-wide LRU cache of loaded YOLO models keyed by (resolved path, mtime, task).
+    A rewritten weights file gets a new mtime and is reloaded; loads and hits are counted so
+    long-running processes (live inference, export matrix, quantization) can check that each
+    weights file is deserialized only once.
+    """
+
+    def __init__(self, capacity=4):
+        self.capacity = max(1, capacity)
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(weights, task=None):
+        path = os.path.abspath(os.path.expanduser(str(weights)))
+        if os.path.exists(path):
+            return os.path.realpath(path), os.stat(path).st_mtime_ns, task
+        # Hub names such as "yolo11n.pt" are downloaded by Ultralytics on first use
+        return str(weights), None, task
+
+    def get(self, weights, task=None, cache=True):
+        """Return a loaded model; cache=False loads a private copy (for callers that mutate it, e.g. training)."""
+        from ultralytics import YOLO
+
+        key = self.key(weights, task)
+        with self._lock:
+            if cache and key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            model = YOLO(key[0], task=task) if task else YOLO(key[0])
+            self.loads += 1
+            if not cache:
+                return model
+            for stale in [k for k in self._models if k[0] == key[0] and k[1] != key[1]]:
+                del self._models[stale]
+            self._models[key] = model
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return model
+
+    def invalidate(self, weights=None):
+        with self._lock:
+            if weights is None:
+                self._models.clear()
+                return
+            path = self.key(weights)[0]
+            for k in [k for k in self._models if k[0] == path]:
+                del self._models[k]
+
+    def stats(self):
+        with self._lock:
+            return {"loads": self.loads, "hits": self.hits, "evictions": self.evictions, "cached": len(self._models)}
+
+
+registry = ModelRegistry(int(os.getenv("YOLO_MODEL_CACHE", 4)))
+
+
+def get_model(weights, task=None, cache=True):
+    return registry.get(weights, task=task, cache=cache)
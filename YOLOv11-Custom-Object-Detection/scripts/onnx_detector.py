@@ -0,0 +1,182 @@
+import argparse
+import ast
+import os
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Boxes are xyxy in original-image pixels
+Detections = namedtuple("Detections", ["boxes", "scores", "class_ids"])
+
+MAX_WH = 7680  # class offset for class-aware NMS, same constant Ultralytics uses
+
+
+def letterbox(image, new_shape=(640, 640), color=(114, 114, 114)):
+    """Resize with unchanged aspect ratio and pad to new_shape (Ultralytics LetterBox, auto=False)."""
+    h, w = image.shape[:2]
+    r = min(new_shape[0] / h, new_shape[1] / w)
+    new_unpad = int(round(w * r)), int(round(h * r))
+    dw, dh = (new_shape[1] - new_unpad[0]) / 2, (new_shape[0] - new_unpad[1]) / 2
+    if (w, h) != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, r, (left, top)
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy NMS over xyxy boxes; returns kept indices sorted by descending score."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-7)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class OnnxDetector:
+    """YOLO11 detector on plain ONNX Runtime: NumPy letterbox, decoding and class-aware NMS.
+
+    No torch or ultralytics import, so cold start is dominated by session creation.
+    """
+
+    def __init__(self, model_path, conf=0.25, iou=0.7, max_det=300, providers=None, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=providers or ort.get_available_providers()
+        )
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.input_dtype = np.float16 if inp.type == "tensor(float16)" else np.float32
+        meta = self.session.get_modelmeta().custom_metadata_map
+        imgsz = ast.literal_eval(meta["imgsz"]) if "imgsz" in meta else inp.shape[2:]
+        if not all(isinstance(s, int) for s in imgsz):
+            imgsz = (640, 640)  # dynamic axes without metadata
+        self.imgsz = tuple(imgsz)
+        names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        self.names = {int(k): v for k, v in names.items()}
+
+    def preprocess(self, image):
+        padded, ratio, pad = letterbox(image, self.imgsz)
+        blob = padded[:, :, ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW
+        blob = np.ascontiguousarray(blob, dtype=self.input_dtype)[None] / self.input_dtype(255)
+        return blob, ratio, pad
+
+    def postprocess(self, output, ratio, pad, orig_shape):
+        pred = output[0].T.astype(np.float32)  # (4 + nc, N) -> (N, 4 + nc)
+        class_scores = pred[:, 4:]
+        class_ids = class_scores.argmax(1)
+        scores = class_scores[np.arange(len(pred)), class_ids]
+        mask = scores > self.conf
+        pred, scores, class_ids = pred[mask], scores[mask], class_ids[mask]
+
+        cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        keep = nms(boxes + class_ids[:, None] * MAX_WH, scores, self.iou)[: self.max_det]
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        # Undo letterbox and clip to the original image
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        boxes /= ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, orig_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, orig_shape[0])
+        return Detections(boxes, scores, class_ids.astype(np.int64))
+
+    def __call__(self, image):
+        """Detect objects in a BGR image (as returned by cv2.imread)."""
+        blob, ratio, pad = self.preprocess(image)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return self.postprocess(output, ratio, pad, image.shape[:2])
+
+
+def draw_detections(image, detections, names, color=(0, 255, 0)):
+    """Return a copy of image with boxes and 'label conf' captions drawn."""
+    annotated = image.copy()
+    for (x1, y1, x2, y2), score, cls in zip(detections.boxes.astype(int), detections.scores, detections.class_ids):
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(annotated, f"{names.get(int(cls), int(cls))} {score:.2f}", (x1, max(y1 - 8, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return annotated
+
+
+def compare_with_ultralytics(model_path, image_paths, conf=0.25, iou=0.7, atol=1.0):
+    """Run both engines on the same images; returns (max box deviation in px, images that disagree)."""
+    from scripts.model_registry import get_model
+
+    detector = OnnxDetector(model_path, conf=conf, iou=iou)
+    model = get_model(model_path, task="detect")
+    max_dev, mismatched = 0.0, []
+    for path in image_paths:
+        image = cv2.imread(path)
+        ours = detector(image)
+        ref = model.predict(image, conf=conf, iou=iou, imgsz=detector.imgsz, verbose=False)[0].boxes
+        ref_boxes, ref_cls = ref.xyxy.cpu().numpy(), ref.cls.cpu().numpy().astype(np.int64)
+        if len(ref_boxes) != len(ours.boxes):
+            mismatched.append(path)
+            continue
+        if not len(ref_boxes):
+            continue
+        # Pair each reference box with our closest box of the same class
+        dist = np.abs(ref_boxes[:, None, :] - ours.boxes[None, :, :]).max(-1)
+        dist[ref_cls[:, None] != ours.class_ids[None, :]] = np.inf
+        dev = dist.min(1).max()
+        max_dev = max(max_dev, float(dev))
+        if dev > atol:
+            mismatched.append(path)
+    return max_dev, mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Standalone ONNX Runtime YOLO11 detector.")
+    parser.add_argument("--model", default=os.getenv("ONNX_MODEL_PATH", os.path.abspath(
+        "runs/detect/traffic_sign_detection/yolo11_custom/weights/best.onnx")))
+    parser.add_argument("--source", default="dataset/valid/images/")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--iou", type=float, default=0.7)
+    parser.add_argument("--compare", action="store_true", help="Check parity against the ultralytics ONNX path")
+    parser.add_argument("--atol", type=float, default=1.0, help="Max allowed box deviation (px) for --compare")
+    args = parser.parse_args()
+
+    exts = ('.jpg', '.jpeg', '.png', '.bmp')
+    if os.path.isdir(args.source):
+        paths = sorted(os.path.join(args.source, f) for f in os.listdir(args.source) if f.lower().endswith(exts))
+    else:
+        paths = [args.source]
+
+    if args.compare:
+        max_dev, mismatched = compare_with_ultralytics(args.model, paths, args.conf, args.iou, args.atol)
+        print(f"Max box deviation: {max_dev:.3f}px over {len(paths)} images; {len(mismatched)} mismatched")
+        for p in mismatched:
+            print(f"  mismatch: {p}")
+        raise SystemExit(1 if mismatched else 0)
+
+    start = time.perf_counter()
+    detector = OnnxDetector(args.model, conf=args.conf, iou=args.iou)
+    print(f"Cold start: {(time.perf_counter() - start) * 1000:.0f} ms")
+    for path in paths:
+        det = detector(cv2.imread(path))
+        print(f"{os.path.basename(path)}: {len(det.boxes)} detections")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+
+from scripts.logger_utils import setup_production_logging
+from scripts.telemetry import process_memory
+
+# Initialize Production Logger
+logger = setup_production_logging("profile_dataloader")
+
+CACHE_MODES = {"none": False, "ram": "ram", "disk": "disk"}
+OVERLAY_PATH = os.getenv("CONFIG_OVERLAY", "config.overlay.json")
+
+
+def _int_list(value):
+    return [int(v) for v in str(value).replace(",", " ").split()]
+
+
+def default_workers():
+    cpus = os.cpu_count() or 1
+    return sorted({w for w in (0, 2, 4, 8, cpus // 2, cpus) if w <= cpus})
+
+
+class PeakMemory:
+    """Samples trainer + dataloader-worker RSS on a background thread; peak_mb is the maximum seen."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            mem = process_memory()
+            rss = mem.get("rss_mb", mem.get("peak_rss_mb", 0.0))  # peak only, without psutil
+            self.peak_mb = max(self.peak_mb, rss + mem.get("workers_rss_mb", 0.0))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class StageDataset:
+    """
+    Per-sample view of a YOLODataset for one pipeline stage:
+      decode  -> load_image() only (JPEG decode + resize, or the RAM/disk cache),
+      augment -> the full training transform (mosaic, affine, HSV, flips, letterbox).
+    Top-level class so DataLoader workers can pickle it on Windows.
+    """
+
+    def __init__(self, dataset, stage):
+        self.dataset = dataset
+        self.stage = stage
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        if self.stage == "decode":
+            return self.dataset.load_image(index)[0]
+        return self.dataset[index]["img"]
+
+
+def load_training_config(config_path):
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    training = dict(config.get("training", {}))
+    training.update(load_overlay(OVERLAY_PATH).get("training", {}))
+    return config, training
+
+
+def load_overlay(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def build_dataset(dataset_yaml, training, cache, batch):
+    """The same YOLODataset the Ultralytics DetectionTrainer builds for the train split."""
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data import build_yolo_dataset
+    from ultralytics.data.utils import check_det_dataset
+
+    overrides = {k: v for k, v in training.items() if k not in ("project", "name", "exist_ok", "verbose")}
+    cfg = get_cfg(overrides={**overrides, "data": dataset_yaml, "mode": "train", "cache": cache, "batch": batch})
+    data = check_det_dataset(dataset_yaml)
+    start = time.perf_counter()
+    dataset = build_yolo_dataset(cfg, data["train"], batch, data, mode="train", rect=False, stride=32)
+    return dataset, time.perf_counter() - start
+
+
+def time_loader(loader, batch_images, samples, warmup):
+    """Images/s over `samples` images after `warmup` batches (worker start-up is timed separately)."""
+    start = time.perf_counter()
+    it = iter(loader)
+    for _ in range(warmup):
+        next(it)
+    startup = time.perf_counter() - start
+    n = 0
+    start = time.perf_counter()
+    while n < samples:
+        n += batch_images(next(it))
+    elapsed = time.perf_counter() - start
+    return {"images_per_s": n / elapsed, "startup_s": startup, "images": n}
+
+
+def profile_stage(dataset, stage, workers, batch, samples, warmup):
+    import torch
+    from torch.utils.data import DataLoader
+    from ultralytics.data import build_dataloader
+
+    with PeakMemory() as mem:
+        if stage == "collate":
+            # Exactly what the trainer iterates: InfiniteDataLoader + YOLODataset.collate_fn
+            loader = build_dataloader(dataset, batch, workers, shuffle=True)
+            result = time_loader(loader, lambda b: len(b["img"]), samples, warmup)
+        else:
+            loader = DataLoader(StageDataset(dataset, stage), batch_size=None, shuffle=True, num_workers=workers,
+                                pin_memory=torch.cuda.is_available(), persistent_workers=workers > 0,
+                                prefetch_factor=4 if workers > 0 else None)
+            result = time_loader(loader, lambda _: 1, samples, warmup * batch)
+        del loader
+    result["peak_rss_mb"] = mem.peak_mb
+    return result
+
+
+def profile_model(model_variant, imgsz, batches, device, iters=5):
+    """Forward + backward images/s per batch size on the training device; stops at the first OOM."""
+    import torch
+    from scripts.model_registry import get_model
+
+    net = get_model(model_variant, cache=False).model.to(device).train()
+    for p in net.parameters():
+        p.requires_grad_(True)
+    cuda = device.type == "cuda"
+    results = {}
+    for batch in batches:
+        try:
+            x = torch.rand(batch, 3, imgsz, imgsz, device=device)
+            if cuda:
+                torch.cuda.reset_peak_memory_stats(device)
+            for i in range(iters + 1):
+                if i == 1:
+                    if cuda:
+                        torch.cuda.synchronize(device)
+                    start = time.perf_counter()
+                with torch.autocast(device.type, enabled=cuda):
+                    out = net(x)
+                    loss = sum(o.float().mean() for o in (out if isinstance(out, (list, tuple)) else [out]))
+                loss.backward()
+                net.zero_grad(set_to_none=True)
+            if cuda:
+                torch.cuda.synchronize(device)
+            entry = {"images_per_s": batch * iters / (time.perf_counter() - start)}
+            if cuda:
+                total = torch.cuda.get_device_properties(device).total_memory
+                entry["gpu_mem_frac"] = torch.cuda.max_memory_reserved(device) / total
+            results[batch] = entry
+            logger.info(f"  model batch {batch}: {entry['images_per_s']:.1f} img/s"
+                        + (f", GPU memory {100 * entry['gpu_mem_frac']:.0f}%" if cuda else ""))
+        except RuntimeError as e:
+            if "out of memory" not in str(e).lower():
+                raise
+            logger.info(f"  model batch {batch}: out of memory")
+            break
+        finally:
+            if cuda:
+                torch.cuda.empty_cache()
+    return results
+
+
+def recommend(loader_results, model_results, configured_batch, max_gpu_mem, total_ram_mb, headroom):
+    """
+    batch: the fastest batch size under max_gpu_mem (configured batch when the model was not profiled).
+    cache: the mode with the best collate throughput if it beats no cache by >10% and fits in RAM.
+    workers: the fewest workers whose collate throughput covers the model's images/s with headroom.
+    bottleneck: "model" or "dataloader"; "unknown" when no batch size of the model was measured.
+    """
+    fitting = {b: r for b, r in model_results.items() if r.get("gpu_mem_frac", 0.0) <= max_gpu_mem}
+    batch = max(fitting, key=lambda b: fitting[b]["images_per_s"]) if fitting else configured_batch
+    model_ips = fitting[batch]["images_per_s"] if fitting else None
+
+    collate = [r for r in loader_results if r["stage"] == "collate"]
+    best_by_cache = {}
+    for r in collate:
+        if r["cache"] not in best_by_cache or r["images_per_s"] > best_by_cache[r["cache"]]["images_per_s"]:
+            best_by_cache[r["cache"]] = r
+    cache = "none"
+    for mode in ("ram", "disk"):
+        r = best_by_cache.get(mode)
+        if r is None or (total_ram_mb and r["peak_rss_mb"] >= 0.7 * total_ram_mb):
+            continue
+        if r["images_per_s"] > 1.1 * best_by_cache.get(cache, {}).get("images_per_s", 0.0):
+            cache = mode
+
+    rows = sorted((r for r in collate if r["cache"] == cache), key=lambda r: r["workers"])
+    target = model_ips * headroom if model_ips else None
+    enough = [r for r in rows if target and r["images_per_s"] >= target]
+    chosen = enough[0] if enough else max(rows, key=lambda r: r["images_per_s"], default=None)
+    workers = chosen["workers"] if chosen else None
+    if model_ips is None:
+        bottleneck = "unknown"  # --skip-model, or no batch size fit under max_gpu_mem
+    else:
+        bottleneck = "model" if enough else "dataloader"
+    return {"batch": batch, "workers": workers, "cache": CACHE_MODES[cache]}, bottleneck, model_ips
+
+
+def run_profile(args):
+    import torch
+
+    config, training = load_training_config(args.config)
+    model_variant = os.getenv("MODEL_VARIANT", config.get("model_variant", "yolo11n.pt"))
+    imgsz = int(training.get("imgsz", 640))
+    batch = int(args.batch or training.get("batch", 16))
+    if not os.path.exists(args.data):
+        logger.error(f"{args.data} not found!")
+        return 1
+
+    logger.info(f"--- Dataloader profile: {args.data} (imgsz {imgsz}, batch {batch}) ---")
+    loader_results = []
+    for cache_name in args.cache:
+        dataset, build_s = build_dataset(args.data, training, CACHE_MODES[cache_name], batch)
+        logger.info(f"cache={cache_name}: dataset of {len(dataset)} images built in {build_s:.1f}s")
+        for workers in args.workers:
+            for stage in args.stages:
+                r = profile_stage(dataset, stage, workers, batch, args.samples, args.warmup)
+                r.update({"cache": cache_name, "workers": workers, "stage": stage, "dataset_build_s": build_s})
+                loader_results.append(r)
+                logger.info(f"  {stage:<8} workers={workers:<3} {r['images_per_s']:8.1f} img/s  "
+                            f"peak RSS {r['peak_rss_mb']:.0f} MB  start-up {r['startup_s']:.1f}s")
+        del dataset
+
+    device = torch.device("cuda:0" if torch.cuda.is_available() and str(args.device) != "cpu" else "cpu")
+    model_results = {}
+    if not args.skip_model:
+        logger.info(f"Model {model_variant} forward+backward on {device}:")
+        sweep = args.batch_sizes if device.type == "cuda" else [batch]
+        model_results = profile_model(model_variant, imgsz, sweep, device)
+
+    try:
+        import psutil
+        total_ram_mb = psutil.virtual_memory().total / 1e6
+    except ImportError:
+        total_ram_mb = 0
+    values, bottleneck, model_ips = recommend(loader_results, model_results, batch, args.max_gpu_mem,
+                                              total_ram_mb, args.headroom)
+    logger.info("=" * 50)
+    logger.info(f"Recommended: workers={values['workers']} batch={values['batch']} cache={values['cache']} "
+                f"(bottleneck: {bottleneck}{f', model {model_ips:.1f} img/s' if model_ips else ''})")
+
+    report = {"timestamp": datetime.now().isoformat(timespec="seconds"), "cpu_count": os.cpu_count(),
+              "device": str(device), "model": model_variant, "imgsz": imgsz, "total_ram_mb": total_ram_mb,
+              "loader": loader_results, "model_throughput": {str(k): v for k, v in model_results.items()},
+              "recommended": values, "bottleneck": bottleneck}
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Full report: {args.report}")
+
+    if args.write_overlay:
+        overlay = load_overlay(args.overlay)
+        overlay.setdefault("training", {}).update({k: v for k, v in values.items() if v is not None})
+        overlay["profiled"] = {"timestamp": report["timestamp"], "host": platform.node(),
+                               "bottleneck": bottleneck}
+        with open(args.overlay, "w") as f:
+            json.dump(overlay, f, indent=4)
+        logger.info(f"Wrote {args.overlay}; train_pipeline.py applies it on top of {args.config}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Profile decode / augment / collate throughput and recommend "
+                                                 "dataloader workers, batch size and cache mode.")
+    parser.add_argument("--config", default=os.getenv("CONFIG_PATH", "config.json"))
+    parser.add_argument("--data", default=os.getenv("DATASET_YAML", os.path.abspath("dataset/data.yaml")))
+    parser.add_argument("--workers", type=_int_list, default=default_workers(), help="Worker counts to sweep")
+    parser.add_argument("--cache", nargs="+", choices=sorted(CACHE_MODES), default=["none", "ram"],
+                        help="Cache modes to sweep (disk writes .npy files next to the images)")
+    parser.add_argument("--stages", nargs="+", choices=["decode", "augment", "collate"],
+                        default=["decode", "augment", "collate"])
+    parser.add_argument("--batch", type=int, default=0, help="Dataloader batch (default: config.json batch)")
+    parser.add_argument("--batch-sizes", type=_int_list, default=_int_list("8 16 32 64"),
+                        help="Model batch sizes to try on the GPU")
+    parser.add_argument("--samples", type=int, default=int(os.getenv("PROFILE_SAMPLES", 512)),
+                        help="Timed images per configuration")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed batches per configuration")
+    parser.add_argument("--device", default=os.getenv("PROFILE_DEVICE", "0"))
+    parser.add_argument("--skip-model", action="store_true", help="Only profile the dataloader")
+    parser.add_argument("--max-gpu-mem", type=float, default=0.85, help="Largest GPU memory fraction for a batch")
+    parser.add_argument("--headroom", type=float, default=1.1,
+                        help="Loader must deliver this multiple of the model's images/s")
+    parser.add_argument("--report", default=os.path.join("logs", "dataloader_profile.json"))
+    parser.add_argument("--overlay", default=OVERLAY_PATH)
+    parser.add_argument("--no-overlay", dest="write_overlay", action="store_false",
+                        help="Report only; do not write the config overlay")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run_profile(parse_args()))
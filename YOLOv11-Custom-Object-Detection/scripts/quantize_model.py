@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+
+import cv2
+from scripts.logger_utils import setup_production_logging
+
+# Initialize Production Logger
+logger = setup_production_logging("quantize_model")
+
+WEIGHTS_DIR = os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights")
+
+
+def calibration_images(yaml_path, fallback_dir, count, seed=0):
+    """Up to `count` images from the `val` split of data.yaml (or fallback_dir), sampled reproducibly."""
+    from scripts.label_index import list_split_images, load_data_config, resolve_split
+
+    paths = []
+    if yaml_path and os.path.exists(yaml_path):
+        try:
+            split = resolve_split(yaml_path, load_data_config(yaml_path), "val")
+            paths = list_split_images(split) if split else []
+        except OSError as e:
+            logger.warning(f"Could not resolve the val split from {yaml_path}: {e}")
+    if not paths and os.path.isdir(fallback_dir):
+        exts = ('.jpg', '.jpeg', '.png', '.bmp')
+        paths = sorted(os.path.join(fallback_dir, f) for f in os.listdir(fallback_dir) if f.lower().endswith(exts))
+    if not paths:
+        raise FileNotFoundError("No calibration images found (checked data.yaml val split and the fallback dir)")
+    random.Random(seed).shuffle(paths)
+    return paths[:count]
+
+
+def make_calibration_reader(fp32_path, image_paths):
+    """
+    CalibrationDataReader feeding letterboxed, normalized images exactly as OnnxDetector does at
+    inference time, so the activation ranges match deployment.
+    """
+    from onnxruntime.quantization import CalibrationDataReader
+    from scripts.onnx_detector import OnnxDetector
+
+    detector = OnnxDetector(fp32_path, providers=["CPUExecutionProvider"])
+
+    class ValCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(image_paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is not None:
+                    blob, _, _ = detector.preprocess(image)
+                    return {detector.input_name: blob}
+            return None
+
+        def rewind(self):
+            self._paths = iter(image_paths)
+
+    return ValCalibrationReader()
+
+
+def head_nodes_to_exclude(model_path):
+    """
+    Non-Conv nodes of the detection head (DFL, box decoding, the concat of boxes and class scores).
+    Box coordinates (0..imgsz) and class probabilities (0..1) share one output tensor, so a single
+    INT8 scale for it wipes out the scores; the head's convolutions are still quantized.
+    """
+    import onnx
+
+    graph = onnx.load(model_path, load_external_data=False).graph
+    pattern = re.compile(r"^/model\.(\d+)/")
+    indices = [int(m.group(1)) for n in graph.node if (m := pattern.match(n.name))]
+    if not indices:
+        return []
+    head = f"/model.{max(indices)}/"
+    return [n.name for n in graph.node if n.name.startswith(head) and n.op_type != "Conv" and
+            ("/dfl/" in n.name or not re.match(rf"^{re.escape(head)}cv[23]\.", n.name))]
+
+
+def quantize_int8(fp32_path, int8_path, image_paths, per_channel=True, method="minmax", exclude_head=True):
+    """Static QDQ INT8 quantization of an FP32 ONNX model; keeps the Ultralytics metadata (names, imgsz)."""
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    source = fp32_path
+    try:
+        # Shape inference + graph cleanup makes the quantizer see every tensor
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        source = os.path.splitext(int8_path)[0] + "_prep.onnx"
+        quant_pre_process(fp32_path, source, skip_symbolic_shape=True)
+    except Exception as e:
+        logger.warning(f"quant_pre_process skipped: {e}")
+        source = fp32_path
+
+    excluded = head_nodes_to_exclude(source) if exclude_head else []
+    logger.info(f"Calibrating on {len(image_paths)} images ({method}, per_channel={per_channel}, "
+                f"{len(excluded)} head nodes kept in FP32)")
+    quantize_static(
+        source,
+        int8_path,
+        make_calibration_reader(fp32_path, image_paths),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+        calibrate_method={"minmax": CalibrationMethod.MinMax, "entropy": CalibrationMethod.Entropy,
+                          "percentile": CalibrationMethod.Percentile}[method],
+        nodes_to_exclude=excluded,
+    )
+    if source != fp32_path:
+        os.remove(source)
+
+    # Ultralytics/OnnxDetector read names and imgsz from the metadata
+    fp32_meta = {p.key: p.value for p in onnx.load(fp32_path, load_external_data=False).metadata_props}
+    model = onnx.load(int8_path)
+    present = {p.key for p in model.metadata_props}
+    for key, value in fp32_meta.items():
+        if key not in present:
+            model.metadata_props.add(key=key, value=value)
+    onnx.save(model, int8_path)
+    return int8_path
+
+
+def evaluate(model_path, yaml_path, images, imgsz, iterations, threads):
+    """mAP via validate_model.run_validation plus batch-1 CPU latency via the benchmark harness."""
+    from scripts.benchmark_comparison import benchmark_config, set_threads
+    from scripts.model_registry import get_model
+    from scripts.validate_model import run_validation
+
+    metrics = run_validation(model_path, yaml_path, batch=1, imgsz=imgsz, device="cpu", plots=False)
+    model = get_model(model_path, task="detect")  # already loaded by run_validation
+    model.predict(images[0], imgsz=imgsz, device="cpu", verbose=False)
+    set_threads(model, threads)
+    timing = benchmark_config(model, images, 1, imgsz, "cpu", 5, iterations)
+    return {
+        "path": model_path,
+        "size_mb": os.path.getsize(model_path) / 1e6,
+        "map50": metrics["map50"],
+        "map50_95": metrics["map50_95"],
+        "p50_ms": timing["latency_ms"]["p50"],
+        "throughput_ips": timing["throughput_ips"],
+    }
+
+
+def run(args):
+    from scripts.benchmark_comparison import load_images
+    from scripts.export_model import export_variant
+
+    if not os.path.exists(args.weights):
+        logger.error(f"Trained weights not found at {args.weights}")
+        return 1
+
+    fp32_path = os.path.join(os.path.dirname(os.path.abspath(args.weights)), "best_fp32.onnx")
+    if args.reexport or not os.path.exists(fp32_path):
+        logger.info("--- Exporting FP32 ONNX ---")
+        fp32_path = export_variant(args.weights, "onnx_fp32", args.imgsz)
+    int8_path = os.path.splitext(fp32_path)[0].replace("_fp32", "") + "_int8.onnx"
+
+    logger.info(f"--- Quantizing {fp32_path} -> {int8_path} ---")
+    calib = calibration_images(args.data, args.calib_source, args.calib_images, args.seed)
+    quantize_int8(fp32_path, int8_path, calib, per_channel=not args.per_tensor, method=args.method,
+                  exclude_head=not args.quantize_head)
+
+    if args.skip_eval:
+        logger.info(f"INT8 model written to {int8_path} (evaluation skipped)")
+        return 0
+
+    logger.info("--- Evaluating FP32 vs INT8 (CPU, batch 1) ---")
+    images = load_images(args.calib_source if os.path.isdir(args.calib_source) else os.path.dirname(calib[0]), 32)
+    threads = args.threads or os.cpu_count() or 1
+    fp32 = evaluate(fp32_path, args.data, images, args.imgsz, args.iterations, threads)
+    int8 = evaluate(int8_path, args.data, images, args.imgsz, args.iterations, threads)
+
+    map_delta = int8["map50_95"] - fp32["map50_95"]
+    speedup = fp32["p50_ms"] / int8["p50_ms"] if int8["p50_ms"] > 0 else 0.0
+    acceptable = -map_delta <= args.max_map_drop
+    logger.info("=" * 60)
+    logger.info(f"{'':<8}{'mAP50-95':>10}{'mAP50':>10}{'p50 ms':>10}{'img/s':>10}{'MB':>8}")
+    for name, r in (("FP32", fp32), ("INT8", int8)):
+        logger.info(f"{name:<8}{r['map50_95']:>10.4f}{r['map50']:>10.4f}{r['p50_ms']:>10.1f}"
+                    f"{r['throughput_ips']:>10.1f}{r['size_mb']:>8.1f}")
+    logger.info("-" * 60)
+    logger.info(f"  mAP50-95 delta: {map_delta:+.4f}   latency gain: {speedup:.2f}x")
+    logger.info(f"  Verdict: {'ACCEPT' if acceptable else 'REJECT'} (max allowed mAP50-95 drop {args.max_map_drop:.4f})")
+    logger.info("=" * 60)
+
+    report = {"fp32": fp32, "int8": int8, "map50_95_delta": map_delta, "latency_speedup": speedup,
+              "max_map_drop": args.max_map_drop, "acceptable": acceptable,
+              "calibration": {"images": len(calib), "method": args.method, "per_channel": not args.per_tensor}}
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Report written to {os.path.abspath(args.report)}")
+    return 0 if acceptable else 2
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Static INT8 quantization of the ONNX export with FP32 comparison.")
+    parser.add_argument("--weights", default=os.getenv("MODEL_PATH", os.path.join(WEIGHTS_DIR, "best.pt")))
+    parser.add_argument("--data", default=os.getenv("DATASET_YAML", os.path.abspath("dataset/data.yaml")),
+                        help="data.yaml; its val split is used for calibration and mAP")
+    parser.add_argument("--calib-source", default="dataset/valid/images",
+                        help="Calibration image folder if data.yaml has no usable val entry")
+    parser.add_argument("--calib-images", type=int, default=int(os.getenv("CALIB_IMAGES", 200)))
+    parser.add_argument("--method", choices=["minmax", "entropy", "percentile"], default="minmax")
+    parser.add_argument("--per-tensor", action="store_true", help="Per-tensor instead of per-channel weights")
+    parser.add_argument("--quantize-head", action="store_true", help="Also quantize the detection head decode ops")
+    parser.add_argument("--imgsz", type=int, default=int(os.getenv("IMG_SIZE", 640)))
+    parser.add_argument("--iterations", type=int, default=50, help="Timed batches for the latency comparison")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--max-map-drop", type=float, default=0.01,
+                        help="Largest acceptable mAP50-95 loss; exit code 2 when exceeded")
+    parser.add_argument("--reexport", action="store_true", help="Re-export best_fp32.onnx even if it exists")
+    parser.add_argument("--skip-eval", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default=os.path.join("logs", "quantization_report.json"))
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,188 @@
+import json
+import os
+import sys
+import time
+
+from scripts.logger_utils import setup_production_logging
+
+logger = setup_production_logging("telemetry")
+
+TELEMETRY_FILE = "telemetry.jsonl"
+
+
+def process_memory():
+    """RSS of the trainer and of its children (dataloader workers) in MB, plus cumulative bytes read.
+    Without psutil only {"peak_rss_mb": ...} (ru_maxrss) is available."""
+    try:
+        import psutil
+    except ImportError:
+        # Without psutil only the peak RSS of this process is known (and nothing on Windows)
+        try:
+            import resource
+        except ImportError:
+            return {}
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"peak_rss_mb": peak / 1e6 if sys.platform == "darwin" else peak / 1e3}
+    proc = psutil.Process()
+    try:
+        children = proc.children(recursive=True)
+    except psutil.Error:
+        children = []
+    stats = {"rss_mb": proc.memory_info().rss / 1e6, "workers_rss_mb": 0.0}
+    read = 0
+    for p in [proc] + children:
+        try:
+            if p is not proc:
+                stats["workers_rss_mb"] += p.memory_info().rss / 1e6
+            if hasattr(p, "io_counters"):
+                read += p.io_counters().read_bytes
+        except psutil.Error:
+            continue
+    if read:
+        stats["read_bytes"] = read
+    return stats
+
+
+def _rss_text(mem):
+    if "rss_mb" in mem:
+        return f"RSS {mem['rss_mb']:.0f} MB"
+    if "peak_rss_mb" in mem:
+        return f"peak RSS {mem['peak_rss_mb']:.0f} MB"
+    return "RSS n/a"
+
+
+class TrainingTelemetry:
+    """
+    Ultralytics callbacks recording where training time goes. One JSON line per epoch (and every
+    `every_n_batches` batches if > 0) is appended to <save_dir>/telemetry.jsonl: images/s,
+    dataloader wait (batch_end -> next batch_start) vs compute (batch_start -> batch_end),
+    validation time, epoch wall time, trainer/worker RSS, disk reads and worker count.
+    CUDA is asynchronous, so set sync_cuda=True for exact wait/compute splits.
+    """
+
+    def __init__(self, every_n_batches=0, sync_cuda=False, filename=TELEMETRY_FILE):
+        self.every_n_batches = max(0, int(every_n_batches))
+        self.sync_cuda = sync_cuda
+        self.filename = filename
+        self.path = None
+        self.workers = None
+        self.dataset_size = None
+        self._reset_epoch()
+
+    def _reset_epoch(self):
+        self.epoch_start = time.perf_counter()
+        self.mark = self.epoch_start
+        self.batch_start = self.epoch_start
+        self.wait = []
+        self.compute = []
+        self.images = 0
+        self.train_end = None
+        self.read_start = None
+
+    def attach(self, model):
+        for event in ("on_train_start", "on_train_epoch_start", "on_train_batch_start", "on_train_batch_end",
+                      "on_train_epoch_end", "on_fit_epoch_end", "on_train_end"):
+            model.add_callback(event, getattr(self, event))
+        return self
+
+    def _write(self, record):
+        if self.path is None:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def on_train_start(self, trainer):
+        if int(os.getenv("RANK", -1)) not in (-1, 0):
+            return  # DDP: only the main process writes
+        self.path = os.path.join(str(trainer.save_dir), self.filename)
+        if not trainer.args.resume and os.path.exists(self.path):
+            os.remove(self.path)
+        self.workers = getattr(trainer.train_loader, "num_workers", None)
+        self.dataset_size = len(trainer.train_loader.dataset)
+        logger.info(f"Telemetry -> {self.path}")
+
+    def on_train_epoch_start(self, trainer):
+        self._reset_epoch()
+        self.read_start = process_memory().get("read_bytes")
+
+    def on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        self.wait.append(now - self.mark)
+        self.batch_start = now
+
+    def on_train_batch_end(self, trainer):
+        if self.sync_cuda:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+        now = time.perf_counter()
+        self.compute.append(now - self.batch_start)
+        self.mark = now
+        self.images += trainer.batch_size
+        n = self.every_n_batches
+        if n and len(self.compute) % n == 0:
+            wait, compute = sum(self.wait[-n:]), sum(self.compute[-n:])
+            mem = process_memory()
+            mem.pop("read_bytes", None)
+            self._write({"type": "batch", "epoch": trainer.epoch + 1, "batch": len(self.compute),
+                         "images_per_s": n * trainer.batch_size / max(wait + compute, 1e-9),
+                         "dataloader_wait_s": wait, "compute_s": compute, **mem})
+
+    def on_train_epoch_end(self, trainer):
+        self.train_end = time.perf_counter()
+
+    def on_fit_epoch_end(self, trainer):
+        if self.path is None:
+            return
+        now = time.perf_counter()
+        train_end = self.train_end or now
+        train_s = train_end - self.epoch_start
+        wait, compute = sum(self.wait), sum(self.compute)
+        images = min(self.images, self.dataset_size)
+        mem = process_memory()
+        read = mem.pop("read_bytes", None)
+        record = {
+            "type": "epoch",
+            "epoch": trainer.epoch + 1,
+            "epoch_time_s": now - self.epoch_start,
+            "train_time_s": train_s,
+            "val_time_s": now - train_end,
+            "batches": len(self.compute),
+            "images": images,
+            "images_per_s": images / max(train_s, 1e-9),
+            "dataloader_wait_s": wait,
+            "compute_s": compute,
+            "dataloader_wait_frac": wait / max(wait + compute, 1e-9),
+            "workers": self.workers,
+            "batch_size": trainer.batch_size,
+            **mem,
+        }
+        if read is not None and self.read_start is not None:
+            record["read_mb_per_s"] = (read - self.read_start) / 1e6 / max(train_s, 1e-9)
+        try:
+            import torch
+            if torch.cuda.is_available():
+                record["cuda_max_mem_mb"] = torch.cuda.max_memory_reserved() / 1e6
+                torch.cuda.reset_peak_memory_stats()
+        except ImportError:
+            pass
+        self._write(record)
+        logger.info(f"Epoch {record['epoch']}: {record['images_per_s']:.1f} img/s, dataloader wait "
+                    f"{100 * record['dataloader_wait_frac']:.0f}%, epoch {record['epoch_time_s']:.1f}s "
+                    f"(val {record['val_time_s']:.1f}s), {_rss_text(record)}")
+
+    def on_train_end(self, trainer):
+        if self.path is not None:
+            logger.info(f"Telemetry written to {self.path}")
+
+
+def attach_telemetry(model, every_n_batches=0, sync_cuda=False):
+    return TrainingTelemetry(every_n_batches=every_n_batches, sync_cuda=sync_cuda).attach(model)
+
+
+def load_telemetry(path, kind="epoch"):
+    """Records of one type ("epoch" or "batch") from a telemetry.jsonl."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [r for r in (json.loads(line) for line in f if line.strip()) if r.get("type") == kind]
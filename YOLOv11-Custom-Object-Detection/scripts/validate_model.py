@@ -1,10 +1,27 @@
 import os
-from ultralytics import YOLO
+from scripts.model_registry import get_model
 from scripts.logger_utils import setup_production_logging
 
 # Initialize Production Logger
 logger = setup_production_logging("validate_model")
 
+def run_validation(weights_path, yaml_path, batch=16, imgsz=640, device="0", plots=True, split="val"):
+    """
+    Validate weights (.pt or an exported format) on a dataset split.
+    Returns a flat dict: precision, recall, map50, map50_95, per-image speed (ms) and save_dir.
+    """
+    model = get_model(weights_path, task="detect")
+    metrics = model.val(data=yaml_path, split=split, batch=batch, imgsz=imgsz, device=device, plots=plots)
+    results = metrics.results_dict
+    return {
+        "precision": results["metrics/precision(B)"],
+        "recall": results["metrics/recall(B)"],
+        "map50": results["metrics/mAP50(B)"],
+        "map50_95": results["metrics/mAP50-95(B)"],
+        "speed_ms": dict(metrics.speed),
+        "save_dir": str(metrics.save_dir),
+    }
+
 def validate_custom_model():
     # 1. Path Configuration via Environment Variables
     weights_path = os.getenv("MODEL_PATH", os.path.abspath("runs/detect/traffic_sign_detection/yolo11_custom/weights/best.pt"))
@@ -19,18 +36,12 @@ def validate_custom_model():
         logger.error(f"YAML config not found at {yaml_path}")
         return
         
-    try:
-        model = YOLO(weights_path)
-    except Exception as e:
-        logger.error(f"Failed to load model: {str(e)}")
-        return
-
     # 2. Run Validation
     logger.info(f"Running validation on '{yaml_path}'")
     try:
-        metrics = model.val(
-            data=yaml_path,
-            split='val',
+        metrics = run_validation(
+            weights_path,
+            yaml_path,
             batch=int(os.getenv("BATCH_SIZE", 16)),
             imgsz=int(os.getenv("IMG_SIZE", 640)),
             device=os.getenv("DEVICE", "0"),
@@ -39,13 +50,13 @@ def validate_custom_model():
 
         logger.info("="*50)
         logger.info("--- Validation Metrics Summary ---")
-        logger.info(f"  Precision (P):     {metrics.results_dict['metrics/precision(B)']:.4f}")
-        logger.info(f"  Recall (R):        {metrics.results_dict['metrics/recall(B)']:.4f}")
-        logger.info(f"  mAP @50:           {metrics.results_dict['metrics/mAP50(B)']:.4f}")
-        logger.info(f"  mAP @50-95:        {metrics.results_dict['metrics/mAP50-95(B)']:.4f}")
+        logger.info(f"  Precision (P):     {metrics['precision']:.4f}")
+        logger.info(f"  Recall (R):        {metrics['recall']:.4f}")
+        logger.info(f"  mAP @50:           {metrics['map50']:.4f}")
+        logger.info(f"  mAP @50-95:        {metrics['map50_95']:.4f}")
         logger.info("-" * 50)
-        logger.info(f"  Inference Speed:   {metrics.speed['inference']:.2f}ms/image")
-        logger.info(f"  Results saved to:  {metrics.save_dir}")
+        logger.info(f"  Inference Speed:   {metrics['speed_ms']['inference']:.2f}ms/image")
+        logger.info(f"  Results saved to:  {metrics['save_dir']}")
         logger.info("="*50)
     except Exception as e:
         logger.error(f"Validation failed: {str(e)}", exc_info=True)
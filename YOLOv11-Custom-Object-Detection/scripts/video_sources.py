@@ -0,0 +1,172 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+STREAM_PREFIXES = ('rtsp://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+
+
+class FrameSource:
+    """
+    Uniform frame reader over a webcam, a video file/stream or a directory of frames.
+
+    read() returns the next BGR frame, or None when the source is exhausted.
+    stride=N keeps every N-th frame; skipped video frames are only grabbed, never decoded.
+    realtime=True paces recorded sources at their native FPS and skips ahead when the reader
+    falls behind the wall clock, so a slow consumer sees the same timeline a live camera would.
+    """
+
+    def __init__(self, spec, stride=1, realtime=False, fps=None):
+        self.spec = spec
+        self.stride = max(1, int(stride))
+        self.position = -1  # source index of the last frame returned
+        self._files = None
+        self._cap = None
+
+        if isinstance(spec, int) or str(spec).isdigit():
+            self.kind = "camera"
+            self._cap = cv2.VideoCapture(int(spec))
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        elif os.path.isdir(str(spec)):
+            self.kind = "frames"
+            self._files = sorted(os.path.join(spec, f) for f in os.listdir(spec) if f.lower().endswith(IMAGE_EXTS))
+        else:
+            self.kind = "stream" if str(spec).lower().startswith(STREAM_PREFIXES) else "video"
+            self._cap = cv2.VideoCapture(str(spec))
+
+        if self._cap is not None and not self._cap.isOpened():
+            raise RuntimeError(f"Could not open source: {spec}")
+
+        native = self._cap.get(cv2.CAP_PROP_FPS) if self._cap is not None else 0
+        self.fps = float(fps or native or 30.0)
+        # Live sources already run in real time; pacing only applies to recorded footage
+        self.realtime = bool(realtime) and not self.is_live
+        self._start = None
+
+    @property
+    def is_live(self):
+        return self.kind in ("camera", "stream")
+
+    @property
+    def frame_count(self):
+        if self._files is not None:
+            return len(self._files)
+        if self.kind == "video":
+            return int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return None
+
+    @property
+    def output_fps(self):
+        """Frame rate of the kept frames, for writing them back out as video."""
+        return self.fps / self.stride
+
+    def _skip(self, count):
+        """Advance `count` frames without decoding; False if the source ran out."""
+        for _ in range(count):
+            self.position += 1
+            if self._files is not None:
+                if self.position >= len(self._files):
+                    return False
+            elif not self._cap.grab():
+                return False
+        return True
+
+    def _next(self):
+        self.position += 1
+        if self._files is not None:
+            while self.position < len(self._files):
+                frame = cv2.imread(self._files[self.position])
+                if frame is not None:
+                    return frame
+                self.position += 1
+            return None
+        ret, frame = self._cap.read()
+        return frame if ret else None
+
+    def read(self):
+        if self.realtime:
+            now = time.perf_counter()
+            if self._start is None:
+                self._start = now
+            due = self.position + self.stride if self.position >= 0 else 0  # next kept index
+            wall = int((now - self._start) * self.fps)  # index the wall clock has reached
+            if due > wall:
+                time.sleep((due - wall) / self.fps)
+            elif wall > due:
+                # Behind the clock: jump to the latest kept frame
+                due += (wall - due) // self.stride * self.stride
+            if not self._skip(due - self.position - 1):
+                return None
+        elif self.position >= 0 and not self._skip(self.stride - 1):
+            return None
+        return self._next()
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+
+    def describe(self):
+        total = self.frame_count
+        return (f"{self.kind} '{self.spec}' at {self.fps:.1f} FPS"
+                + (f", {total} frames" if total else "")
+                + (f", stride {self.stride}" if self.stride > 1 else "")
+                + (", real-time pacing" if self.realtime else ""))
+
+
+class AsyncVideoWriter:
+    """
+    cv2.VideoWriter on a background thread, so encoding does not stall the render loop.
+    The writer opens on the first frame (its size fixes the video size); a bounded queue applies
+    backpressure instead of dropping annotated frames. Paths without a video extension
+    (.mp4/.avi/.mkv/.mov) are treated as a directory of numbered JPEG frames.
+    """
+
+    def __init__(self, path, fps, fourcc="mp4v", max_queue=64):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._error = None
+        self._as_frames = os.path.splitext(path)[1].lower() not in ('.mp4', '.avi', '.mkv', '.mov')
+        os.makedirs(path if self._as_frames else os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error:
+                continue  # keep draining so producers never block on a dead writer
+            try:
+                if self._as_frames:
+                    cv2.imwrite(os.path.join(self.path, f"{self.written:06d}.jpg"), frame)
+                else:
+                    if self._writer is None:
+                        h, w = frame.shape[:2]
+                        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (w, h))
+                        if not self._writer.isOpened():
+                            raise RuntimeError(f"Could not open video writer for {self.path}")
+                    self._writer.write(frame)
+                self.written += 1
+            except Exception as e:
+                self._error = e
+        if self._writer is not None:
+            self._writer.release()
+
+    def write(self, frame):
+        if self._error:
+            raise self._error
+        self._queue.put(frame)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._error:
+            raise self._error
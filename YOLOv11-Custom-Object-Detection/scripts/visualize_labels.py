@@ -1,9 +1,14 @@
+import argparse
 import cv2
+import json
 import os
+import sys
+import time
 import yaml
 import random
 import numpy as np
 from scripts.logger_utils import setup_production_logging
+from scripts.label_index import image_to_label_path, labels_dir_for, load_index, resolve_split
 
 # Initialize Production Logger
 logger = setup_production_logging("visualize_labels")
@@ -41,26 +46,28 @@ def visualize_samples(num_samples=5):
     
     logger.info(f"Checking labels in: {train_path}")
     
-    # 2. Get image list
-    valid_extensions = ('.jpg', '.jpeg', '.png', '.bmp')
-    images = [f for f in os.listdir(train_path) if f.lower().endswith(valid_extensions)]
-    
-    if not images:
+    # 2. Load the columnar label index (built once, reused while the label files are unchanged)
+    index = load_index(yaml_path, 'train')
+    if index.num_images == 0:
         logger.error(f"No images found in {train_path}")
         return
 
-    selected_images = random.sample(images, min(len(images), num_samples))
+    # --- NORMALIZATION CHECK (whole split, vectorized) ---
+    coords = np.asarray(index.coords)
+    bad_rows = np.flatnonzero(np.any((coords < 0) | (coords > 1), axis=1))
+    for row in bad_rows:
+        label_name = os.path.basename(image_to_label_path(index.images[index.row_image[row]]))
+        logger.error(f"CRITICAL: Found non-normalized value in {label_name}: {coords[row].tolist()}")
+
+    selected = random.sample(range(index.num_images), min(index.num_images, num_samples))
     
-    logger.info(f"Visualizing {len(selected_images)} random samples...")
+    logger.info(f"Visualizing {len(selected)} random samples...")
 
-    for img_name in selected_images:
-        img_path = os.path.join(train_path, img_name)
-        # Find corresponding label file
-        label_dir = train_path.replace('images', 'labels')
-        label_name = os.path.splitext(img_name)[0] + '.txt'
-        label_path = os.path.join(label_dir, label_name)
+    for i in selected:
+        img_path = index.images[i]
+        img_name = os.path.basename(img_path)
 
-        if not os.path.exists(label_path):
+        if not index.has_label[i]:
             logger.warning(f"Label file missing for {img_name}")
             continue
 
@@ -71,36 +78,26 @@ def visualize_samples(num_samples=5):
             continue
             
         h, w, _ = image.shape
-        
-        # Read Labels
-        with open(label_path, 'r') as f:
-            lines = f.readlines()
-
-        logger.info(f"Processing {img_name} ({len(lines)} objects)")
+        classes, boxes = index.by_image(i)
 
-        for line in lines:
-            parts = line.strip().split()
-            if not parts: continue
-            
-            cls_id = int(parts[0])
-            coords = list(map(float, parts[1:]))
+        logger.info(f"Processing {img_name} ({len(classes)} objects)")
 
-            # --- NORMALIZATION CHECK ---
-            for val in coords:
-                if not (0 <= val <= 1):
-                    logger.error(f"CRITICAL: Found non-normalized value {val} in {label_name}!")
-            
-            # Convert YOLO (center x, center y, width, height) to pixels
-            cx, cy, bw, bh = coords[0], coords[1], coords[2], coords[3]
-            
-            x1 = int((cx - bw/2) * w)
-            y1 = int((cy - bh/2) * h)
-            x2 = int((cx + bw/2) * w)
-            y2 = int((cy + bh/2) * h)
-
-            # Draw Box
-            color = (0, 255, 0) # Green
-            cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        color = (0, 255, 0) # Green
+        for cls_id, box in zip(classes.tolist(), boxes):
+            if index.format == "obb":
+                pts = (box.reshape(4, 2) * (w, h)).astype(np.int32)
+                cv2.polylines(image, [pts], True, color, 2)
+                x1, y1 = pts.min(0)
+            else:
+                # Convert YOLO (center x, center y, width, height) to pixels
+                cx, cy, bw, bh = box
+                x1 = int((cx - bw/2) * w)
+                y1 = int((cy - bh/2) * h)
+                x2 = int((cx + bw/2) * w)
+                y2 = int((cy + bh/2) * h)
+
+                # Draw Box
+                cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
             
             # Draw Label
             if isinstance(class_names, list):
@@ -108,7 +105,7 @@ def visualize_samples(num_samples=5):
             else:
                 label_text = class_names.get(cls_id, f"ID:{cls_id}")
                 
-            cv2.putText(image, label_text, (x1, y1 - 10), 
+            cv2.putText(image, label_text, (int(x1), int(y1) - 10), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
 
         # Show Sample
@@ -118,5 +115,119 @@ def visualize_samples(num_samples=5):
     cv2.destroyAllWindows()
     logger.info("Visualization complete.")
 
+def _class_count(class_names):
+    if isinstance(class_names, dict):
+        return max(class_names) + 1 if class_names else 0
+    return len(class_names)
+
+def _orphan_labels(split_path, images):
+    """Label files without a matching image (directory splits only)."""
+    if not os.path.isdir(split_path):
+        return []
+    label_dir = labels_dir_for(split_path)
+    if not os.path.isdir(label_dir):
+        return []
+    expected = {image_to_label_path(p) for p in images}
+    orphans = []
+    for root, _, files in os.walk(label_dir):
+        orphans.extend(p for p in (os.path.join(root, f) for f in files if f.endswith('.txt')) if p not in expected)
+    return sorted(orphans)
+
+def validate_split(yaml_path, data_config, split, workers=None):
+    """Run every label check on one split with whole-array NumPy operations."""
+    nc = data_config.get('nc') or _class_count(data_config.get('names', []))
+    index = load_index(yaml_path, split, workers=workers)
+    coords = np.asarray(index.coords, np.float64)
+    cls = np.asarray(index.cls)
+    row_image = index.row_image
+    label_of = lambda rows: sorted({image_to_label_path(index.images[i]) for i in row_image[rows]})
+
+    out_of_range = np.flatnonzero(np.any((coords < 0) | (coords > 1) | ~np.isfinite(coords), axis=1))
+    zero_area = np.flatnonzero(index.areas() <= 1e-12)
+    unknown_class = np.flatnonzero((cls < 0) | (cls >= nc))
+
+    # Duplicates: identical (image, class, coords) rows; coords rounded to label-file precision
+    duplicate = np.zeros(0, np.int64)
+    if len(cls):
+        key = np.column_stack([row_image, cls, np.round(coords * 1e6)])
+        _, first = np.unique(key, axis=0, return_index=True)
+        is_first = np.zeros(len(cls), bool)
+        is_first[first] = True
+        duplicate = np.flatnonzero(~is_first)
+
+    has_label = np.asarray(index.has_label)
+    bad_lines = np.asarray(index.bad_lines)
+    unreadable = np.flatnonzero(np.asarray(index.sizes).min(axis=1) <= 0)
+    issues = {
+        "out_of_range": {"rows": int(len(out_of_range)), "files": label_of(out_of_range)},
+        "zero_area": {"rows": int(len(zero_area)), "files": label_of(zero_area)},
+        "unknown_class": {"rows": int(len(unknown_class)), "files": label_of(unknown_class),
+                          "class_ids": sorted(set(cls[unknown_class].tolist()))},
+        "duplicate_boxes": {"rows": int(len(duplicate)), "files": label_of(duplicate)},
+        "malformed_lines": {"rows": int(bad_lines.sum()),
+                            "files": [image_to_label_path(index.images[i]) for i in np.flatnonzero(bad_lines)]},
+        "missing_label": {"files": [index.images[i] for i in np.flatnonzero(~has_label)]},
+        "orphan_label": {"files": _orphan_labels(resolve_split(yaml_path, data_config, split), index.images)},
+        "unreadable_image": {"files": [index.images[i] for i in unreadable]},
+    }
+    summary = {name: len(issue["files"]) for name, issue in issues.items()}
+    return {
+        "images": index.num_images,
+        "labels": len(index),
+        "format": index.format,
+        "class_counts": index.class_counts(nc or None).tolist(),
+        "summary": summary,
+        "issues": issues,
+    }
+
+def validate_dataset(yaml_path, splits=("train", "val", "test"), workers=None, report_path=None):
+    """Headless check of every label file in every split; returns (and optionally writes) a JSON report."""
+    start = time.perf_counter()
+    with open(yaml_path, 'r') as f:
+        data_config = yaml.safe_load(f)
+    report = {"data": os.path.abspath(yaml_path), "splits": {}}
+    for split in splits:
+        if not data_config.get(split):
+            continue
+        split_path = resolve_split(yaml_path, data_config, split)
+        if not os.path.exists(split_path):
+            logger.error(f"[{split}] path not found: {split_path}")
+            report["splits"][split] = {"error": f"path not found: {split_path}"}
+            continue
+        result = validate_split(yaml_path, data_config, split, workers=workers)
+        report["splits"][split] = result
+        problems = {k: v for k, v in result["summary"].items() if v}
+        logger.info(f"[{split}] {result['images']} images, {result['labels']} labels: "
+                    + (", ".join(f"{k}={v} files" for k, v in problems.items()) if problems else "no issues"))
+    report["total_issue_files"] = sum(
+        sum(r.get("summary", {}).values()) for r in report["splits"].values()
+    )
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    if report_path:
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Validation report written to {report_path}")
+    logger.info(f"Validation finished in {report['seconds']:.2f}s ({report['total_issue_files']} files with issues)")
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Visualize or validate YOLO dataset labels.")
+    parser.add_argument("--validate", action="store_true",
+                        help="Headless mode: check every label file in every split and write a JSON report.")
+    parser.add_argument("--data", default=os.getenv("DATASET_YAML", os.path.abspath("dataset/data.yaml")))
+    parser.add_argument("--splits", nargs="+", default=["train", "val", "test"])
+    parser.add_argument("--report", default=os.getenv("LABEL_REPORT", "logs/label_report.json"))
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--strict", action="store_true", help="Exit with status 1 if any issue is found.")
+    parser.add_argument("--samples", type=int, default=5, help="Images to show in interactive mode.")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    visualize_samples()
+    args = parse_args()
+    if args.validate:
+        report = validate_dataset(args.data, args.splits, workers=args.workers, report_path=args.report)
+        sys.exit(1 if args.strict and report["total_issue_files"] else 0)
+    else:
+        os.environ.setdefault("DATASET_YAML", args.data)
+        visualize_samples(args.samples)
@@ -1,7 +1,8 @@
 import os
 import json
 import torch
-from ultralytics import YOLO
+from scripts.model_registry import get_model
+from scripts.telemetry import attach_telemetry
 from scripts.logger_utils import setup_production_logging
 
 # Initialize Production Logger
@@ -33,13 +34,25 @@ def train_custom_model():
         logger.warning("  No GPU detected. Training will be extremely slow on CPU.")
 
     try:
-        model = YOLO(model_variant)
+        # Training mutates the model, so load a private copy rather than the shared cached one
+        model = get_model(model_variant, cache=False)
     except Exception as e:
         logger.error(f"Failed to load model {model_variant}: {str(e)}")
         return
 
+    # Per-epoch throughput / dataloader wait / memory records in <run>/telemetry.jsonl
+    telemetry_every = int(os.getenv("TELEMETRY_EVERY", config.get("telemetry_every", 0)))
+    attach_telemetry(model, every_n_batches=telemetry_every)
+
     # 3. Training Parameters
     training_args = config.get("training", {})
+    # Host-specific workers/batch/cache written by scripts.profile_dataloader
+    overlay_path = os.getenv("CONFIG_OVERLAY", "config.overlay.json")
+    if os.path.exists(overlay_path):
+        with open(overlay_path, 'r') as f:
+            overlay = json.load(f).get("training", {})
+        training_args.update(overlay)
+        logger.info(f"Applied {overlay_path}: {overlay}")
     training_args["data"] = dataset_yaml  # Inject production path
     
     logger.info(f"Configuring training for dataset: {dataset_yaml}")
@@ -18,20 +18,39 @@ The input label format is expected to be:
     x1 y1 x2 y2 x3 y3 x4 y4 class_name
 
 Coordinates are in absolute pixels, class_name is a string like 'bolt'.
+
+Image sizes are read from the file header (see ``image_size.py``), images are
+converted in a process pool, and pairs whose output label is newer than both
+the image and the original label are skipped on re-runs.
+
+With ``--max-side`` the full-resolution images are moved to
+``images/<split>_original`` (mirroring ``labels/<split>_original``) and
+``images/<split>`` receives copies whose long side is capped at that size.
+Labels are still normalized against the original size, which keeps them valid
+for the downscaled copy. ``resize_map.json`` in the dataset root records the
+original and resized size of every image.
 """
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, Iterable
 import argparse
+import json
+import os
+import shutil
 
 import cv2
 from ultralytics.utils import TQDM
 
+from src.data.image_size import probe_image_size
+
 
 CLASS_MAPPING: Dict[str, int] = {
     "bolt": 0,
 }
 
+RESIZE_MAP = "resize_map.json"
+
 
 def normalize_obb(coords: list[float], w: int, h: int) -> list[float]:
     """Normalize 8 coordinates [x1, y1, ..., x4, y4] by image width/height."""
@@ -54,27 +73,38 @@ def iter_images(image_dir: Path, exts: Iterable[str] = (".png", ".jpg", ".jpeg",
             yield p
 
 
+def is_up_to_date(save_path: Path, *inputs: Path) -> bool:
+    """True if save_path exists and is newer than every input file."""
+    if not save_path.is_file():
+        return False
+    out_mtime = save_path.stat().st_mtime_ns
+    return all(out_mtime > p.stat().st_mtime_ns for p in inputs)
+
+
 def convert_single_image(
     image_path: Path,
     orig_label_dir: Path,
     save_dir: Path,
     class_mapping: Dict[str, int],
-) -> None:
-    """Convert one image's annotation file."""
-    img = cv2.imread(str(image_path))
-    if img is None:
-        raise RuntimeError(f"Failed to read image: {image_path}")
+    force: bool = False,
+) -> str:
+    """Convert one image's annotation file.
 
-    h, w = img.shape[:2]
+    Returns "converted", "skipped" (output already up to date) or "no_label".
+    """
     image_name = image_path.stem
 
     orig_label_path = orig_label_dir / f"{image_name}.txt"
     if not orig_label_path.is_file():
         # No annotation, silently skip
-        return
+        return "no_label"
 
     save_dir.mkdir(parents=True, exist_ok=True)
     save_path = save_dir / f"{image_name}.txt"
+    if not force and is_up_to_date(save_path, image_path, orig_label_path):
+        return "skipped"
+
+    w, h = probe_image_size(image_path)
 
     with orig_label_path.open("r") as f_in, save_path.open("w") as f_out:
         for line in f_in:
@@ -94,25 +124,157 @@ def convert_single_image(
             normalized = normalize_obb(coords, w, h)
             formatted_coords = [f"{c:.6g}" for c in normalized]
             f_out.write(f"{class_idx} {' '.join(formatted_coords)}\n")
+    return "converted"
+
+
+def _convert_job(job: tuple) -> str:
+    """Process-pool entry point; unpacks arguments for convert_single_image."""
+    return convert_single_image(*job)
+
+
+def downscale_image(
+    src: Path,
+    dst: Path,
+    max_side: int,
+    jpeg_quality: int = 95,
+    force: bool = False,
+) -> tuple[str, tuple[int, int], tuple[int, int]]:
+    """Write src to dst with its long side capped at max_side.
+
+    Returns (status, original (w, h), written (w, h)); status is "resized",
+    "copied" (already small enough) or "skipped" (dst newer than src).
+    """
+    if not force and is_up_to_date(dst, src):
+        return "skipped", probe_image_size(src), probe_image_size(dst)
+    im = cv2.imread(str(src))
+    if im is None:
+        raise OSError(f"Could not read image: {src}")
+    h0, w0 = im.shape[:2]
+    scale = max_side / max(h0, w0)
+    if scale >= 1:
+        # copyfile, not copy2: a fresh mtime marks dst as up to date on the next run
+        shutil.copyfile(src, dst)
+        return "copied", (w0, h0), (w0, h0)
+    w, h = max(1, round(w0 * scale)), max(1, round(h0 * scale))
+    im = cv2.resize(im, (w, h), interpolation=cv2.INTER_AREA)
+    params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if dst.suffix.lower() in (".jpg", ".jpeg") else []
+    tmp = dst.with_name(f".{dst.stem}.tmp{dst.suffix}")
+    if not cv2.imwrite(str(tmp), im, params):
+        raise OSError(f"Could not write image: {dst}")
+    os.replace(tmp, dst)
+    return "resized", (w0, h0), (w, h)
+
+
+def _downscale_job(job: tuple) -> tuple[str, tuple[int, int], tuple[int, int]]:
+    """Process-pool entry point; unpacks arguments for downscale_image."""
+    return downscale_image(*job)
+
+
+def _run_jobs(fn, jobs: list[tuple], workers: int, desc: str) -> list:
+    """Map fn over jobs on a process pool (in-process for workers <= 1) with a progress bar."""
+    if workers > 1 and len(jobs) > 1:
+        chunksize = max(1, len(jobs) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(TQDM(pool.map(fn, jobs, chunksize=chunksize), total=len(jobs), desc=desc))
+    return [fn(job) for job in TQDM(jobs, desc=desc)]
+
+
+def load_resize_map(root: Path) -> dict:
+    path = root / RESIZE_MAP
+    if not path.is_file():
+        return {"max_side": 0, "jpeg_quality": None, "images": {}}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def downscale_split(
+    root: Path,
+    split: str,
+    max_side: int,
+    jpeg_quality: int,
+    workers: int,
+    force: bool,
+    resize_map: dict,
+) -> Path:
+    """Cap images/<split> at max_side, keeping the originals in images/<split>_original.
+
+    Returns the directory holding the original images.
+    """
+    image_dir = root / "images" / split
+    orig_dir = root / "images" / f"{split}_original"
+    if not orig_dir.is_dir():
+        image_dir.rename(orig_dir)
+        print(f"{split}: moved full-resolution images to {orig_dir}")
+    image_dir.mkdir(parents=True, exist_ok=True)
+
+    sources = list(iter_images(orig_dir))
+    jobs = [(p, image_dir / p.name, max_side, jpeg_quality, force) for p in sources]
+    counts = {"resized": 0, "copied": 0, "skipped": 0}
+    for src, (status, original, resized) in zip(sources, _run_jobs(_downscale_job, jobs, workers, f"Resizing {split}")):
+        counts[status] += 1
+        resize_map["images"][f"{split}/{src.name}"] = {"original": list(original), "resized": list(resized)}
+    print(
+        f"{split}: {counts['resized']} downscaled to max side {max_side}, {counts['copied']} already smaller, "
+        f"{counts['skipped']} up to date"
+    )
+    return orig_dir
 
 
-def convert_dataset(dataset_root: str | Path) -> None:
-    """Convert train and val splits under dataset_root."""
+def convert_dataset(
+    dataset_root: str | Path,
+    workers: int | None = None,
+    force: bool = False,
+    max_side: int = 0,
+    jpeg_quality: int = 95,
+) -> None:
+    """Convert train and val splits under dataset_root.
+
+    workers: process count (defaults to the CPU count); 0 or 1 converts in-process.
+    max_side: if > 0, also cap the long side of the training images (see module docstring).
+    """
     root = Path(dataset_root)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    resize_map = load_resize_map(root)
+    resize_force = force
+    if max_side:
+        # New resize settings invalidate every previously written copy
+        resize_force |= (resize_map.get("max_side"), resize_map.get("jpeg_quality")) != (max_side, jpeg_quality)
+        resize_map = {"max_side": max_side, "jpeg_quality": jpeg_quality,
+                      "images": {} if resize_force else resize_map.get("images", {})}
 
     for split in ("train", "val"):
         image_dir = root / "images" / split
         orig_label_dir = root / "labels" / f"{split}_original"
         save_dir = root / "labels" / split
 
-        if not image_dir.is_dir():
+        orig_image_dir = root / "images" / f"{split}_original"
+
+        if not image_dir.is_dir() and not orig_image_dir.is_dir():
             raise FileNotFoundError(f"Image dir not found: {image_dir}")
         if not orig_label_dir.is_dir():
             raise FileNotFoundError(f"Original label dir not found: {orig_label_dir}")
 
-        image_paths = list(iter_images(image_dir))
-        for img_path in TQDM(image_paths, desc=f"Converting {split}"):
-            convert_single_image(img_path, orig_label_dir, save_dir, CLASS_MAPPING)
+        if max_side:
+            image_dir = downscale_split(root, split, max_side, jpeg_quality, workers, resize_force, resize_map)
+        elif orig_image_dir.is_dir():
+            # A previous --max-side run left downscaled copies in images/<split>; labels follow the originals
+            image_dir = orig_image_dir
+
+        save_dir.mkdir(parents=True, exist_ok=True)
+        jobs = [(p, orig_label_dir, save_dir, CLASS_MAPPING, force) for p in iter_images(image_dir)]
+        counts = {"converted": 0, "skipped": 0, "no_label": 0}
+        for status in _run_jobs(_convert_job, jobs, workers, f"Converting {split}"):
+            counts[status] += 1
+        print(
+            f"{split}: {counts['converted']} converted, {counts['skipped']} up to date, "
+            f"{counts['no_label']} without annotation"
+        )
+
+    if max_side:
+        path = root / RESIZE_MAP
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(resize_map, f, indent=1, sort_keys=True)
+        print(f"Wrote {path}")
 
 
 def main():
@@ -123,8 +285,38 @@ def main():
         default="./datasets/bolts_dataset",
         help="Root of bolts dataset (contains images/ and labels/).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: CPU count, 1 = no pool).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-convert even if the output label is newer than its inputs.",
+    )
+    parser.add_argument(
+        "--max-side",
+        type=int,
+        default=0,
+        help="Downscale training images whose long side exceeds this many pixels; originals are kept in "
+        "images/<split>_original (default: 0 = keep full resolution).",
+    )
+    parser.add_argument(
+        "--jpeg-quality",
+        type=int,
+        default=95,
+        help="JPEG quality of downscaled images (default: 95).",
+    )
     args = parser.parse_args()
-    convert_dataset(args.dataset_root)
+    convert_dataset(
+        args.dataset_root,
+        workers=args.workers,
+        force=args.force,
+        max_side=args.max_side,
+        jpeg_quality=args.jpeg_quality,
+    )
 
 
 if __name__ == "__main__":
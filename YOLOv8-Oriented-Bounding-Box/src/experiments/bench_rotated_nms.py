@@ -0,0 +1,121 @@
+"""
+Benchmark the NumPy rotated NMS against Ultralytics' ``nms_rotated``.
+
+Generates a synthetic dense bolt tray (clusters of jittered rotated boxes, as
+a detection head produces them before NMS) and times both implementations at
+several candidate counts. Reports the kept-set agreement, and optionally
+checks our polygon IoU against ``cv2.rotatedRectangleIntersection``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from src.postprocess.rotated import rotated_iou_pairs, rotated_nms, xywhr_to_corners
+
+
+def synthetic_tray(
+    n: int,
+    size: float = 1024.0,
+    per_object: int = 4,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """n candidate boxes: n / per_object bolts, each predicted per_object times with jitter."""
+    rng = np.random.default_rng(seed)
+    objects = max(1, n // per_object)
+    base = np.column_stack([
+        rng.uniform(0, size, objects),
+        rng.uniform(0, size, objects),
+        rng.uniform(20, 40, objects),
+        rng.uniform(8, 15, objects),
+        rng.uniform(0, np.pi, objects),
+    ])
+    jitter = np.array([2.0, 2.0, 1.0, 1.0, 0.05])
+    boxes = np.concatenate([base + rng.normal(0, jitter, base.shape) for _ in range(per_object)])[:n]
+    scores = rng.uniform(0.3, 1.0, len(boxes))
+    return boxes, scores
+
+
+def _time(fn, repeat: int) -> tuple[float, object]:
+    """Best-of-repeat wall time in ms, plus the last result."""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, out
+
+
+def _agreement(a: np.ndarray, b: np.ndarray) -> float:
+    """Jaccard overlap of two kept-index sets."""
+    a, b = set(a.tolist()), set(b.tolist())
+    return len(a & b) / max(len(a | b), 1)
+
+
+def check_iou_against_cv2(samples: int = 2000, seed: int = 0) -> float:
+    """Max absolute IoU difference vs OpenCV on random overlapping pairs."""
+    import cv2
+
+    boxes, _ = synthetic_tray(samples * 2, size=200.0, per_object=2, seed=seed)
+    a, b = boxes[0::2], boxes[1::2]
+    ours = rotated_iou_pairs(xywhr_to_corners(a), xywhr_to_corners(b))
+    ref = np.zeros(len(a))
+    for k, (ra, rb) in enumerate(zip(a, b)):
+        rect_a = ((ra[0], ra[1]), (ra[2], ra[3]), np.degrees(ra[4]))
+        rect_b = ((rb[0], rb[1]), (rb[2], rb[3]), np.degrees(rb[4]))
+        _, pts = cv2.rotatedRectangleIntersection(rect_a, rect_b)
+        inter = cv2.contourArea(pts) if pts is not None and len(pts) > 2 else 0.0
+        ref[k] = inter / (ra[2] * ra[3] + rb[2] * rb[3] - inter)
+    return float(np.abs(ours - ref).max())
+
+
+def run(counts: list[int], iou: float = 0.7, repeat: int = 3, check_iou: bool = False) -> None:
+    try:
+        import torch
+        from ultralytics.utils.ops import nms_rotated
+    except ImportError:
+        torch = nms_rotated = None
+        print("ultralytics/torch not installed: timing the NumPy implementation only.")
+
+    print(f"{'boxes':>8} {'numpy ms':>10} {'ultra ms':>10} {'kept':>7} {'ultra kept':>11} {'agreement':>10}")
+    for n in counts:
+        boxes, scores = synthetic_tray(n)
+        np_ms, keep = _time(lambda: rotated_nms(boxes, scores, iou), repeat)
+        if nms_rotated is not None:
+            tb = torch.from_numpy(boxes).float()
+            ts = torch.from_numpy(scores).float()
+            ul_ms, ul_keep = _time(lambda: nms_rotated(tb, ts, iou).cpu().numpy(), repeat)
+            print(f"{n:>8} {np_ms:>10.1f} {ul_ms:>10.1f} {len(keep):>7} {len(ul_keep):>11} "
+                  f"{_agreement(keep, ul_keep):>10.3f}")
+        else:
+            print(f"{n:>8} {np_ms:>10.1f} {'-':>10} {len(keep):>7} {'-':>11} {'-':>10}")
+
+    if check_iou:
+        print(f"Max |IoU - cv2 IoU|: {check_iou_against_cv2():.2e}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark NumPy rotated NMS vs Ultralytics.")
+    parser.add_argument(
+        "--counts",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="Numbers of candidate boxes to benchmark.",
+    )
+    parser.add_argument("--iou", type=float, default=0.7, help="NMS IoU threshold.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size (best is reported).")
+    parser.add_argument(
+        "--check-iou",
+        action="store_true",
+        help="Also compare rotated IoU against cv2.rotatedRectangleIntersection.",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.counts, iou=args.iou, repeat=args.repeat, check_iou=args.check_iou)
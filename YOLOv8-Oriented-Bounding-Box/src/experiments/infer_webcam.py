@@ -1,44 +1,70 @@
 """
 Webcam demo for YOLOv8 OBB bolts detector.
+
+Also replays video files, stream URLs and frame directories, optionally
+headless with the annotated output written by a background encoder.
 """
 
 from __future__ import annotations
 
 import argparse
+import time
 
 import cv2
 from ultralytics import YOLO
 
+from src.experiments.video_io import AsyncVideoWriter, FrameSource
+
 
 def run_webcam(
     model_path: str,
     device_index: int = 0,
     conf: float = 0.5,
     window_name: str = "YOLOv8 OBB Webcam",
+    source: str | None = None,
+    headless: bool = False,
+    output: str = "./runs/infer_webcam/output.mp4",
+    stride: int = 1,
+    realtime: bool = False,
 ) -> None:
     model = YOLO(model_path)
-    cap = cv2.VideoCapture(device_index)
-
-    if not cap.isOpened():
-        raise RuntimeError(f"Could not open webcam index {device_index}")
+    frames = FrameSource(source if source is not None else device_index, stride=stride, realtime=realtime)
+    writer = AsyncVideoWriter(output, frames.output_fps) if headless else None
 
+    processed = 0
+    start = time.perf_counter()
     try:
         while True:
-            success, frame = cap.read()
-            if not success:
+            frame = frames.read()
+            if frame is None:
                 break
 
-            results = model(frame, conf=conf)
+            results = model(frame, conf=conf, verbose=not headless)
             annotated = results[0].plot()
+            processed += 1
+
+            if writer is not None:
+                writer.write(annotated)
+                continue
 
             cv2.imshow(window_name, annotated)
             key = cv2.waitKey(1) & 0xFF
 
             if key in (27, ord("q")):
                 break
+    except KeyboardInterrupt:
+        pass
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
+        frames.release()
+        if writer is not None:
+            writer.close()
+            elapsed = time.perf_counter() - start
+            print(
+                f"Processed {processed} frames (last source frame {frames.position}) in {elapsed:.1f}s "
+                f"({processed / elapsed if elapsed > 0 else 0.0:.1f} FPS); wrote {writer.written} to {output}"
+            )
+        else:
+            cv2.destroyAllWindows()
 
 
 def parse_args():
@@ -51,6 +77,29 @@ def parse_args():
     )
     parser.add_argument("--device-index", type=int, default=0, help="Webcam index.")
     parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument(
+        "--source",
+        type=str,
+        default=None,
+        help="Video file, stream URL or frame directory (overrides --device-index).",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Do not open a window; write annotated frames to --output.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="./runs/infer_webcam/output.mp4",
+        help="Headless output: a video file (.mp4/.avi/.mkv/.mov) or a directory for JPEG frames.",
+    )
+    parser.add_argument("--stride", type=int, default=1, help="Process every N-th source frame.")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="Pace recorded sources at their FPS, skipping frames when inference falls behind.",
+    )
     return parser.parse_args()
 
 
@@ -60,6 +109,11 @@ def main():
         model_path=args.model,
         device_index=args.device_index,
         conf=args.conf,
+        source=args.source,
+        headless=args.headless,
+        output=args.output,
+        stride=args.stride,
+        realtime=args.realtime,
     )
 
 
@@ -0,0 +1,200 @@
+"""
+Training telemetry callbacks for Ultralytics.
+
+``TrainingTelemetry`` appends one JSON record per epoch (and optionally every N
+batches) to ``telemetry.jsonl`` next to ``results.csv``. Each record holds
+images/s, dataloader wait vs compute time, validation and epoch wall time,
+trainer/worker RSS, disk reads and the dataloader worker count. Together these
+show whether an epoch was bound by data loading, the model or the disk.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+TELEMETRY_FILE = "telemetry.jsonl"
+
+
+def process_memory() -> dict[str, float]:
+    """RSS of this process and its children (dataloader workers) in MB, plus cumulative bytes read.
+
+    Without psutil only ``{"peak_rss_mb": ...}`` (``ru_maxrss``) is available.
+    """
+    try:
+        import psutil
+    except ImportError:
+        # Without psutil only the peak RSS of this process is known (and nothing on Windows)
+        try:
+            import resource
+        except ImportError:
+            return {}
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"peak_rss_mb": peak / 1e6 if sys.platform == "darwin" else peak / 1e3}
+    proc = psutil.Process()
+    try:
+        children = proc.children(recursive=True)
+    except psutil.Error:
+        children = []
+    stats = {"rss_mb": proc.memory_info().rss / 1e6, "workers_rss_mb": 0.0}
+    read = 0
+    for p in [proc, *children]:
+        try:
+            if p is not proc:
+                stats["workers_rss_mb"] += p.memory_info().rss / 1e6
+            if hasattr(p, "io_counters"):
+                read += p.io_counters().read_bytes
+        except psutil.Error:
+            continue
+    if read:
+        stats["read_bytes"] = read
+    return stats
+
+
+def _rss_text(mem: dict) -> str:
+    if "rss_mb" in mem:
+        return f"RSS {mem['rss_mb']:.0f} MB"
+    if "peak_rss_mb" in mem:
+        return f"peak RSS {mem['peak_rss_mb']:.0f} MB"
+    return "RSS n/a"
+
+
+class TrainingTelemetry:
+    """
+    Register with ``attach(model)`` before ``model.train()``.
+
+    Dataloader wait is measured from one batch's end to the next batch's start,
+    and compute from batch start to batch end. CUDA is asynchronous, so pass
+    ``sync_cuda=True`` for an exact split, at a small throughput cost.
+    """
+
+    EVENTS = ("on_train_start", "on_train_epoch_start", "on_train_batch_start", "on_train_batch_end",
+              "on_train_epoch_end", "on_fit_epoch_end", "on_train_end")
+
+    def __init__(self, every_n_batches: int = 0, sync_cuda: bool = False, filename: str = TELEMETRY_FILE):
+        self.every_n_batches = max(0, every_n_batches)
+        self.sync_cuda = sync_cuda
+        self.filename = filename
+        self.path: Path | None = None
+        self.workers: int | None = None
+        self.dataset_size = 0
+        self._reset_epoch()
+
+    def _reset_epoch(self) -> None:
+        self.epoch_start = time.perf_counter()
+        self.mark = self.epoch_start
+        self.batch_start = self.epoch_start
+        self.wait: list[float] = []
+        self.compute: list[float] = []
+        self.images = 0
+        self.train_end: float | None = None
+        self.read_start: float | None = None
+
+    def attach(self, model) -> "TrainingTelemetry":
+        for event in self.EVENTS:
+            model.add_callback(event, getattr(self, event))
+        return self
+
+    def _write(self, record: dict) -> None:
+        if self.path is not None:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def on_train_start(self, trainer) -> None:
+        if int(os.getenv("RANK", "-1")) not in (-1, 0):
+            return  # DDP: only the main process writes
+        self.path = Path(trainer.save_dir) / self.filename
+        if not trainer.args.resume and self.path.exists():
+            self.path.unlink()
+        self.workers = getattr(trainer.train_loader, "num_workers", None)
+        self.dataset_size = len(trainer.train_loader.dataset)
+        print(f"Telemetry -> {self.path}")
+
+    def on_train_epoch_start(self, trainer) -> None:
+        self._reset_epoch()
+        self.read_start = process_memory().get("read_bytes")
+
+    def on_train_batch_start(self, trainer) -> None:
+        now = time.perf_counter()
+        self.wait.append(now - self.mark)
+        self.batch_start = now
+
+    def on_train_batch_end(self, trainer) -> None:
+        if self.sync_cuda:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+        now = time.perf_counter()
+        self.compute.append(now - self.batch_start)
+        self.mark = now
+        self.images += trainer.batch_size
+        n = self.every_n_batches
+        if n and len(self.compute) % n == 0:
+            wait, compute = sum(self.wait[-n:]), sum(self.compute[-n:])
+            mem = process_memory()
+            mem.pop("read_bytes", None)
+            self._write({"type": "batch", "epoch": trainer.epoch + 1, "batch": len(self.compute),
+                         "images_per_s": n * trainer.batch_size / max(wait + compute, 1e-9),
+                         "dataloader_wait_s": wait, "compute_s": compute, **mem})
+
+    def on_train_epoch_end(self, trainer) -> None:
+        self.train_end = time.perf_counter()
+
+    def on_fit_epoch_end(self, trainer) -> None:
+        if self.path is None:
+            return
+        now = time.perf_counter()
+        train_end = self.train_end or now
+        train_s = train_end - self.epoch_start
+        wait, compute = sum(self.wait), sum(self.compute)
+        images = min(self.images, self.dataset_size)
+        mem = process_memory()
+        read = mem.pop("read_bytes", None)
+        record = {
+            "type": "epoch",
+            "epoch": trainer.epoch + 1,
+            "epoch_time_s": now - self.epoch_start,
+            "train_time_s": train_s,
+            "val_time_s": now - train_end,
+            "batches": len(self.compute),
+            "images": images,
+            "images_per_s": images / max(train_s, 1e-9),
+            "dataloader_wait_s": wait,
+            "compute_s": compute,
+            "dataloader_wait_frac": wait / max(wait + compute, 1e-9),
+            "workers": self.workers,
+            "batch_size": trainer.batch_size,
+            **mem,
+        }
+        if read is not None and self.read_start is not None:
+            record["read_mb_per_s"] = (read - self.read_start) / 1e6 / max(train_s, 1e-9)
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                record["cuda_max_mem_mb"] = torch.cuda.max_memory_reserved() / 1e6
+                torch.cuda.reset_peak_memory_stats()
+        except ImportError:
+            pass
+        self._write(record)
+        print(f"Epoch {record['epoch']}: {record['images_per_s']:.1f} img/s, dataloader wait "
+              f"{100 * record['dataloader_wait_frac']:.0f}%, epoch {record['epoch_time_s']:.1f}s "
+              f"(val {record['val_time_s']:.1f}s), {_rss_text(record)}")
+
+    def on_train_end(self, trainer) -> None:
+        if self.path is not None:
+            print(f"Telemetry written to {self.path}")
+
+
+def load_telemetry(path: str | Path, kind: str = "epoch") -> list[dict]:
+    """Records of one type ("epoch" or "batch") from a telemetry.jsonl."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as f:
+        return [r for r in (json.loads(line) for line in f if line.strip()) if r.get("type") == kind]
@@ -7,6 +7,8 @@ import argparse
 
 from ultralytics import YOLO
 
+from src.experiments.telemetry import TrainingTelemetry
+
 
 def train(
     model_name: str,
@@ -16,8 +18,10 @@ def train(
     project: str = "bolts_yolov8_obb",
     name: str = "exp",
     device: str | int | None = None,
+    telemetry_every: int = 0,
 ) -> None:
     model = YOLO(model_name)
+    TrainingTelemetry(every_n_batches=telemetry_every).attach(model)
 
     model.train(
         data=data_cfg,
@@ -53,6 +57,12 @@ def parse_args():
         default=None,
         help="CUDA device index (e.g. '0') or 'cpu'.",
     )
+    parser.add_argument(
+        "--telemetry-every",
+        type=int,
+        default=0,
+        help="Also write a telemetry record every N batches (0 = per epoch only).",
+    )
     return parser.parse_args()
 
 
@@ -66,6 +76,7 @@ def main():
         project=args.project,
         name=args.name,
         device=args.device,
+        telemetry_every=args.telemetry_every,
     )
 
 
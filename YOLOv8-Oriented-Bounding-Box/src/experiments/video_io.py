@@ -0,0 +1,178 @@
+"""
+Frame sources and a background video writer for the OBB demos.
+
+``FrameSource`` reads a webcam index, a video file / stream URL or a directory
+of frames through one ``read()`` call, with an optional frame stride and
+real-time pacing for recorded footage. ``AsyncVideoWriter`` encodes annotated
+frames on a background thread so headless runs are not bound by encoding.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+VIDEO_EXTS = {".mp4", ".avi", ".mkv", ".mov"}
+STREAM_PREFIXES = ("rtsp://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+class FrameSource:
+    """
+    Sequential frame reader; ``read()`` returns a BGR frame or None when exhausted.
+
+    - ``stride=N`` keeps every N-th frame (skipped video frames are grabbed, not decoded).
+    - ``realtime=True`` paces recorded sources at their native FPS and, when the
+      caller is slower than that, skips ahead to the frame the wall clock has reached.
+      Live sources (webcam, stream URLs) ignore it.
+    """
+
+    def __init__(
+        self,
+        spec: str | int,
+        stride: int = 1,
+        realtime: bool = False,
+        fps: float | None = None,
+    ) -> None:
+        self.spec = spec
+        self.stride = max(1, int(stride))
+        self.position = -1  # source index of the last returned frame
+        self._files: list[Path] | None = None
+        self._cap: cv2.VideoCapture | None = None
+
+        text = str(spec)
+        if isinstance(spec, int) or text.isdigit():
+            self.kind = "camera"
+            self._cap = cv2.VideoCapture(int(spec))
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        elif Path(text).is_dir():
+            self.kind = "frames"
+            self._files = sorted(p for p in Path(text).iterdir() if p.suffix.lower() in IMAGE_EXTS)
+        else:
+            self.kind = "stream" if text.lower().startswith(STREAM_PREFIXES) else "video"
+            self._cap = cv2.VideoCapture(text)
+
+        if self._cap is not None and not self._cap.isOpened():
+            raise RuntimeError(f"Could not open source {spec}")
+
+        native = self._cap.get(cv2.CAP_PROP_FPS) if self._cap is not None else 0.0
+        self.fps = float(fps or native or 30.0)
+        self.realtime = realtime and not self.is_live
+        self._start: float | None = None
+
+    @property
+    def is_live(self) -> bool:
+        return self.kind in ("camera", "stream")
+
+    @property
+    def output_fps(self) -> float:
+        """Frame rate of the kept frames when written back out as video."""
+        return self.fps / self.stride
+
+    def _skip(self, count: int) -> bool:
+        for _ in range(count):
+            self.position += 1
+            if self._files is not None:
+                if self.position >= len(self._files):
+                    return False
+            elif not self._cap.grab():
+                return False
+        return True
+
+    def _next(self) -> np.ndarray | None:
+        self.position += 1
+        if self._files is not None:
+            while self.position < len(self._files):
+                frame = cv2.imread(str(self._files[self.position]))
+                if frame is not None:
+                    return frame
+                self.position += 1
+            return None
+        success, frame = self._cap.read()
+        return frame if success else None
+
+    def read(self) -> np.ndarray | None:
+        if self.realtime:
+            now = time.perf_counter()
+            if self._start is None:
+                self._start = now
+            due = self.position + self.stride if self.position >= 0 else 0
+            wall = int((now - self._start) * self.fps)
+            if due > wall:
+                time.sleep((due - wall) / self.fps)
+            elif wall > due:
+                due += (wall - due) // self.stride * self.stride
+            if not self._skip(due - self.position - 1):
+                return None
+        elif self.position >= 0 and not self._skip(self.stride - 1):
+            return None
+        return self._next()
+
+    def release(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+
+
+class AsyncVideoWriter:
+    """
+    Encode frames on a background thread.
+
+    Output paths with a video extension become one video (size fixed by the first
+    frame); any other path is used as a directory of numbered JPEG frames. The
+    queue is bounded, so a slow encoder applies backpressure rather than dropping
+    frames or growing memory.
+    """
+
+    def __init__(self, path: str | Path, fps: float, fourcc: str = "mp4v", max_queue: int = 64) -> None:
+        self.path = Path(path)
+        self.fps = fps
+        self.fourcc = fourcc
+        self.written = 0
+        self._as_frames = self.path.suffix.lower() not in VIDEO_EXTS
+        (self.path if self._as_frames else self.path.parent).mkdir(parents=True, exist_ok=True)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._writer: cv2.VideoWriter | None = None
+        self._error: Exception | None = None
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                if self._as_frames:
+                    cv2.imwrite(str(self.path / f"{self.written:06d}.jpg"), frame)
+                else:
+                    if self._writer is None:
+                        h, w = frame.shape[:2]
+                        self._writer = cv2.VideoWriter(
+                            str(self.path), cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (w, h)
+                        )
+                        if not self._writer.isOpened():
+                            raise RuntimeError(f"Could not open video writer for {self.path}")
+                    self._writer.write(frame)
+                self.written += 1
+            except Exception as exc:  # surfaced to the caller on the next write/close
+                self._error = exc
+        if self._writer is not None:
+            self._writer.release()
+
+    def write(self, frame: np.ndarray) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,217 @@
+"""
+NumPy post-processing for YOLOv8-OBB outputs: decoding, rotated IoU and rotated NMS.
+
+Lets an exported OBB model run on ONNX Runtime (or any NumPy-producing backend)
+without importing torch/ultralytics for post-processing.
+
+Rotated IoU is exact polygon intersection: for every candidate pair the
+intersection polygon is built from corners inside the other box plus edge/edge
+crossings, ordered by angle around its centroid and measured with the shoelace
+formula, all vectorized over pairs. Ultralytics' ``nms_rotated`` uses the
+probabilistic IoU (Gaussian approximation) instead, so kept sets can differ
+slightly for boxes close to the threshold.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def regularize_rboxes(xywhr: np.ndarray) -> np.ndarray:
+    """Make w the long side and wrap angles into [0, pi), like ``ultralytics.utils.ops.regularize_rboxes``."""
+    x, y, w, h, t = xywhr.T
+    swap = w < h
+    w2 = np.where(swap, h, w)
+    h2 = np.where(swap, w, h)
+    t = (t + np.where(swap, np.pi / 2, 0)) % np.pi
+    return np.stack([x, y, w2, h2, t], axis=-1)
+
+
+def xywhr_to_corners(xywhr: np.ndarray) -> np.ndarray:
+    """(N, 5) center/size/angle boxes -> (N, 4, 2) corner points (same order as Ultralytics)."""
+    ctr = xywhr[:, :2]
+    w, h, t = xywhr[:, 2:3], xywhr[:, 3:4], xywhr[:, 4:5]
+    cos, sin = np.cos(t), np.sin(t)
+    vec1 = np.concatenate([w / 2 * cos, w / 2 * sin], axis=-1)
+    vec2 = np.concatenate([-h / 2 * sin, h / 2 * cos], axis=-1)
+    return np.stack([ctr + vec1 + vec2, ctr + vec1 - vec2, ctr - vec1 - vec2, ctr - vec1 + vec2], axis=1)
+
+
+def _polygon_area(pts: np.ndarray) -> np.ndarray:
+    """Signed shoelace area of (..., K, 2) closed polygons."""
+    x, y = pts[..., 0], pts[..., 1]
+    return 0.5 * np.sum(x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y, axis=-1)
+
+
+def _points_in_convex(points: np.ndarray, poly: np.ndarray, eps: float = 1e-9) -> np.ndarray:
+    """(M, P, 2) points inside (M, 4, 2) convex quads (either orientation) -> (M, P) bool."""
+    edge_start = poly[:, None, :, :]                      # (M, 1, 4, 2)
+    edge_vec = np.roll(poly, -1, axis=1)[:, None] - edge_start
+    rel = points[:, :, None, :] - edge_start              # (M, P, 4, 2)
+    cross = edge_vec[..., 0] * rel[..., 1] - edge_vec[..., 1] * rel[..., 0]
+    orient = np.sign(_polygon_area(poly))[:, None, None]
+    return np.all(cross * orient >= -eps, axis=-1)
+
+
+def rotated_iou_pairs(corners_a: np.ndarray, corners_b: np.ndarray) -> np.ndarray:
+    """IoU of each pair (corners_a[i], corners_b[i]); both (M, 4, 2). Returns (M,)."""
+    m = len(corners_a)
+    if m == 0:
+        return np.zeros(0)
+    a = corners_a.astype(np.float64)
+    b = corners_b.astype(np.float64)
+
+    # Edge/edge intersections: segment p + t*r (A) against q + u*s (B)
+    p, r = a[:, :, None, :], (np.roll(a, -1, axis=1) - a)[:, :, None, :]   # (M, 4, 1, 2)
+    q, s = b[:, None, :, :], (np.roll(b, -1, axis=1) - b)[:, None, :, :]   # (M, 1, 4, 2)
+    denom = r[..., 0] * s[..., 1] - r[..., 1] * s[..., 0]                  # (M, 4, 4)
+    qp = q - p
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (qp[..., 0] * s[..., 1] - qp[..., 1] * s[..., 0]) / denom
+        u = (qp[..., 0] * r[..., 1] - qp[..., 1] * r[..., 0]) / denom
+    cross_ok = (np.abs(denom) > 1e-12) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    cross_pts = (p + t[..., None] * r).reshape(m, 16, 2)
+
+    # Candidate vertices of the intersection polygon: 4 + 4 corners and 16 crossings
+    pts = np.concatenate([a, b, np.nan_to_num(cross_pts)], axis=1)          # (M, 24, 2)
+    valid = np.concatenate([
+        _points_in_convex(a, b), _points_in_convex(b, a), cross_ok.reshape(m, 16)
+    ], axis=1)
+    count = valid.sum(1)
+
+    # Order valid vertices by angle around their centroid; pad with the first vertex (zero-area tail)
+    centroid = (pts * valid[..., None]).sum(1) / np.maximum(count, 1)[:, None]
+    angles = np.arctan2(pts[..., 1] - centroid[:, None, 1], pts[..., 0] - centroid[:, None, 0])
+    angles = np.where(valid, angles, np.inf)
+    order = np.argsort(angles, axis=1)
+    pts = np.take_along_axis(pts, order[..., None], axis=1)
+    ordered_valid = np.take_along_axis(valid, order, axis=1)
+    pts = np.where(ordered_valid[..., None], pts, pts[:, :1])
+    inter = np.abs(_polygon_area(pts))
+    inter = np.where(count >= 3, inter, 0.0)
+
+    area_a = np.abs(_polygon_area(a))
+    area_b = np.abs(_polygon_area(b))
+    return inter / np.maximum(area_a + area_b - inter, 1e-12)
+
+
+def _candidate_pairs(
+    centers: np.ndarray,
+    radius: np.ndarray,
+    class_ids: np.ndarray | None,
+    max_pairs: int = 1 << 22,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Pairs (i, j), i < j, whose circumscribed circles overlap (and classes match).
+
+    Boxes are swept along x: each box only looks at boxes whose center lies within its own
+    radius plus the largest radius, found with searchsorted, so dense scenes never build an
+    N x N matrix. Rows are processed in chunks of at most ~max_pairs candidates.
+    """
+    n = len(centers)
+    by_x = np.argsort(centers[:, 0], kind="stable")
+    xs = centers[by_x, 0]
+    reach = radius + radius.max()
+    lo = np.searchsorted(xs, centers[:, 0] - reach, side="left")
+    hi = np.searchsorted(xs, centers[:, 0] + reach, side="right")
+    counts = hi - lo
+
+    out_i, out_j = [], []
+    start = 0
+    while start < n:
+        # Grow the row chunk until it would exceed max_pairs candidates
+        cum = np.cumsum(counts[start:])
+        stop = start + max(1, int(np.searchsorted(cum, max_pairs, side="right")))
+        rows = np.arange(start, stop)
+        c = counts[rows]
+        ii = np.repeat(rows, c)
+        offsets = np.arange(c.sum()) - np.repeat(np.cumsum(c) - c, c)
+        jj = by_x[np.repeat(lo[rows], c) + offsets]
+        keep = jj > ii  # only lower-scored boxes can be suppressed
+        ii, jj = ii[keep], jj[keep]
+        d2 = ((centers[ii] - centers[jj]) ** 2).sum(-1)
+        keep = d2 < (radius[ii] + radius[jj]) ** 2
+        if class_ids is not None:
+            keep &= class_ids[ii] == class_ids[jj]
+        out_i.append(ii[keep])
+        out_j.append(jj[keep])
+        start = stop
+    ii = np.concatenate(out_i)
+    jj = np.concatenate(out_j)
+    order = np.lexsort((jj, ii))
+    return ii[order], jj[order]
+
+
+def rotated_nms(
+    xywhr: np.ndarray,
+    scores: np.ndarray,
+    iou_threshold: float = 0.7,
+    class_ids: np.ndarray | None = None,
+) -> np.ndarray:
+    """Greedy rotated NMS. Returns kept indices in descending score order.
+
+    Candidate pairs are pre-filtered by circumscribed-circle overlap with an x-sorted sweep,
+    their polygon IoU is computed in vectorized batches, and the greedy pass only walks
+    precomputed suppression lists.
+    """
+    n = len(xywhr)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.argsort(-scores, kind="stable")
+    boxes = xywhr[order].astype(np.float64)
+    cls = class_ids[order] if class_ids is not None else None
+    radius = 0.5 * np.hypot(boxes[:, 2], boxes[:, 3])
+    ii, jj = _candidate_pairs(boxes[:, :2], radius, cls)
+
+    if len(ii):
+        corners = xywhr_to_corners(boxes)
+        over = np.zeros(len(ii), dtype=bool)
+        step = 65536
+        for s in range(0, len(ii), step):
+            over[s:s + step] = rotated_iou_pairs(corners[ii[s:s + step]], corners[jj[s:s + step]]) > iou_threshold
+        ii, jj = ii[over], jj[over]
+
+    # ii is sorted, so each box's suppression list is a contiguous slice of jj
+    cols = np.arange(n)
+    starts = np.searchsorted(ii, cols, side="left")
+    ends = np.searchsorted(ii, cols, side="right")
+    suppressed = np.zeros(n, dtype=bool)
+    keep = []
+    for i in range(n):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed[jj[starts[i]:ends[i]]] = True
+    return order[np.asarray(keep, dtype=np.int64)]
+
+
+def decode_obb_output(
+    output: np.ndarray,
+    conf: float = 0.25,
+    iou: float = 0.7,
+    max_det: int = 300,
+    agnostic: bool = False,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Decode a raw YOLOv8-OBB head output of shape (1, 4 + nc + 1, N).
+
+    Returns (xywhr (K, 5), scores (K,), class_ids (K,)) in network-input pixels, after
+    confidence filtering, angle regularization and (class-aware) rotated NMS.
+    """
+    pred = output[0].T.astype(np.float32)  # (N, 4 + nc + 1)
+    class_scores = pred[:, 4:-1]
+    class_ids = class_scores.argmax(1)
+    scores = class_scores[np.arange(len(pred)), class_ids]
+    mask = scores > conf
+    pred, scores, class_ids = pred[mask], scores[mask], class_ids[mask]
+
+    xywhr = regularize_rboxes(np.concatenate([pred[:, :4], pred[:, -1:]], axis=1))
+    keep = rotated_nms(xywhr, scores, iou, None if agnostic else class_ids)[:max_det]
+    return xywhr[keep], scores[keep], class_ids[keep]
+
+
+def scale_rboxes(xywhr: np.ndarray, ratio: float, pad: tuple[float, float]) -> np.ndarray:
+    """Map rotated boxes from letterboxed input pixels back to the original image."""
+    out = xywhr.copy()
+    out[:, 0] = (out[:, 0] - pad[0]) / ratio
+    out[:, 1] = (out[:, 1] - pad[1]) / ratio
+    out[:, 2:4] /= ratio
+    return out
@@ -0,0 +1,55 @@
+"""
+Tests for header-only image size probing.
+
+Run from the project root: python -m pytest tests
+"""
+
+import struct
+
+import cv2
+import numpy as np
+
+from src.data.image_size import probe_image_size
+
+
+def _exif_app1(orientation: int) -> bytes:
+    """Little-endian EXIF APP1 segment holding only the orientation tag."""
+    ifd = struct.pack("<H", 1) + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack("<I", 0)
+    payload = b"Exif\x00\x00" + b"II*\x00" + struct.pack("<I", 8) + ifd
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def _xmp_app1() -> bytes:
+    payload = b"http://ns.adobe.com/xap/1.0/\x00" + b'<x:xmpmeta xmlns:x="adobe:ns:meta/"/>'
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def _write_jpeg(path, width, height, segments=b""):
+    ok, buf = cv2.imencode(".jpg", np.zeros((height, width, 3), dtype=np.uint8))
+    assert ok
+    data = buf.tobytes()
+    # Insert the extra segments right after SOI, ahead of the encoder's own APP0
+    path.write_bytes(data[:2] + segments + data[2:])
+    return path
+
+
+def test_plain_jpeg(tmp_path):
+    path = _write_jpeg(tmp_path / "plain.jpg", 64, 32)
+    assert probe_image_size(path) == (64, 32)
+
+
+def test_exif_rotation_swaps_size(tmp_path):
+    path = _write_jpeg(tmp_path / "rot.jpg", 64, 32, _exif_app1(6))
+    assert probe_image_size(path) == (32, 64)
+
+
+def test_xmp_after_exif_keeps_orientation(tmp_path):
+    path = _write_jpeg(tmp_path / "rot_xmp.jpg", 64, 32, _exif_app1(6) + _xmp_app1())
+    h, w = cv2.imread(str(path)).shape[:2]
+    assert probe_image_size(path) == (w, h) == (32, 64)
+
+
+def test_png(tmp_path):
+    path = tmp_path / "img.png"
+    cv2.imwrite(str(path), np.zeros((20, 40, 3), dtype=np.uint8))
+    assert probe_image_size(path) == (40, 20)